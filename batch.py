@@ -0,0 +1,175 @@
+import time
+from collections import OrderedDict
+
+import maya.cmds as cmds
+
+import lib
+import registry
+import geometry
+import stretch_deformer
+
+# create_lattice for many meshes in one pass, without the window
+# a spec is a dict: geo, top and bottom (world points or locators), optional divisions (None = auto) and head joint
+# specs following the same head share one joint chain / ik rig, placed from the first spec of that head
+# every setup gets its own Logger entry (same name the window uses, so its Delete button still works) and its own prefix
+
+
+def _safe_name(name):
+    return str(name).split('|')[-1].replace(':', '_')
+
+
+def chain_logger_name(head):
+    return 'StretchChain' + _safe_name(head)
+
+
+def setup_logger_name(geo):
+    return 'DeformerSetter' + _safe_name(geo)
+
+
+def setup_logger(geo):
+    return _logged_slot('DeformerSetter', geo, 'geo')
+
+
+def chain_logger(head):
+    return _logged_slot('StretchChain', head, 'head')
+
+
+def _logged_slot(kind, node, param):
+    # (logger, short name, loaded) for node's entry of this kind: the one already logged for node, or a free one
+    # nodes sharing a short name (a|head, b|head) get numbered names instead of overwriting each other's log
+    base = _safe_name(node)
+    long_names = set(cmds.ls(node, long=True) or [str(node)])
+    i = 0
+    while True:
+        name = '{0}{1}'.format(base, i) if i else base
+        logger = lib.Logger(kind + name)
+        if not logger.load():
+            return logger, name, False
+        logged = logger.meta.get('params', {}).get(param)
+        # setups logged before params were kept belong to whoever asks
+        if logged is None or long_names & set(cmds.ls(logged, long=True) or [logged]):
+            return logger, name, True
+        i += 1
+
+
+def group_specs(specs):
+    groups = OrderedDict()
+    for spec in specs:
+        groups.setdefault(spec.get('head', 'Head_M'), []).append(spec)
+    return groups
+
+
+def build_chain(head, spec, joint_num=None):
+    # a chain already logged for head is reused, a failed one is rolled back so nothing is left without a log
+    logger, name, loaded = chain_logger(head)
+    if loaded:
+        logged = logger.meta.get('nodes', {}).get('joints', [])
+        joint_lst = cmds.ls(logged)
+        if not logged or len(joint_lst) != len(logged):
+            raise RuntimeError('{0} is logged but its joints are gone, roll it back first'.format(logger.conf_node_name))
+        return joint_lst, logger.meta['nodes'].get('root')
+    prefix = name + '_'
+    try:
+        joint_lst, controls = stretch_deformer.build_chain(logger, spec['top'], spec['bottom'], joint_num, prefix, head)
+        root = logger.create_node('transform', n=prefix + 'stretch_chain')
+        cmds.parent([controls['offset'], controls['rig']], root)
+        logger.meta['nodes']['root'] = str(root)
+        logger.dump()
+    except Exception:
+        logger.undo()
+        raise
+    return joint_lst, root
+
+
+def build_lattice(spec, joint_lst, joint_num=None, quality=1.0):
+    geo = spec['geo']
+    logger, name, loaded = setup_logger(geo)
+    if loaded:
+        # like the window switching to Delete, a setup is never built over
+        raise RuntimeError('{0} already has a stretch setup ({1}), roll it back first'.format(geo, logger.conf_node_name))
+    prefix = name + '_'
+    divisions = spec.get('divisions')
+    if not divisions:
+        divisions = geometry.auto_divisions(stretch_deformer.get_mesh_points(geo),
+                                            stretch_deformer._world_point(spec['top']),
+                                            stretch_deformer._world_point(spec['bottom']),
+                                            joint_num or stretch_deformer.j_num,
+                                            quality)['divisions']
+    try:
+        lattice, ffb = stretch_deformer.set_lattice(logger, geo, divisions[0], divisions[1], divisions[2], joint_lst,
+                                                    prefix=prefix, head=spec.get('head', 'Head_M'), strict=True)
+        root = logger.create_node('transform', n=prefix + 'stretch_deformer')
+        cmds.parent([lattice, ffb], root)
+        # the chain belongs to the head's logger, update_setup can only change divisions here
+        stretch_deformer.log_lattice_params(logger, geo, divisions, prefix, spec.get('head', 'Head_M'), root, lattice, ffb)
+        logger.meta['nodes']['joints'] = [str(x) for x in joint_lst]
+        logger.dump()
+    except Exception:
+        logger.undo()
+        raise
+    return root, [int(x) for x in divisions]
+
+
+def build_batch(specs, joint_num=None, quality=1.0):
+    # returns one row per spec: geo, head, root, divisions, seconds (its share of the chain included for the first one)
+    # a failing spec is reported with its error and the rest keep going
+    res = []
+    with lib.build_session('stretch_deformer_batch'):
+        # locators are read once up front, specs sharing them would find them gone after the first chain
+        specs, locators = resolve_specs(specs)
+        for head, group in group_specs(specs).items():
+            start = time.perf_counter()
+            try:
+                joint_lst, chain_root = build_chain(head, group[0], joint_num)
+            except Exception as e:
+                res.extend({'geo': spec['geo'], 'head': head, 'error': 'chain: {0}'.format(e)} for spec in group)
+                continue
+            for spec in group:
+                try:
+                    root, divisions = build_lattice(spec, joint_lst, joint_num, quality)
+                except Exception as e:
+                    res.append({'geo': spec['geo'], 'head': head, 'error': str(e)})
+                else:
+                    res.append({'geo': spec['geo'], 'head': head, 'root': str(root), 'chain': str(chain_root),
+                                'divisions': divisions, 'seconds': time.perf_counter() - start})
+                start = time.perf_counter()
+        # consumed like a single build consumes its locators
+        locators = cmds.ls(locators)
+        if locators:
+            cmds.delete(locators)
+    return res
+
+
+def resolve_specs(specs):
+    # specs with top / bottom as world points, plus the locators they were read from
+    res, locators = [], []
+    for spec in specs:
+        spec = dict(spec)
+        for key in ['top', 'bottom']:
+            if not stretch_deformer._is_point(spec[key]):
+                locators.append(str(spec[key]))
+            spec[key] = stretch_deformer._world_point(spec[key])
+        res.append(spec)
+    return res, list(dict.fromkeys(locators))
+
+
+def rollback_batch(specs):
+    # setups first, their skinClusters hang off the shared chains (registry orders them)
+    loggers = [setup_logger(spec['geo']) for spec in specs]
+    loggers.extend(chain_logger(head) for head in group_specs(specs))
+    return registry.rollback([x[0].conf_node_name for x in loggers if x[2]])
+
+
+def scene_loggers():
+    return registry.names()
+
+
+def rollback_all():
+    # every setup logged in the scene, shared chains last
+    return registry.rollback_all()
+
+
+def scene_specs(geos, top, bottom, divisions=None, head='Head_M'):
+    # same top / bottom for a list of meshes, e.g. every piece of one character's head
+    return [{'geo': x, 'top': top, 'bottom': bottom, 'divisions': divisions, 'head': head}
+            for x in cmds.ls(geos)]
@@ -0,0 +1,142 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+# command line add / strip of stretch deformers over many scene files, one headless session per worker process
+# manifest: json list of jobs
+#   {"scene": path, "action": "build" | "rollback", "specs": [batch specs], "joint_num": 4, "output": path}
+# rollback without specs strips every setup logged in the scene, output defaults to saving over the scene
+# every finished job is appended to the state file, a rerun only picks up the jobs that did not succeed yet
+#
+#   python batch_driver.py heads.json --workers 8
+#   python batch_driver.py heads.json --backend fake     (stand-in session, see fake_maya)
+
+
+def _init_worker(backend):
+    if backend == 'fake':
+        import fake_maya
+        fake_maya.install()
+    else:
+        import maya.standalone
+        maya.standalone.initialize(name='python')
+
+
+def job_key(job):
+    return '{0}|{1}|{2}'.format(job['scene'], job.get('action', 'build'), job.get('output') or job['scene'])
+
+
+def run_job(job):
+    # nothing is saved unless every setup of the file went through
+    from maya import cmds
+    import batch
+
+    res = {'key': job_key(job), 'scene': job['scene'], 'action': job.get('action', 'build'), 'pid': os.getpid()}
+    start = time.perf_counter()
+    try:
+        cmds.file(job['scene'], o=True, f=True)
+        if res['action'] == 'build':
+            rows = batch.build_batch(job['specs'], job.get('joint_num'))
+            errors = [x for x in rows if 'error' in x]
+            if errors:
+                raise RuntimeError('; '.join('{0}: {1}'.format(x['geo'], x['error']) for x in errors))
+            res['setups'] = len(rows)
+        elif res['action'] == 'rollback':
+            if job.get('specs'):
+                res['rolled_back'] = batch.rollback_batch(job['specs'])
+            else:
+                res['rolled_back'] = batch.rollback_all()
+        else:
+            raise ValueError("unknown action '{0}'".format(res['action']))
+        cmds.file(rename=job.get('output') or job['scene'])
+        cmds.file(save=True, f=True)
+        res['ok'] = True
+    except Exception as e:
+        res['ok'] = False
+        res['error'] = '{0}: {1}'.format(type(e).__name__, e)
+    res['seconds'] = time.perf_counter() - start
+    return res
+
+
+def load_state(path):
+    # keys of the jobs that already succeeded, a line cut short by an interrupted run is ignored
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            if row.get('ok'):
+                done.add(row['key'])
+    return done
+
+
+def run(jobs, workers=None, backend='maya', state_path=None, max_jobs_per_worker=None, log=None):
+    # returns the result rows of the jobs run this time plus how many were skipped as already done
+    done = load_state(state_path) if state_path else set()
+    todo = [x for x in jobs if job_key(x) not in done]
+    rows = []
+    if todo:
+        workers = max(1, min(workers or os.cpu_count() or 1, len(todo)))
+        ctx = multiprocessing.get_context('spawn')
+        state = open(state_path, 'a') if state_path else None
+        try:
+            with ctx.Pool(workers, _init_worker, (backend,), max_jobs_per_worker) as pool:
+                for row in pool.imap_unordered(run_job, todo):
+                    rows.append(row)
+                    if state:
+                        state.write(json.dumps(row) + '\n')
+                        state.flush()
+                    if log:
+                        log(row)
+        finally:
+            if state:
+                state.close()
+    return {'skipped': len(jobs) - len(todo),
+            'ok': sum(1 for x in rows if x['ok']),
+            'failed': sum(1 for x in rows if not x['ok']),
+            'seconds': sum(x['seconds'] for x in rows),
+            'jobs': rows}
+
+
+def _print_row(row):
+    status = 'ok  ' if row['ok'] else 'FAIL'
+    print('{0} {1:8.2f}s {2} {3}{4}'.format(status, row['seconds'], row['action'], row['scene'],
+                                          '' if row['ok'] else '  ' + row['error']))
+    sys.stdout.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='build or roll back stretch deformers over many scene files')
+    parser.add_argument('manifest', help='json list of jobs')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, cpu count by default')
+    parser.add_argument('--backend', choices=['maya', 'fake'], default='maya')
+    parser.add_argument('--state', default=None, help='resume file, <manifest>.state.jsonl by default')
+    parser.add_argument('--fresh', action='store_true', help='ignore and restart the resume file')
+    parser.add_argument('--max-jobs-per-worker', type=int, default=None,
+                        help='restart a worker session after this many files')
+    parser.add_argument('--report', default=None, help='write the json report here')
+    args = parser.parse_args(argv)
+
+    with open(args.manifest) as f:
+        jobs = json.load(f)
+    state_path = args.state or args.manifest + '.state.jsonl'
+    if args.fresh and os.path.exists(state_path):
+        os.remove(state_path)
+
+    report = run(jobs, args.workers, args.backend, state_path, args.max_jobs_per_worker, _print_row)
+    print('{0} ok, {1} failed, {2} skipped, {3:.2f}s of work'.format(
+        report['ok'], report['failed'], report['skipped'], report['seconds']))
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if report['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
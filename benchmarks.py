@@ -0,0 +1,342 @@
+import json
+import math
+import sys
+import time
+import tracemalloc
+
+import fake_maya
+
+# headless numbers for Logger and the rig build, run with `python benchmarks.py` on any box with numpy
+# everything goes through fake_maya, so times are python overhead of this tool, not maya's own cost
+
+
+def _setup_scene(count):
+    from maya import cmds
+    fake_maya.new_scene()
+    for i in range(count // 4 + 1):
+        cmds.createNode("transform", n="bench_target_{0}".format(i))
+
+
+def _log_ops(logger, count):
+    # one logged operation per iteration, cycling through the logger wrappers the rig build uses
+    node = None
+    for i in range(count):
+        kind = i % 4
+        target = "bench_target_{0}".format(i // 4)
+        if kind == 0:
+            node = logger.create_node("transform", n="bench_node_{0}".format(i))
+        elif kind == 1:
+            logger.set_attr(target + ".translateX", float(i))
+        elif kind == 2:
+            logger.connect_attr(node + ".translateY", target + ".translateY")
+        else:
+            logger.create_attr(target, ln="bench_attr", at="double")
+
+
+def _logger_cycle(count):
+    import lib
+    from maya import cmds
+    _setup_scene(count)
+    scene = fake_maya.scene
+    res = {}
+
+    logger = lib.Logger("bench_logger")
+    start = time.perf_counter()
+    _log_ops(logger, count)
+    elapsed = time.perf_counter() - start
+    res["record_ops_per_sec"] = count / elapsed
+
+    start = time.perf_counter()
+    logger.dump()
+    res["dump_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    loaded = lib.Logger("bench_logger")
+    loaded.load()
+    loaded.log
+    res["load_s"] = time.perf_counter() - start
+
+    scene.calls.clear()
+    start = time.perf_counter()
+    loaded.undo()
+    elapsed = time.perf_counter() - start
+    res["undo_s"] = elapsed
+    res["undo_ops_per_sec"] = count / elapsed
+    res["undo_calls"] = sum(scene.calls.values())
+    res["left_over_nodes"] = len(cmds.ls("bench_node_*"))
+    return res
+
+
+def bench_logger(counts=(1000, 10000, 100000)):
+    # record / dump / load / undo of count logged operations, timing and memory come from separate runs
+    res = {}
+    for count in counts:
+        row = _logger_cycle(count)
+        tracemalloc.start()
+        _logger_cycle(count)
+        row["peak_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+        res[count] = row
+    return res
+
+
+def _build_scene():
+    from maya import cmds
+    fake_maya.new_scene()
+    cmds.joint(p=(0, 5, 0), n="Head_M")
+    cmds.select(cl=1)
+    points = [(math.cos(a * 0.5) * 2, y * 0.5, math.sin(a * 0.5) * 2) for y in range(12) for a in range(12)]
+    geo = fake_maya.create_mesh("bench_geo", points)
+    loc_up = cmds.spaceLocator(n="chain_loc_up")[0]
+    cmds.xform(loc_up, t=(0, 5.5, 0))
+    loc_down = cmds.spaceLocator(n="chain_loc_down")[0]
+    return geo, loc_up, loc_down
+
+
+def _churn_ops(logger, count, edits=10):
+    # count targets, each edited over and over the way a ui session does: values, channel box toggles, rewiring
+    from maya import cmds
+    for i in range(count):
+        target = "bench_target_{0}".format(i)
+        node = logger.create_node("transform", n="bench_node_{0}".format(i))
+        for k in range(edits):
+            logger.set_attr(target + ".translateX", float(k))
+            logger.hide_attr(target + ".translateY")
+            logger.show_attr(target + ".translateY")
+            logger.connect_attr(node + ".translateZ", target + ".translateZ")
+            logger.disconnect_attr(node + ".translateZ", target + ".translateZ")
+        temp = logger.create_node("transform", n="bench_temp_{0}".format(i))
+        cmds.delete(temp)
+
+
+def bench_compact(counts=(100, 1000), edits=10):
+    # stored size and rollback time of a churned log, written as is against compacted in dump
+    import lib
+    from maya import cmds
+    res = {}
+    for count in counts:
+        row = {}
+        for compact in [False, True]:
+            _setup_scene(count * 4)
+            logger = lib.Logger("bench_compact")
+            _churn_ops(logger, count, edits)
+            start = time.perf_counter()
+            logger.dump(compact=compact)
+            key = "compact" if compact else "raw"
+            row[key + "_dump_s"] = time.perf_counter() - start
+            row[key + "_records"] = sum(len(x) for x in logger.log.values())
+            row[key + "_bytes"] = sum(len(cmds.getAttr("logger.bench_compact[{0}]".format(i)))
+                                      for i in range(logger._journal.segments + 1))
+            loaded = lib.Logger("bench_compact")
+            loaded.load()
+            start = time.perf_counter()
+            loaded.undo()
+            row[key + "_undo_s"] = time.perf_counter() - start
+        res[count] = row
+    return res
+
+
+def bench_build(joint_num=4, divisions=(2, 4, 2)):
+    # command calls of one create_lattice build, grouped by command
+    import lib
+    import stretch_deformer
+    geo, loc_up, loc_down = _build_scene()
+    scene = fake_maya.scene
+    scene.calls.clear()
+    start = time.perf_counter()
+    stretch_deformer.build_setup(lib.Logger("DeformerSetter" + geo), geo, loc_up, loc_down, divisions, joint_num)
+    elapsed = time.perf_counter() - start
+    return {"build_s": elapsed,
+            "calls_total": sum(scene.calls.values()),
+            "calls": dict(scene.calls.most_common())}
+
+
+def bench_session(joint_num=4, divisions=(2, 4, 2), runs=3):
+    # build_setup with and without lib.build_session, the fake has no viewport or evaluation graph to spare,
+    # so this only shows the session's own overhead, run stretch_deformer.compare_build_session in maya for the real gain
+    import stretch_deformer
+    geo, loc_up, loc_down = _build_scene()
+    from maya import cmds
+    top, bottom = cmds.xform(loc_up, q=1, ws=1, t=1), cmds.xform(loc_down, q=1, ws=1, t=1)
+    cmds.delete([loc_up, loc_down])
+    return stretch_deformer.compare_build_session(geo, top, bottom, divisions, joint_num, runs)
+
+
+def bench_shapes(count=64):
+    # control curves from the shapes library, one curve call per control and the point variant built once
+    import lib
+    import shapes
+    fake_maya.new_scene()
+    scene = fake_maya.scene
+    logger = lib.Logger("bench_shapes")
+    scene.calls.clear()
+    start = time.perf_counter()
+    for i in range(count):
+        shapes.create(logger, "sphere", "control_{0}".format(i), 2.0)
+    return {"s": time.perf_counter() - start, "curve_calls": scene.calls["cmds.curve"],
+            "calls_total": sum(scene.calls.values())}
+
+
+def bench_network(joint_num=8, falloff=0.5):
+    # nodes and live connections each stretch network adds to the rig, the lean network wires one scale connection
+    # per joint and the falloff profile costs one power node per extra distinct squash exponent, evaluation timing needs maya
+    # (stretch_deformer.compare_network_eval)
+    import lib
+    import stretch_deformer
+    res = {}
+    for network, key in [("legacy", "legacy"), ("lean", "lean"), ("lean", "lean_falloff")]:
+        _build_scene()
+        scene = fake_maya.scene
+        logger = lib.Logger("bench_network")
+        joint_lst = stretch_deformer.curveToJoints(logger, joint_num, "chain_loc_up", "chain_loc_down")
+        count = len(logger.log["nodes"])
+        connections = len(scene.inputs)
+        stretch_deformer.set_ik_math(logger, joint_lst, network, falloff if key == "lean_falloff" else 0.0)
+        res[key] = {"nodes": len(logger.log["nodes"]) - count,
+                    "connections": len(scene.inputs) - connections}
+    return res
+
+
+def bench_batch(sizes=(4, 16, 64), per_head=4):
+    # batch build time per setup as the scene fills up, flat numbers mean linear scaling
+    # plus the registry listing / health check / rollback of all of them, time and maya calls
+    import batch
+    import registry
+    res = {}
+    for size in sizes:
+        from maya import cmds
+        scene = fake_maya.new_scene()
+        specs = []
+        for i in range(size):
+            head = "Head_{0}_M".format(i // per_head)
+            if not cmds.objExists(head):
+                cmds.select(cl=1)
+                cmds.joint(p=(i * 10, 5, 0), n=head)
+            points = [(i * 10 + math.cos(a * 0.5) * 2, y * 0.5, math.sin(a * 0.5) * 2) for y in range(12) for a in range(12)]
+            geo = fake_maya.create_mesh("bench_geo_{0}".format(i), points)
+            specs.append({"geo": geo, "top": (i * 10, 5.5, 0), "bottom": (i * 10, 0, 0), "divisions": None, "head": head})
+        start = time.perf_counter()
+        rows = batch.build_batch(specs)
+        elapsed = time.perf_counter() - start
+        res[size] = {"build_s": elapsed, "per_setup_s": elapsed / size,
+                     "errors": [x["error"] for x in rows if "error" in x]}
+        for key, func in [("list", registry.list_setups), ("health", registry.health)]:
+            scene.calls.clear()
+            start = time.perf_counter()
+            func()
+            res[size][key + "_per_setup_s"] = (time.perf_counter() - start) / size
+            res[size][key + "_calls"] = sum(scene.calls.values())
+        scene.calls.clear()
+        start = time.perf_counter()
+        batch.rollback_batch(specs)
+        res[size]["rollback_per_setup_s"] = (time.perf_counter() - start) / size
+        res[size]["rollback_calls"] = sum(scene.calls.values())
+    return res
+
+
+def bench_update(joint_num=4, divisions=(2, 4, 2)):
+    # command calls and time of update_setup per kind of change, against a full build
+    import lib
+    import stretch_deformer
+    geo, loc_up, loc_down = _build_scene()
+    scene = fake_maya.scene
+    logger = lib.Logger("DeformerSetter" + geo)
+    res = {}
+    for key, func in [("full_build", lambda: stretch_deformer.build_setup(logger, geo, loc_up, loc_down, divisions, joint_num)),
+                      ("divisions", lambda: stretch_deformer.update_setup(logger, [x + 1 for x in divisions])),
+                      ("joint_num", lambda: stretch_deformer.update_setup(logger, joint_num=joint_num + 2)),
+                      ("network", lambda: stretch_deformer.update_setup(logger, network="lean"))]:
+        scene.calls.clear()
+        start = time.perf_counter()
+        func()
+        res[key] = {"s": time.perf_counter() - start, "calls_total": sum(scene.calls.values())}
+    return res
+
+
+def profile_build(joint_num=4, divisions=(2, 4, 2)):
+    # Logger.profile report of one build and its rollback, stretch_deformer's own commands included
+    import lib
+    import stretch_deformer
+    geo, loc_up, loc_down = _build_scene()
+    logger = lib.Logger("DeformerSetter" + geo)
+    with logger.profile(modules=[stretch_deformer]) as prof:
+        stretch_deformer.build_setup(logger, geo, loc_up, loc_down, divisions, joint_num)
+        logger.undo()
+    return prof.report()
+
+
+def bench_cache(frames=48, divisions=(2, 4, 2)):
+    # cache size and bake time of one setup, the fake evaluates nothing so the playback numbers only cover the overhead
+    import os
+    import tempfile
+    import batch
+    import cache
+    geo, loc_up, loc_down = _build_scene()
+    batch.build_batch([{"geo": geo, "top": loc_up, "bottom": loc_down, "divisions": divisions}])
+    res = cache.bake_and_swap(geo, 1, frames, os.path.join(tempfile.mkdtemp(), geo + ".npy"))
+    cache.restore_live(geo, remove_file=True)
+    return res
+
+
+def bench_ffd(counts=(10000, 100000, 1000000), divisions=(3, 6, 3), chunk=65536):
+    # offline ffd evaluation time per vertex count, random bent lattice over a box of points
+    import numpy as np
+    import ffd
+    rng = np.random.default_rng(0)
+    matrix = np.diag([2.0, 6.0, 2.0, 1.0])
+    grid = ffd.rest_lattice(matrix, divisions)
+    grid = grid + rng.normal(scale=0.2, size=grid.shape)
+    res = {}
+    for count in counts:
+        points = rng.uniform(-0.5, 0.5, (count, 3)) @ matrix[:3, :3]
+        start = time.perf_counter()
+        ffd.deform(points, matrix, divisions, grid, chunk)
+        elapsed = time.perf_counter() - start
+        res[count] = {"s": elapsed, "vertices_per_s": count / elapsed}
+    return res
+
+
+_IMPORT_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {path!r})
+{init}
+start = time.perf_counter()
+{imports}
+print(json.dumps({{"s": time.perf_counter() - start,
+                  "pymel": "pymel.core" in sys.modules, "pyside": "PySide2.QtWidgets" in sys.modules}}))
+"""
+
+
+def bench_import(backend="fake", python=None, runs=3):
+    # cold import cost of lib / stretch_deformer, every run in a fresh interpreter, best of runs
+    # "eager" also imports pymel.core and PySide2 up front, what every import used to pay
+    # backend "maya" needs python to be mayapy, the standalone startup itself is not timed
+    # the pymel / pyside flags only mean something there, the fake registers both at install
+    import os
+    import subprocess
+    init = "import fake_maya; fake_maya.install()" if backend == "fake" else \
+        "import maya.standalone; maya.standalone.initialize(name='python')"
+    cases = {"lib": "import lib",
+             "stretch_deformer": "import stretch_deformer",
+             "eager": "import pymel.core, PySide2.QtWidgets, lib, stretch_deformer"}
+    res = {}
+    for key, imports in cases.items():
+        script = _IMPORT_SCRIPT.format(path=os.path.dirname(os.path.abspath(__file__)), init=init, imports=imports)
+        rows = []
+        for i in range(runs):
+            out = subprocess.check_output([python or sys.executable, "-c", script])
+            rows.append(json.loads(out.decode().strip().splitlines()[-1]))
+        res[key] = min(rows, key=lambda x: x["s"])
+    return res
+
+
+def run(counts=(1000, 10000, 100000)):
+    return {"logger": bench_logger(counts), "build": bench_build(), "network": bench_network(), "batch": bench_batch(), "update": bench_update(), "profile": profile_build(),
+            "cache": bench_cache(), "ffd": bench_ffd(), "import": bench_import(), "compact": bench_compact(),
+            "session": bench_session(), "shapes": bench_shapes()}
+
+
+if __name__ == "__main__":
+    fake_maya.install()
+    counts = tuple(int(x) for x in sys.argv[1:]) or (1000, 10000, 100000)
+    print(json.dumps(run(counts), indent=2))
@@ -0,0 +1,126 @@
+import os
+import tempfile
+import time
+
+import numpy as np
+import maya.cmds as cmds
+
+import lib
+import batch
+
+# bakes the deformed mesh of a setup to a float32 (frames, vertices, 3) .npy and plays it back through
+# cache_plugin's deformer while the live ffd / skinCluster stack is switched off
+# the swap is logged on its own Logger, restore_live() (its undo) brings the rig back and keeps the setup log untouched
+
+PLUGIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache_plugin.py')
+NODE_TYPE = 'stretchCacheDeformer'
+
+
+def cache_logger_name(geo):
+    return 'StretchCache' + batch._safe_name(geo)
+
+
+def default_path(geo):
+    scene = cmds.file(q=1, sn=1)
+    folder = os.path.join(os.path.dirname(scene), 'stretch_cache') if scene else tempfile.gettempdir()
+    return os.path.join(folder, batch._safe_name(geo) + '.npy')
+
+
+def read_points(geo):
+    # object space positions of the deformed mesh, one bulk query
+    return np.array(cmds.xform('{0}.vtx[*]'.format(geo), q=1, os=1, t=1), dtype=np.float32).reshape(-1, 3)
+
+
+def bake(geo, start, end, path=None, step=1.0):
+    # writes frame by frame through a memmap, so the cache never has to fit in memory
+    path = path or default_path(geo)
+    folder = os.path.dirname(path)
+    if folder and not os.path.isdir(folder):
+        os.makedirs(folder)
+    frames = int(np.floor((end - start) / float(step) + 1e-6)) + 1
+    current = cmds.currentTime(q=1)
+    begin = time.perf_counter()
+    with lib.suspend_refresh():
+        try:
+            cmds.currentTime(start, update=True)
+            points = read_points(geo)
+            cache = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(frames, len(points), 3))
+            cache[0] = points
+            for i in range(1, frames):
+                cmds.currentTime(start + i * step, update=True)
+                cache[i] = read_points(geo)
+            cache.flush()
+            del cache
+        finally:
+            cmds.currentTime(current)
+    return {'path': path, 'frames': frames, 'vertices': len(points), 'start': start, 'step': step,
+            'bytes': os.path.getsize(path), 'bake_s': time.perf_counter() - begin}
+
+
+def live_nodes(geo):
+    # ffd / skinCluster of the setup on geo and the setup root to hide
+    setup, name, loaded = batch.setup_logger(geo)
+    if not loaded:
+        raise RuntimeError('no stretch setup logged for {0}'.format(geo))
+    deformers = [x for x in cmds.ls(setup.log['nodes']) if cmds.objectType(x) in ('ffd', 'skinCluster')]
+    root = setup.meta.get('nodes', {}).get('root')
+    return deformers, [root] if root and cmds.objExists(root) else []
+
+
+def swap_to_cache(geo, info):
+    # info is what bake() returned
+    if not cmds.pluginInfo(PLUGIN, q=1, loaded=1):
+        cmds.loadPlugin(PLUGIN)
+    logger = lib.Logger(cache_logger_name(geo))
+    deformers, hidden = live_nodes(geo)
+    for node in deformers:
+        logger.set_attr(node + '.nodeState', 1)
+    for node in hidden:
+        logger.set_attr(node + '.visibility', 0)
+    node = str(logger.deformer(geo, type=NODE_TYPE, n=batch._safe_name(geo) + '_stretchCache')[0])
+    cmds.setAttr(node + '.cachePath', info['path'], type='string')
+    cmds.setAttr(node + '.startFrame', info['start'])
+    cmds.setAttr(node + '.frameStep', info['step'])
+    cmds.connectAttr('time1.outTime', node + '.time')
+    logger.meta['params'] = {'geo': str(geo)}
+    logger.meta['nodes'] = {'cache': node}
+    logger.meta['cache'] = info
+    logger.dump()
+    return node
+
+
+def restore_live(geo, remove_file=False):
+    logger = lib.Logger(cache_logger_name(geo))
+    if not logger.load():
+        return False
+    path = logger.meta.get('cache', {}).get('path')
+    logger.undo()
+    if remove_file and path and os.path.exists(path):
+        os.remove(path)
+    return True
+
+
+def time_playback(geo, start, end, step=1.0):
+    # seconds per frame to evaluate the mesh while stepping the timeline
+    shape = (cmds.listRelatives(geo, s=1) or [geo])[0]
+    current = cmds.currentTime(q=1)
+    frames = np.arange(start, end + step * 0.5, step)
+    begin = time.perf_counter()
+    try:
+        for frame in frames:
+            cmds.currentTime(frame, update=True)
+            cmds.dgeval(shape + '.outMesh')
+    finally:
+        cmds.currentTime(current)
+    return (time.perf_counter() - begin) / len(frames)
+
+
+def bake_and_swap(geo, start, end, path=None, step=1.0):
+    # bake, swap, and the numbers: cache size and live against cached playback
+    live = time_playback(geo, start, end, step)
+    info = bake(geo, start, end, path, step)
+    swap_to_cache(geo, info)
+    cached = time_playback(geo, start, end, step)
+    info.update({'mb': info['bytes'] / 1e6, 'live_frame_s': live, 'cache_frame_s': cached,
+                 'speedup': live / max(cached, 1e-9)})
+    return info
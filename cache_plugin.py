@@ -0,0 +1,77 @@
+import numpy as np
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+
+# playback side of cache.py: a deformer that copies one frame of a baked .npy vertex cache onto the mesh
+# the cache is opened memory mapped, only the pages of the frames actually played get read
+# load with cmds.loadPlugin(<path to this file>), cache.swap_to_cache does it
+
+
+def maya_useNewAPI():
+    pass
+
+
+class StretchCacheDeformer(oma.MPxDeformerNode):
+    type_name = 'stretchCacheDeformer'
+    # local / in-house id range
+    type_id = om.MTypeId(0x0007F0C0)
+
+    cache_path = None
+    start_frame = None
+    frame_step = None
+    time = None
+
+    def __init__(self):
+        super(StretchCacheDeformer, self).__init__()
+        self._path = None
+        self._cache = None
+
+    @classmethod
+    def creator(cls):
+        return cls()
+
+    @classmethod
+    def initialize(cls):
+        typed = om.MFnTypedAttribute()
+        cls.cache_path = typed.create('cachePath', 'cp', om.MFnData.kString)
+        numeric = om.MFnNumericAttribute()
+        cls.start_frame = numeric.create('startFrame', 'sf', om.MFnNumericData.kDouble, 1.0)
+        cls.frame_step = numeric.create('frameStep', 'fs', om.MFnNumericData.kDouble, 1.0)
+        cls.time = om.MFnUnitAttribute().create('time', 'tm', om.MFnUnitAttribute.kTime, 1.0)
+
+        output = oma.MPxGeometryFilter.outputGeom
+        for attr in [cls.cache_path, cls.start_frame, cls.frame_step, cls.time]:
+            cls.addAttribute(attr)
+            cls.attributeAffects(attr, output)
+
+    def deform(self, data, geo_iter, matrix, index):
+        path = data.inputValue(self.cache_path).asString()
+        if path != self._path:
+            self._cache = np.load(path, mmap_mode='r') if path else None
+            self._path = path
+        if self._cache is None:
+            return
+
+        envelope = data.inputValue(oma.MPxGeometryFilter.envelope).asFloat()
+        if envelope == 0.0:
+            return
+        frame = data.inputValue(self.time).asTime().asUnits(om.MTime.uiUnit())
+        start = data.inputValue(self.start_frame).asDouble()
+        step = data.inputValue(self.frame_step).asDouble() or 1.0
+        i = min(max(int(round((frame - start) / step)), 0), len(self._cache) - 1)
+
+        points = np.asarray(self._cache[i], dtype=float)
+        if envelope < 1.0:
+            current = np.array([[p.x, p.y, p.z] for p in geo_iter.allPositions()])
+            points = current + (points - current) * envelope
+        geo_iter.setAllPositions(om.MPointArray(points.tolist()))
+
+
+def initializePlugin(obj):
+    om.MFnPlugin(obj, 'stretch_deformer', '1.0').registerNode(
+        StretchCacheDeformer.type_name, StretchCacheDeformer.type_id, StretchCacheDeformer.creator,
+        StretchCacheDeformer.initialize, om.MPxNode.kDeformerNode)
+
+
+def uninitializePlugin(obj):
+    om.MFnPlugin(obj).deregisterNode(StretchCacheDeformer.type_id)
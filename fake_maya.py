@@ -0,0 +1,1445 @@
+import fnmatch
+import importlib.util
+import os
+import pickle
+import re
+import sys
+import types
+import uuid as uuid_module
+from collections import Counter
+
+# in-memory stand-in for the part of maya.cmds / pymel.core / OpenMaya 2.0 that lib and stretch_deformer use
+# install() puts it in sys.modules so both modules import and run on a plain python with numpy
+# transforms only carry translate and scale into world space, nothing gets evaluated
+
+_aliases = {"t": "translate", "r": "rotate", "s": "scale", "v": "visibility",
+            "tx": "translateX", "ty": "translateY", "tz": "translateZ",
+            "rx": "rotateX", "ry": "rotateY", "rz": "rotateZ",
+            "sx": "scaleX", "sy": "scaleY", "sz": "scaleZ",
+            "rp": "rotatePivot", "sp": "scalePivot", "wm": "worldMatrix", "ws": "worldSpace"}
+_compounds = ["translate", "rotate", "scale", "rotatePivot", "scalePivot", "localPosition", "worldPosition",
+              "input1", "input2", "output", "color1", "color2", "outputR"]
+_static = set(_compounds) | set(x + a for x in _compounds for a in "XYZ") | {
+    "visibility", "worldMatrix", "worldSpace", "controlPoints", "inputCurve", "arcLength", "operation",
+    "floatA", "floatB", "outFloat", "envelope", "nodeState", "inMesh", "outMesh", "latticeInput",
+    "latticeOutput", "outputGeometry", "input", "matrix", "target", "inCurve", "constraintTranslate",
+    "constraintRotate", "baseLatticeMatrix", "deformedLatticeMatrix", "deformedLatticePoints",
+    "dagSetMembers", "dnSetMembers", "message", "stretch", "caching", "frozen"}
+_defaults = {"scaleX": 1.0, "scaleY": 1.0, "scaleZ": 1.0, "visibility": True, "envelope": 1.0}
+_dag_types = {"transform", "joint", "locator", "nurbsCurve", "mesh", "lattice", "baseLattice", "ikHandle",
+              "ikEffector", "parentConstraint", "pointConstraint", "orientConstraint"}
+_shape_types = {"locator", "nurbsCurve", "mesh", "lattice", "baseLattice"}
+_attr_re = re.compile(r"^(\w+)((?:\[\d+\])?)$")
+
+scene = None
+_plugins = set()
+
+
+def _canonical(attr):
+    match = _attr_re.match(attr)
+    if not match:
+        return attr
+    return _aliases.get(match.group(1), match.group(1)) + match.group(2)
+
+
+def _flatten(args):
+    res = []
+    for x in args:
+        if isinstance(x, (list, tuple)):
+            res.extend(_flatten(x))
+        elif x is not None:
+            res.append(str(x))
+    return res
+
+
+class Node(object):
+    def __init__(self, name, node_type, parent=None):
+        self.name = name
+        self.type = node_type
+        self.parent = parent
+        self.children = []
+        self.values = {}
+        self.flags = {}
+        self.dynamic = {}
+        self.data = {}
+        self.uuid = str(uuid_module.uuid4()).upper()
+        self.alive = True
+        # plugs of this node that have an incoming / outgoing connection
+        self.in_plugs = set()
+        self.out_plugs = set()
+        if parent is not None:
+            parent.children.append(self)
+
+    @property
+    def is_dag(self):
+        return self.type in _dag_types
+
+    def long_name(self):
+        if not self.is_dag:
+            return self.name
+        parts = []
+        node = self
+        while node is not None:
+            parts.append(node.name)
+            node = node.parent
+        return "|" + "|".join(reversed(parts))
+
+    def has_attr(self, attr):
+        base = attr.split("[", 1)[0]
+        return base in self.dynamic or base in _static or base in self.values
+
+    def get(self, attr):
+        if attr in _compounds:
+            return tuple(self.values.get(attr + a, _defaults.get(attr + a, 0.0)) for a in "XYZ")
+        return self.values.get(attr, _defaults.get(attr, 0.0))
+
+    def set(self, attr, values):
+        if attr in _compounds:
+            for a, val in zip("XYZ", values):
+                self.values[attr + a] = val
+        else:
+            self.values[attr] = values[0] if len(values) == 1 else list(values)
+
+    def world(self):
+        # (scale, translate), enough for the positions this tool queries
+        scale = list(self.get("scale"))
+        trans = list(self.get("translate"))
+        if self.parent is not None:
+            p_scale, p_trans = self.parent.world()
+            trans = [p_trans[i] + p_scale[i] * trans[i] for i in range(3)]
+            scale = [p_scale[i] * scale[i] for i in range(3)]
+        return scale, trans
+
+    def shapes(self):
+        return [x for x in self.children if x.type in _shape_types]
+
+
+class Scene(object):
+    def __init__(self):
+        self.nodes = {}
+        self.by_uuid = {}
+        self.inputs = {}
+        self.outputs = {}
+        self.selection = []
+        self.counters = Counter()
+        self.calls = Counter()
+        self.warnings = []
+        self.time = 1.0
+        self.path = ""
+        # only undoable plugin commands land here, plain cmds edits are not undoable in the fake
+        self.undo_queue = []
+        self.redo_queue = []
+        # default scene node, drives time dependent plugs like maya's own
+        self.add("time", "time1")
+
+    # nodes
+
+    def unique_name(self, name):
+        if name not in self.nodes:
+            return name
+        base = name.rstrip("0123456789") or name
+        while True:
+            self.counters[base] += 1
+            candidate = "{0}{1}".format(base, self.counters[base])
+            if candidate not in self.nodes:
+                return candidate
+
+    def add(self, node_type, name=None, parent=None):
+        name = self.unique_name(name or node_type + "1")
+        node = Node(name, node_type, parent)
+        self.nodes[name] = node
+        self.by_uuid[node.uuid] = node
+        return node
+
+    def revive(self, node):
+        # puts a removed node back under its old parent, modifier redo needs the same node
+        node.name = self.unique_name(node.name)
+        node.alive = True
+        self.nodes[node.name] = node
+        self.by_uuid[node.uuid] = node
+        if node.parent is not None:
+            node.parent.children.append(node)
+
+    def find(self, name):
+        name = str(name)
+        node = self.nodes.get(name.split("|")[-1])
+        if node is None:
+            node = self.by_uuid.get(name)
+        return node
+
+    def node(self, name):
+        node = self.find(name)
+        if node is None:
+            raise ValueError("No object matches name: {0}".format(name))
+        return node
+
+    def plug(self, plug):
+        node, attr = str(plug).split(".", 1)
+        return self.node(node), _canonical(attr)
+
+    def rename(self, node, name):
+        del self.nodes[node.name]
+        node.name = self.unique_name(name)
+        self.nodes[node.name] = node
+
+    def remove(self, node):
+        for child in list(node.children):
+            self.remove(child)
+        for key in list(node.in_plugs):
+            self.disconnect(self.inputs[key], key)
+        for key in list(node.out_plugs):
+            for dst in list(self.outputs.get(key, ())):
+                self.disconnect(key, dst)
+        if node.parent is not None:
+            node.parent.children.remove(node)
+        node.alive = False
+        self.nodes.pop(node.name, None)
+        self.by_uuid.pop(node.uuid, None)
+        if node in self.selection:
+            self.selection.remove(node)
+
+    def reparent(self, node, parent):
+        scale, trans = node.world()
+        if node.parent is not None:
+            node.parent.children.remove(node)
+        node.parent = parent
+        if parent is not None:
+            parent.children.append(node)
+            p_scale, p_trans = parent.world()
+            trans = [(trans[i] - p_trans[i]) / (p_scale[i] or 1.0) for i in range(3)]
+        node.set("translate", trans)
+
+    # connections
+
+    def connect(self, src, dst):
+        old = self.inputs.get(dst)
+        if old is not None:
+            self.disconnect(old, dst)
+        self.inputs[dst] = src
+        self.outputs.setdefault(src, set()).add(dst)
+        dst[0].in_plugs.add(dst)
+        src[0].out_plugs.add(src)
+
+    def disconnect(self, src, dst):
+        if self.inputs.get(dst) != src:
+            raise RuntimeError("{0} is not connected to {1}".format(src, dst))
+        del self.inputs[dst]
+        dst[0].in_plugs.discard(dst)
+        self.outputs[src].discard(dst)
+        if not self.outputs[src]:
+            del self.outputs[src]
+            src[0].out_plugs.discard(src)
+
+
+def _plug_name(plug):
+    return "{0}.{1}".format(plug[0].name, plug[1])
+
+
+class Cmds(object):
+    # method names and flags follow maya.cmds, only the flags used in this repo are understood
+    def __init__(self, scn):
+        self.scene = scn
+
+    def objExists(self, name):
+        name = str(name)
+        if "." in name:
+            node_name, attr = name.split(".", 1)
+            node = self.scene.find(node_name)
+            return node is not None and node.has_attr(_canonical(attr))
+        return self.scene.find(name) is not None
+
+    def ls(self, *args, **kwargs):
+        sn = self.scene
+        if kwargs.get("sl") or kwargs.get("selection"):
+            nodes = list(sn.selection)
+        else:
+            nodes = []
+            for name in _flatten(args):
+                if "." in name:
+                    if self.objExists(name):
+                        node_name, attr = name.split(".", 1)
+                        nodes.append((sn.find(node_name), _canonical(attr)))
+                elif "*" in name or "?" in name:
+                    nodes.extend(sn.nodes[x] for x in fnmatch.filter(list(sn.nodes), name))
+                else:
+                    node = sn.find(name)
+                    if node is not None:
+                        nodes.append(node)
+        node_type = kwargs.get("type")
+        res = []
+        for x in nodes:
+            if isinstance(x, tuple):
+                res.append(_plug_name(x))
+                continue
+            if node_type and x.type != node_type:
+                continue
+            if kwargs.get("uuid"):
+                res.append(x.uuid)
+            elif kwargs.get("long") or kwargs.get("l"):
+                res.append(x.long_name())
+            else:
+                res.append(x.name)
+        return res
+
+    def createNode(self, node_type, n=None, name=None, p=None, parent=None, **kwargs):
+        sn = self.scene
+        parent = p or parent
+        parent = sn.node(parent) if parent else None
+        if node_type in _shape_types and parent is None:
+            parent = sn.add("transform", n or name)
+            node = sn.add(node_type, parent.name + "Shape", parent)
+        else:
+            node = sn.add(node_type, n or name, parent)
+        return node.name
+
+    def spaceLocator(self, n=None, name=None, p=None, position=None, **kwargs):
+        sn = self.scene
+        node = sn.add("transform", n or name or "locator1")
+        shape = sn.add("locator", node.name + "Shape", node)
+        shape.set("localPosition", list(p or position or (0.0, 0.0, 0.0)))
+        sn.selection = [node]
+        return [node.name]
+
+    def curve(self, d=3, degree=None, p=None, point=None, k=None, n=None, name=None, **kwargs):
+        sn = self.scene
+        node = sn.add("transform", n or name or "curve1")
+        shape = sn.add("nurbsCurve", node.name + "Shape", node)
+        shape.data["cvs"] = [list(x) for x in (p or point or [])]
+        shape.data["degree"] = degree or d
+        sn.selection = [node]
+        return node.name
+
+    def circle(self, n=None, name=None, **kwargs):
+        node = self.curve(d=3, p=[(1, 0, 0), (0, 0, 1), (-1, 0, 0), (0, 0, -1)], n=n or name or "nurbsCircle1")
+        make = self.scene.add("makeNurbCircle")
+        return [node, make.name]
+
+    def joint(self, p=None, position=None, n=None, name=None, **kwargs):
+        sn = self.scene
+        parent = sn.selection[0] if sn.selection and sn.selection[0].type in ("joint", "transform") else None
+        node = sn.add("joint", n or name or "joint1", parent)
+        pos = list(p or position or (0.0, 0.0, 0.0))
+        if parent is not None:
+            p_scale, p_trans = parent.world()
+            pos = [(pos[i] - p_trans[i]) / (p_scale[i] or 1.0) for i in range(3)]
+        node.set("translate", pos)
+        sn.selection = [node]
+        return node.name
+
+    def select(self, *args, **kwargs):
+        if kwargs.get("cl") or kwargs.get("clear"):
+            self.scene.selection = []
+            return
+        nodes = [self.scene.node(x) for x in _flatten(args)]
+        if kwargs.get("add"):
+            self.scene.selection.extend(nodes)
+        else:
+            self.scene.selection = nodes
+
+    def xform(self, *args, **kwargs):
+        sn = self.scene
+        name = _flatten(args)[0]
+        q = kwargs.get("q") or kwargs.get("query")
+        ws = kwargs.get("ws") or kwargs.get("worldSpace")
+        if q and ".vtx[" in name:
+            node = sn.node(name.split(".", 1)[0])
+            mesh = node if node.type == "mesh" else node.shapes()[0]
+            if not ws:
+                return [v for pt in mesh.data["points"] for v in pt]
+            scale, trans = node.world()
+            return [trans[i % 3] + scale[i % 3] * v for pt in mesh.data["points"] for i, v in enumerate(pt)]
+        node = sn.node(name)
+        if q:
+            if kwargs.get("m") or kwargs.get("matrix"):
+                scale, trans = node.world() if ws else (list(node.get("scale")), list(node.get("translate")))
+                return [scale[0], 0.0, 0.0, 0.0, 0.0, scale[1], 0.0, 0.0, 0.0, 0.0, scale[2], 0.0] + trans + [1.0]
+            if kwargs.get("t") or kwargs.get("translation"):
+                if ws:
+                    return node.world()[1]
+                return list(node.get("translate"))
+            return None
+        t = kwargs.get("t", kwargs.get("translation"))
+        if t is not None:
+            if ws and node.parent is not None:
+                p_scale, p_trans = node.parent.world()
+                t = [(t[i] - p_trans[i]) / (p_scale[i] or 1.0) for i in range(3)]
+            node.set("translate", list(t))
+
+    def parent(self, *args, **kwargs):
+        sn = self.scene
+        names = _flatten(args)
+        if kwargs.get("w") or kwargs.get("world"):
+            parent = None
+        else:
+            parent = sn.node(names.pop())
+        res = []
+        for name in names:
+            node = sn.node(name)
+            if node.parent is not parent:
+                sn.reparent(node, parent)
+            res.append(node.name)
+        return res
+
+    def group(self, *args, **kwargs):
+        sn = self.scene
+        grp = sn.add("transform", kwargs.get("n") or kwargs.get("name") or "group1")
+        for name in _flatten(args):
+            sn.reparent(sn.node(name), grp)
+        return grp.name
+
+    def duplicate(self, *args, **kwargs):
+        sn = self.scene
+        res = []
+
+        def copy(node, parent, name=None):
+            new = sn.add(node.type, name or node.name, parent)
+            new.values = dict(node.values)
+            new.data = dict(node.data)
+            for child in node.children:
+                copy(child, new)
+            return new
+
+        for name in _flatten(args):
+            node = sn.node(name)
+            res.append(copy(node, node.parent, kwargs.get("n") or kwargs.get("name")).name)
+        return res
+
+    def delete(self, *args, **kwargs):
+        sn = self.scene
+        for name in _flatten(args):
+            if "." in name:
+                continue
+            sn.remove(sn.node(name))
+
+    def rename(self, old, new):
+        node = self.scene.node(old)
+        self.scene.rename(node, new)
+        return node.name
+
+    def namespace(self, *args, **kwargs):
+        # add and moveNamespace only, a namespace is the name prefix before the last ':'
+        add = kwargs.get("add") or kwargs.get("addNamespace")
+        if add:
+            return add
+        src, dst = kwargs.get("moveNamespace") or kwargs.get("mv")
+        for node in [x for x in self.scene.nodes.values() if x.name.rpartition(":")[0] == src]:
+            self.scene.rename(node, dst + ":" + node.name.rpartition(":")[2])
+        return None
+
+    def makeIdentity(self, *args, **kwargs):
+        # world positions already stay put in this scene model
+        pass
+
+    def getAttr(self, attr, **kwargs):
+        node, attr = self.scene.plug(attr)
+        src = self.scene.inputs.get((node, attr))
+        if src is not None:
+            node, attr = src
+        val = node.get(attr)
+        if isinstance(val, tuple):
+            return [val]
+        return val
+
+    def setAttr(self, attr, *values, **kwargs):
+        node, attr = self.scene.plug(attr)
+        flags = node.flags.setdefault(attr, {})
+        for flag, keys in [("lock", ("lock", "l")), ("keyable", ("keyable", "k")), ("channelBox", ("channelBox", "cb"))]:
+            for key in keys:
+                if key in kwargs:
+                    flags[flag] = bool(kwargs[key])
+        if values:
+            if flags.get("lock"):
+                raise RuntimeError("The attribute '{0}' is locked".format(_plug_name((node, attr))))
+            node.set(attr, _flatten_values(values))
+
+    def addAttr(self, *args, **kwargs):
+        node = self.scene.node(_flatten(args)[0])
+        name = kwargs.get("ln") or kwargs.get("longName")
+        if name in node.dynamic:
+            raise RuntimeError("Found an attribute named '{0}' on {1}".format(name, node.name))
+        node.dynamic[name] = {"multi": bool(kwargs.get("m") or kwargs.get("multi"))}
+
+    def deleteAttr(self, *args, **kwargs):
+        target = _flatten(args)[0]
+        attr = kwargs.get("at") or kwargs.get("attribute")
+        if attr:
+            node = self.scene.node(target)
+        else:
+            node, attr = self.scene.plug(target)
+        node.dynamic.pop(attr, None)
+        for key in [x for x in node.values if x == attr or x.startswith(attr + "[")]:
+            del node.values[key]
+
+    def attributeQuery(self, attr, n=None, node=None, ex=False, exists=False, m=False, multi=False, **kwargs):
+        node = self.scene.find(n or node)
+        if ex or exists:
+            return node is not None and node.has_attr(attr)
+        if m or multi:
+            return node.dynamic.get(attr, {}).get("multi", False)
+        return None
+
+    def connectAttr(self, src, dst, f=False, force=False, **kwargs):
+        src = self.scene.plug(src)
+        dst = self.scene.plug(dst)
+        if dst in self.scene.inputs and not (f or force):
+            raise RuntimeError("{0} already has an incoming connection".format(_plug_name(dst)))
+        self.scene.connect(src, dst)
+
+    def disconnectAttr(self, src, dst, **kwargs):
+        self.scene.disconnect(self.scene.plug(src), self.scene.plug(dst))
+
+    def isConnected(self, src, dst):
+        return self.scene.inputs.get(self.scene.plug(dst)) == self.scene.plug(src)
+
+    def listConnections(self, *args, **kwargs):
+        sn = self.scene
+        source = kwargs.get("s", kwargs.get("source", True))
+        dest = kwargs.get("d", kwargs.get("destination", True))
+        with_plugs = kwargs.get("p") or kwargs.get("plugs")
+        pairs = kwargs.get("c") or kwargs.get("connections")
+        node_type = kwargs.get("type") or kwargs.get("t")
+        res = []
+        for name in _flatten(args):
+            if "." in name:
+                node, attr = sn.plug(name)
+                match = lambda plug: plug[0] is node and (plug[1] == attr or plug[1].startswith(attr + "["))
+            else:
+                node = sn.node(name)
+                match = lambda plug: plug[0] is node
+            found = []
+            if source:
+                found.extend((dst, sn.inputs[dst]) for dst in sorted(node.in_plugs, key=_plug_name) if match(dst))
+            if dest:
+                found.extend((src, dst) for src in sorted(node.out_plugs, key=_plug_name) if match(src)
+                             for dst in sorted(sn.outputs[src], key=_plug_name))
+            for own, other in found:
+                if node_type and other[0].type != node_type:
+                    continue
+                if pairs:
+                    res.append(_plug_name(own))
+                res.append(_plug_name(other) if with_plugs else other[0].name)
+        return res
+
+    def sets(self, *args, **kwargs):
+        # an objectSet of the given members, or add= them to one, wired like maya's:
+        # sets through message -> dnSetMembers, everything else through instObjGroups -> dagSetMembers
+        sn = self.scene
+        target = kwargs.get("add") or kwargs.get("addElement")
+        node = sn.node(target) if target else sn.add("objectSet", kwargs.get("n") or kwargs.get("name") or "set1")
+        for name in _flatten(args):
+            member = sn.node(name)
+            if member.type == "objectSet":
+                src, attr = (member, "message"), "dnSetMembers"
+            else:
+                src, attr = (member, "instObjGroups[0]"), "dagSetMembers"
+            index = len([x for x in node.in_plugs if x[1].startswith(attr + "[")])
+            sn.connect(src, (node, "{0}[{1}]".format(attr, index)))
+        return node.name
+
+    def listRelatives(self, *args, **kwargs):
+        node = self.scene.node(_flatten(args)[0])
+        if kwargs.get("p") or kwargs.get("parent"):
+            return [node.parent.name] if node.parent is not None else None
+        children = node.children
+        if kwargs.get("s") or kwargs.get("shapes"):
+            children = node.shapes()
+        return [x.name for x in children] or None
+
+    def objectType(self, name, **kwargs):
+        return self.scene.node(_flatten([name])[0]).type
+
+    def ikHandle(self, sj=None, ee=None, n=None, name=None, c=None, curve=None, **kwargs):
+        sn = self.scene
+        handle = sn.add("ikHandle", n or name or "ikHandle1")
+        end = sn.node(ee)
+        effector = sn.add("ikEffector", "effector1", end.parent)
+        handle.data["joints"] = [sn.node(sj), end]
+        crv = sn.find(c or curve)
+        if crv is not None:
+            shape = crv.shapes()[0] if crv.shapes() else crv
+            sn.connect((shape, "worldSpace[0]"), (handle, "inCurve"))
+        return [handle.name, effector.name]
+
+    def _constraint(self, kind, args, kwargs):
+        sn = self.scene
+        names = _flatten(args)
+        if kwargs.get("q") or kwargs.get("query"):
+            node = sn.node(names[0])
+            if kwargs.get("tl") or kwargs.get("targetList"):
+                return [x.name for x in node.data["targets"] if x.alive]
+            return None
+        obj = sn.node(names[-1])
+        targets = [sn.node(x) for x in names[:-1]]
+        existing = [x for x in obj.children if x.type == kind]
+        if kwargs.get("e") or kwargs.get("edit"):
+            if kwargs.get("rm") or kwargs.get("remove"):
+                for con in existing:
+                    con.data["targets"] = [x for x in con.data["targets"] if x not in targets]
+            return None
+        if existing:
+            con = existing[0]
+        else:
+            con = sn.add(kind, "{0}_{1}1".format(obj.name, kind), obj)
+            con.data["targets"] = []
+            sn.connect((con, "constraintTranslateX"), (obj, "translateX"))
+        for target in targets:
+            if target not in con.data["targets"]:
+                sn.connect((target, "worldMatrix[0]"), (con, "target[{0}]".format(len(con.data["targets"]))))
+                con.data["targets"].append(target)
+        return [con.name]
+
+    def parentConstraint(self, *args, **kwargs):
+        return self._constraint("parentConstraint", args, kwargs)
+
+    def pointConstraint(self, *args, **kwargs):
+        return self._constraint("pointConstraint", args, kwargs)
+
+    def orientConstraint(self, *args, **kwargs):
+        return self._constraint("orientConstraint", args, kwargs)
+
+    def lattice(self, *args, **kwargs):
+        sn = self.scene
+        geo = sn.node(_flatten(args)[0])
+        mesh = geo if geo.type == "mesh" else geo.shapes()[0]
+        scale, trans = geo.world()
+        pts = [[trans[i] + scale[i] * p[i] for i in range(3)] for p in mesh.data["points"]]
+        lo = [min(p[i] for p in pts) for i in range(3)]
+        hi = [max(p[i] for p in pts) for i in range(3)]
+
+        ffd = sn.add("ffd", kwargs.get("n") or kwargs.get("name"))
+        lattice = sn.add("transform", ffd.name + "Lattice")
+        lattice_shape = sn.add("lattice", lattice.name + "Shape", lattice)
+        lattice_shape.data["divisions"] = list(kwargs.get("divisions") or kwargs.get("dv") or (2, 5, 2))
+        base = sn.add("transform", ffd.name + "Base")
+        base_shape = sn.add("baseLattice", base.name + "Shape", base)
+        for node in [lattice, base]:
+            node.set("translate", [(lo[i] + hi[i]) / 2.0 for i in range(3)])
+            node.set("scale", [max(hi[i] - lo[i], 1e-6) for i in range(3)])
+        sn.connect((lattice_shape, "latticeOutput"), (ffd, "deformedLatticePoints"))
+        sn.connect((lattice_shape, "worldMatrix[0]"), (ffd, "deformedLatticeMatrix"))
+        sn.connect((base_shape, "worldMatrix[0]"), (ffd, "baseLatticeMatrix"))
+        sn.connect((ffd, "outputGeometry[0]"), (mesh, "inMesh"))
+        return [ffd.name, lattice.name, base.name]
+
+    def skinCluster(self, *args, **kwargs):
+        sn = self.scene
+        names = _flatten(args)
+        geo = sn.node(names[-1])
+        shape = geo.shapes()[0] if geo.shapes() else geo
+        skin = sn.add("skinCluster", kwargs.get("n") or kwargs.get("name"))
+        skin.data["influences"] = [sn.node(x) for x in names[:-1]]
+        skin.data["geometry"] = shape
+        for i, jnt in enumerate(skin.data["influences"]):
+            sn.connect((jnt, "worldMatrix[0]"), (skin, "matrix[{0}]".format(i)))
+        sn.connect((skin, "outputGeometry[0]"), (shape, "latticeInput" if shape.type == "lattice" else "inMesh"))
+        return [skin.name]
+
+    def undoInfo(self, *args, **kwargs):
+        return None
+
+    def undo(self, *args, **kwargs):
+        if self.scene.undo_queue:
+            cmd = self.scene.undo_queue.pop()
+            cmd.undoIt()
+            self.scene.redo_queue.append(cmd)
+
+    def redo(self, *args, **kwargs):
+        if self.scene.redo_queue:
+            cmd = self.scene.redo_queue.pop()
+            cmd.redoIt()
+            self.scene.undo_queue.append(cmd)
+
+    def refresh(self, *args, **kwargs):
+        return None
+
+    def evaluationManager(self, *args, **kwargs):
+        if kwargs.get("q") or kwargs.get("query"):
+            if kwargs.get("idleBuild"):
+                return self.scene.__dict__.setdefault("em_idle_build", True)
+            return [self.scene.__dict__.setdefault("em_mode", "parallel")]
+        if "mode" in kwargs:
+            self.scene.em_mode = kwargs["mode"]
+        if "idleBuild" in kwargs:
+            self.scene.em_idle_build = kwargs["idleBuild"]
+        if kwargs.get("invalidate"):
+            self.scene.em_invalidated = self.scene.__dict__.get("em_invalidated", 0) + 1
+        return None
+
+    def currentTime(self, *args, **kwargs):
+        if kwargs.get("q") or kwargs.get("query"):
+            return self.scene.time
+        if args:
+            self.scene.time = float(args[0])
+        return self.scene.time
+
+    def warning(self, *args, **kwargs):
+        self.scene.warnings.append(" ".join(str(x) for x in args))
+
+    def loadPlugin(self, path, **kwargs):
+        # python plugins get imported and initialized, their commands show up on maya.cmds
+        if path not in _plugins and path.endswith(".py"):
+            spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(path))[0], path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            module.initializePlugin(MObject())
+        _plugins.add(path)
+        return [path]
+
+    def pluginInfo(self, path, q=False, query=False, loaded=False, l=False, **kwargs):
+        return path in _plugins
+
+    def deformer(self, *args, **kwargs):
+        # plugin deformers only get wired in, nothing is computed
+        sn = self.scene
+        geo = sn.node(_flatten(args)[0])
+        mesh = geo if geo.type == "mesh" else geo.shapes()[0]
+        node = sn.add(kwargs.get("type") or kwargs.get("typ"), kwargs.get("n") or kwargs.get("name"))
+        src = sn.inputs.get((mesh, "inMesh"))
+        if src is not None:
+            sn.connect(src, (node, "input[0]"))
+        sn.connect((node, "outputGeometry[0]"), (mesh, "inMesh"))
+        return [node.name]
+
+    def dgeval(self, *args, **kwargs):
+        return None
+
+    def listAttr(self, *args, **kwargs):
+        node = self.scene.node(_flatten(args)[0])
+        if kwargs.get("ud") or kwargs.get("userDefined"):
+            return list(node.dynamic) or None
+        return sorted(set(node.values) | set(node.dynamic) | _static)
+
+    def file(self, *args, **kwargs):
+        # scene files are pickled Scene objects: open, new, rename, save and the scene name query
+        sn = self.scene
+        if kwargs.get("q") or kwargs.get("query"):
+            if kwargs.get("sn") or kwargs.get("sceneName"):
+                return sn.path
+            raise NotImplementedError("file query {0}".format(sorted(kwargs)))
+        if kwargs.get("new"):
+            _use_scene(Scene())
+            return ""
+        if kwargs.get("o") or kwargs.get("open"):
+            path = _flatten(args)[0]
+            with open(path, "rb") as f:
+                loaded = pickle.load(f)
+            loaded.path = path
+            loaded.calls = Counter()
+            _use_scene(loaded, MSceneMessage.kAfterOpen)
+            return path
+        if kwargs.get("rename") or kwargs.get("rn"):
+            sn.path = kwargs.get("rename") or kwargs.get("rn")
+            return sn.path
+        if kwargs.get("s") or kwargs.get("save"):
+            if not sn.path:
+                raise RuntimeError("Scene has no name, rename it before saving")
+            with open(sn.path, "wb") as f:
+                pickle.dump(sn, f, pickle.HIGHEST_PROTOCOL)
+            return sn.path
+        raise NotImplementedError("file flags {0}".format(sorted(kwargs)))
+
+
+def _flatten_values(values):
+    res = []
+    for x in values:
+        if isinstance(x, (list, tuple)):
+            res.extend(_flatten_values(x))
+        else:
+            res.append(x)
+    return res
+
+
+def create_mesh(name, points):
+    # polygon stand-in: a transform with a mesh shape holding object space points
+    sn = scene
+    node = sn.add("transform", name)
+    shape = sn.add("mesh", node.name + "Shape", node)
+    shape.data["points"] = [list(x) for x in points]
+    return node.name
+
+
+def _counted(prefix, name, func):
+    def wrapper(*args, **kwargs):
+        scene.calls[prefix + name] += 1
+        return func(*args, **kwargs)
+    wrapper.__name__ = name
+    return wrapper
+
+
+# pymel.core
+
+class Vector(list):
+    pass
+
+
+class PyNode(object):
+    def __new__(cls, name):
+        if isinstance(name, (PyNode, Attribute)):
+            return name
+        name = str(name)
+        if "." in name:
+            node, attr = scene.plug(name)
+            return Attribute(node, attr)
+        res = object.__new__(cls)
+        res._node = scene.node(name)
+        return res
+
+    def name(self):
+        return self._node.name
+
+    def __str__(self):
+        return self._node.name
+
+    def __repr__(self):
+        return "nt.{0}('{1}')".format(self._node.type, self._node.name)
+
+    def __eq__(self, other):
+        return isinstance(other, PyNode) and other._node is self._node
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._node)
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return Attribute(self._node, _canonical(attr))
+
+    def attr(self, attr):
+        return Attribute(self._node, _canonical(attr))
+
+    def getParent(self):
+        return _wrap(self._node.parent.name) if self._node.parent is not None else None
+
+    def inputs(self, type=None, p=False):
+        scene.calls["pm.listConnections"] += 1
+        return _wrap_list(_cmds.listConnections(self.name(), s=True, d=False, p=p, type=type))
+
+    def addAttr(self, attr, **kwargs):
+        scene.calls["pm.addAttr"] += 1
+        _cmds.addAttr(self.name(), ln=attr, **kwargs)
+
+    def getTargetList(self):
+        scene.calls["pm.parentConstraint"] += 1
+        return [_wrap(x.name) for x in self._node.data.get("targets", []) if x.alive]
+
+
+class Attribute(object):
+    def __init__(self, node, attr):
+        self._node = node
+        self._attr = attr
+
+    def name(self):
+        return "{0}.{1}".format(self._node.name, self._attr)
+
+    def __str__(self):
+        return self.name()
+
+    def __repr__(self):
+        return "Attribute('{0}')".format(self.name())
+
+    def __getitem__(self, idx):
+        return Attribute(self._node, "{0}[{1}]".format(self._attr, idx))
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return Attribute(self._node, "{0}.{1}".format(self._attr, attr))
+
+    def node(self):
+        return _wrap(self._node.name)
+
+    def get(self):
+        scene.calls["pm.getAttr"] += 1
+        return _pm.getAttr(self.name())
+
+    def set(self, *values, **kwargs):
+        scene.calls["pm.setAttr"] += 1
+        _pm.setAttr(self.name(), *values, **kwargs)
+
+    def __rshift__(self, other):
+        scene.calls["pm.connectAttr"] += 1
+        _pm.connectAttr(self.name(), str(other), f=True)
+
+    def inputs(self, p=False, type=None):
+        scene.calls["pm.listConnections"] += 1
+        return _wrap_list(_cmds.listConnections(self.name(), s=True, d=False, p=p, type=type))
+
+
+def _wrap(name):
+    return PyNode(name) if name is not None else None
+
+
+def _wrap_list(names):
+    return [PyNode(x) for x in names or []]
+
+
+def _unwrap(args):
+    if isinstance(args, (list, tuple)):
+        return type(args)(_unwrap(x) for x in args)
+    if isinstance(args, (PyNode, Attribute)):
+        return str(args)
+    return args
+
+
+class Pm(object):
+    def __init__(self):
+        self.dt = types.SimpleNamespace(Vector=Vector)
+        self.PyNode = PyNode
+        self.Attribute = Attribute
+
+    def _call(self, name, args, kwargs):
+        return getattr(_cmds, name)(*_unwrap(args), **dict((k, _unwrap(v)) for k, v in kwargs.items()))
+
+    def createNode(self, *args, **kwargs):
+        return _wrap(self._call("createNode", args, kwargs))
+
+    def curve(self, *args, **kwargs):
+        return _wrap(self._call("curve", args, kwargs))
+
+    def circle(self, *args, **kwargs):
+        return _wrap_list(self._call("circle", args, kwargs))
+
+    def spaceLocator(self, *args, **kwargs):
+        return _wrap(self._call("spaceLocator", args, kwargs)[0])
+
+    def joint(self, *args, **kwargs):
+        return _wrap(self._call("joint", args, kwargs))
+
+    def group(self, *args, **kwargs):
+        return _wrap(self._call("group", args, kwargs))
+
+    def skinCluster(self, *args, **kwargs):
+        return _wrap(self._call("skinCluster", args, kwargs)[0])
+
+    def parentConstraint(self, *args, **kwargs):
+        return self._constraint("parentConstraint", args, kwargs)
+
+    def pointConstraint(self, *args, **kwargs):
+        return self._constraint("pointConstraint", args, kwargs)
+
+    def orientConstraint(self, *args, **kwargs):
+        return self._constraint("orientConstraint", args, kwargs)
+
+    def _constraint(self, name, args, kwargs):
+        res = self._call(name, args, kwargs)
+        if isinstance(res, list) and not (kwargs.get("q") or kwargs.get("query")):
+            return _wrap(res[0])
+        return res
+
+    def duplicate(self, *args, **kwargs):
+        return _wrap_list(self._call("duplicate", args, kwargs))
+
+    def ikHandle(self, *args, **kwargs):
+        return _wrap_list(self._call("ikHandle", args, kwargs))
+
+    def lattice(self, *args, **kwargs):
+        return _wrap_list(self._call("lattice", args, kwargs))
+
+    def deformer(self, *args, **kwargs):
+        return _wrap_list(self._call("deformer", args, kwargs))
+
+    def ls(self, *args, **kwargs):
+        return _wrap_list(self._call("ls", args, kwargs))
+
+    def parent(self, *args, **kwargs):
+        if len(args) == 2 and args[1] is None:
+            args, kwargs = args[:1], dict(kwargs, w=True)
+        return _wrap_list(self._call("parent", args, kwargs))
+
+    def getAttr(self, *args, **kwargs):
+        res = self._call("getAttr", args, kwargs)
+        if isinstance(res, list) and len(res) == 1 and isinstance(res[0], tuple):
+            return Vector(res[0])
+        return res
+
+    def disconnectAttr(self, *args, **kwargs):
+        if len(args) == 1:
+            name = str(args[0])
+            pairs = (_cmds.listConnections(name, s=True, d=False, c=True, p=True) or [])
+            for dst, src in zip(pairs[0::2], pairs[1::2]):
+                _cmds.disconnectAttr(src, dst)
+            pairs = (_cmds.listConnections(name, s=False, d=True, c=True, p=True) or [])
+            for src, dst in zip(pairs[0::2], pairs[1::2]):
+                _cmds.disconnectAttr(src, dst)
+            return None
+        return self._call("disconnectAttr", args, kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._call(name, args, kwargs)
+
+
+# maya.api.OpenMaya / OpenMayaAnim
+
+class MFn(object):
+    kDagNode = 1
+    kMesh = 2
+    kLatticeComponent = 3
+    kTransform = 4
+
+
+class MObject(object):
+    kNullObj = None
+
+    def __init__(self, node=None):
+        self._node = node
+
+    def hasFn(self, kind):
+        if kind == MFn.kDagNode:
+            return self._node.is_dag
+        if kind == MFn.kMesh:
+            return self._node.type == "mesh"
+        if kind == MFn.kTransform:
+            return self._node.type in ("transform", "joint")
+        return False
+
+    def isNull(self):
+        return self._node is None
+
+
+class MUuid(object):
+    def __init__(self, value):
+        self._value = value
+
+    def asString(self):
+        return self._value
+
+
+class MDagPath(object):
+    def __init__(self, node):
+        self._node = node
+
+    def extendToShape(self):
+        shapes = self._node.shapes()
+        if shapes:
+            self._node = shapes[0]
+
+    def fullPathName(self):
+        return self._node.long_name()
+
+    def partialPathName(self):
+        return self._node.name
+
+    def node(self):
+        return MObject(self._node)
+
+
+class MSelectionList(object):
+    def __init__(self):
+        self._items = []
+
+    def add(self, name):
+        node = scene.find(str(name).split(".", 1)[0])
+        if node is None:
+            raise RuntimeError("(kInvalidParameter): Object does not exist")
+        self._items.append(node)
+
+    def length(self):
+        return len(self._items)
+
+    def getDependNode(self, idx):
+        return MObject(self._items[idx])
+
+    def getDagPath(self, idx):
+        return MDagPath(self._items[idx])
+
+
+class MObjectHandle(object):
+    def __init__(self, obj):
+        self._node = obj._node
+
+    def isValid(self):
+        return self._node is not None and self._node.alive
+
+    def isAlive(self):
+        return self.isValid()
+
+    def object(self):
+        return MObject(self._node)
+
+
+class MFnDependencyNode(object):
+    def __init__(self, obj=None):
+        self._node = obj._node if obj is not None else None
+
+    def name(self):
+        return self._node.name
+
+    def uuid(self):
+        return MUuid(self._node.uuid)
+
+    def typeName(self):
+        return self._node.type
+
+    def setName(self, name):
+        scene.rename(self._node, name)
+        return self._node.name
+
+    def findPlug(self, attr, want_networked=False):
+        return MPlug(self._node, _canonical(attr))
+
+
+class MPlug(object):
+    def __init__(self, node, attr):
+        self._node = node
+        self._attr = attr
+
+    def elementByLogicalIndex(self, idx):
+        return MPlug(self._node, "{0}[{1}]".format(self._attr, idx))
+
+    def key(self):
+        return self._node, self._attr
+
+
+class MFnDagNode(MFnDependencyNode):
+    def partialPathName(self):
+        return self._node.name
+
+    def fullPathName(self):
+        return self._node.long_name()
+
+
+class MIntArray(list):
+    pass
+
+
+class MDoubleArray(list):
+    pass
+
+
+class MFnTripleIndexedComponent(object):
+    def __init__(self, obj=None):
+        self._elements = obj._elements if obj is not None else []
+
+    def create(self, kind):
+        comp = MObject()
+        comp._elements = self._elements = []
+        return comp
+
+    def addElements(self, elements):
+        self._elements.extend(tuple(x) for x in elements)
+
+
+class MFnSkinCluster(object):
+    def __init__(self, obj):
+        self._node = obj._node
+
+    def influenceObjects(self):
+        return [MDagPath(x) for x in self._node.data["influences"]]
+
+    def setWeights(self, shape, components, influences, values, normalize=True, returnOldWeights=False):
+        count = len(influences)
+        weights = self._node.data.setdefault("weights", {})
+        for i, element in enumerate(components._elements):
+            weights[element] = dict(zip(influences, values[i * count:(i + 1) * count]))
+
+
+class MPoint(list):
+    def __init__(self, *args):
+        list.__init__(self, args[0] if len(args) == 1 else args[:3])
+
+
+class MPointArray(list):
+    pass
+
+
+class MFnNumericData(object):
+    kDouble = 1
+
+
+class MFnNumericAttribute(object):
+    def __init__(self, obj=None):
+        self._attr = obj._attr if obj is not None else None
+        self.keyable = False
+
+    def create(self, long_name, short_name, kind, default=0.0):
+        obj = MObject()
+        obj._attr = self._attr = {"name": long_name, "default": default}
+        return obj
+
+    def setMin(self, value):
+        self._attr["min"] = value
+
+    def setMax(self, value):
+        self._attr["max"] = value
+
+
+class MFnNurbsCurve(object):
+    kOpen = 1
+
+    def create(self, cvs, knots, degree, form, is_2d, rational, parent=None):
+        curve = {"cvs": [list(x)[:3] for x in cvs], "degree": degree, "knots": list(knots)}
+        if parent is not None and hasattr(parent, "_curve"):
+            parent._curve.update(curve)
+            return parent
+        shape = scene.add("nurbsCurve", "curveShape1", parent._node if parent is not None else None)
+        shape.data.update(curve)
+        return MObject(shape)
+
+
+class MFnNurbsCurveData(object):
+    def create(self):
+        obj = MObject()
+        obj._curve = {}
+        return obj
+
+
+class MDGModifier(object):
+    # nodes exist right away, everything else waits for doIt like maya's
+    # each op hands back its inverse, undoIt runs them backwards and drops the created nodes, doIt after that redoes
+    def __init__(self):
+        self._ops = []
+        self._done = []
+        self._created = []
+        self._undone = False
+
+    def createNode(self, node_type, parent=None):
+        node = scene.add(node_type, None, parent._node if parent is not None else None)
+        self._created.append(node)
+        return MObject(node)
+
+    def renameNode(self, obj, name):
+        def rename(node=obj._node):
+            old = node.name
+            scene.rename(node, name)
+            return lambda: scene.rename(node, old)
+        self._ops.append(rename)
+
+    def reparentNode(self, obj, parent=None):
+        def reparent(node=obj._node, new=parent._node if parent is not None else None):
+            # keeps the local transform, unlike cmds.parent
+            old = node.parent
+            _set_parent(node, new)
+            return lambda: _set_parent(node, old)
+        self._ops.append(reparent)
+
+    def newPlugValueBool(self, plug, value):
+        def set_value(node=plug._node, attr=plug._attr):
+            had, old = attr in node.values, node.values.get(attr)
+            node.set(attr, [value])
+            return lambda: node.values.__setitem__(attr, old) if had else node.values.pop(attr, None)
+        self._ops.append(set_value)
+
+    newPlugValueInt = newPlugValueDouble = newPlugValueBool
+
+    def newPlugValue(self, plug, data):
+        # curve data on a nurbsCurve's cached plug, the only data plug this repo sets
+        def set_data(node=plug._node):
+            old = dict(node.data)
+            node.data.update(data._curve)
+            return lambda: (node.data.clear(), node.data.update(old))
+        self._ops.append(set_data)
+
+    def connect(self, src, dst):
+        def connect(src=src.key(), dst=dst.key()):
+            old = scene.inputs.get(dst)
+            scene.connect(src, dst)
+
+            def disconnect():
+                scene.disconnect(src, dst)
+                if old is not None:
+                    scene.connect(old, dst)
+            return disconnect
+        self._ops.append(connect)
+
+    def addAttribute(self, obj, attr):
+        def add(node=obj._node, attr=attr._attr):
+            node.dynamic[attr["name"]] = {"multi": False}
+            node.values[attr["name"]] = attr["default"]
+            return lambda: (node.dynamic.pop(attr["name"]), node.values.pop(attr["name"], None))
+        self._ops.append(add)
+
+    def doIt(self):
+        if self._undone:
+            for node in self._created:
+                scene.revive(node)
+            ops = [op for op, inverse in self._done] + self._ops
+            self._done = []
+            self._undone = False
+        else:
+            ops = self._ops
+        self._ops = []
+        for op in ops:
+            self._done.append((op, op()))
+
+    def undoIt(self):
+        for op, inverse in reversed(self._done):
+            inverse()
+        for node in reversed(self._created):
+            if node.alive:
+                scene.remove(node)
+        self._undone = True
+
+
+class MDagModifier(MDGModifier):
+    pass
+
+
+def _set_parent(node, parent):
+    if node.parent is not None:
+        node.parent.children.remove(node)
+    node.parent = parent
+    if parent is not None:
+        parent.children.append(node)
+
+
+class MPxCommand(object):
+    def isUndoable(self):
+        return False
+
+
+class MPxNode(object):
+    kDeformerNode = 2
+
+
+class MTypeId(object):
+    def __init__(self, value):
+        self._value = value
+
+
+class MFnPlugin(object):
+    # commands run doIt and go on the scene's undo queue when undoable, nodes are only recorded, nothing computes them
+    def __init__(self, obj=None, vendor=None, version=None):
+        pass
+
+    def registerCommand(self, name, creator, syntax=None):
+        def run(*args, **kwargs):
+            cmd = creator()
+            cmd.doIt(args)
+            if cmd.isUndoable():
+                scene.undo_queue.append(cmd)
+                del scene.redo_queue[:]
+        setattr(sys.modules["maya.cmds"], name, _counted("cmds.", name, run))
+
+    def deregisterCommand(self, name):
+        delattr(sys.modules["maya.cmds"], name)
+
+    def registerNode(self, name, type_id, creator, initialize, kind=None):
+        pass
+
+    def deregisterNode(self, type_id):
+        pass
+
+
+class MSceneMessage(object):
+    # file new / open through cmds fire the matching callbacks
+    kAfterNew = 2
+    kAfterOpen = 6
+    _callbacks = {}
+
+    @classmethod
+    def addCallback(cls, message, func, client_data=None):
+        cid = len(cls._callbacks) + 1
+        cls._callbacks[cid] = (message, func, client_data)
+        return cid
+
+    @classmethod
+    def removeCallback(cls, cid):
+        cls._callbacks.pop(cid, None)
+
+    @classmethod
+    def _fire(cls, message):
+        for msg, func, client_data in list(cls._callbacks.values()):
+            if msg == message:
+                func(client_data)
+
+
+# PySide2 / OpenMayaUI, only what import time needs
+
+class _QtStub(object):
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+def _qt_module(name):
+    mod = types.ModuleType(name)
+    mod.__getattr__ = lambda attr: _QtStub
+    return mod
+
+
+class MQtUtil(object):
+    @staticmethod
+    def mainWindow():
+        return None
+
+
+_cmds = None
+_pm = None
+
+
+def _use_scene(scn, message=MSceneMessage.kAfterNew):
+    global scene
+    scene = scn
+    _cmds.scene = scn
+    MSceneMessage._fire(message)
+    return scn
+
+
+def new_scene():
+    # drops every node but keeps the installed modules, counters start again from zero
+    return _use_scene(Scene())
+
+
+def install():
+    global scene, _cmds, _pm
+    if "maya.cmds" in sys.modules and not getattr(sys.modules["maya.cmds"], "_fake", False):
+        raise RuntimeError("a real maya session is already loaded")
+    scene = Scene()
+    _cmds = Cmds(scene)
+    _pm = Pm()
+
+    cmds_mod = types.ModuleType("maya.cmds")
+    cmds_mod._fake = True
+    for name in dir(Cmds):
+        if not name.startswith("_"):
+            setattr(cmds_mod, name, _counted("cmds.", name, getattr(_cmds, name)))
+
+    pm_mod = types.ModuleType("pymel.core")
+    pm_mod.dt = _pm.dt
+    pm_mod.PyNode = PyNode
+    pm_mod.Attribute = Attribute
+    for name in dir(Pm):
+        if not name.startswith("_"):
+            setattr(pm_mod, name, _counted("pm.", name, getattr(_pm, name)))
+    pm_mod.__getattr__ = lambda name: _counted("pm.", name, getattr(_pm, name))
+
+    om_mod = types.ModuleType("maya.api.OpenMaya")
+    for cls in [MFn, MObject, MUuid, MDagPath, MSelectionList, MObjectHandle, MFnDependencyNode, MFnDagNode,
+                MIntArray, MDoubleArray, MFnTripleIndexedComponent, MSceneMessage, MPlug, MPoint, MPointArray,
+                MFnNumericData, MFnNumericAttribute, MFnNurbsCurve, MFnNurbsCurveData, MDGModifier, MDagModifier,
+                MPxCommand, MPxNode, MTypeId, MFnPlugin]:
+        setattr(om_mod, cls.__name__, cls)
+    oma_mod = types.ModuleType("maya.api.OpenMayaAnim")
+    oma_mod.MFnSkinCluster = MFnSkinCluster
+    oma_mod.MPxDeformerNode = oma_mod.MPxGeometryFilter = MPxNode
+    omui_mod = types.ModuleType("maya.OpenMayaUI")
+    omui_mod.MQtUtil = MQtUtil
+
+    maya_mod = types.ModuleType("maya")
+    api_mod = types.ModuleType("maya.api")
+    maya_mod.cmds = cmds_mod
+    maya_mod.api = api_mod
+    maya_mod.OpenMayaUI = omui_mod
+    api_mod.OpenMaya = om_mod
+    api_mod.OpenMayaAnim = oma_mod
+    pymel_mod = types.ModuleType("pymel")
+    pymel_mod.core = pm_mod
+
+    qt_mod = types.ModuleType("PySide2")
+    for name in ["QtWidgets", "QtGui", "QtCore"]:
+        sub = _qt_module("PySide2." + name)
+        setattr(qt_mod, name, sub)
+        sys.modules["PySide2." + name] = sub
+
+    shiboken_mod = types.ModuleType("shiboken2")
+    shiboken_mod.wrapInstance = lambda ptr, cls: cls()
+
+    sys.modules.update({"maya": maya_mod, "maya.cmds": cmds_mod, "maya.api": api_mod,
+                        "maya.api.OpenMaya": om_mod, "maya.api.OpenMayaAnim": oma_mod,
+                        "maya.OpenMayaUI": omui_mod, "pymel": pymel_mod, "pymel.core": pm_mod,
+                        "PySide2": qt_mod, "shiboken2": shiboken_mod})
+    return scene
@@ -0,0 +1,77 @@
+import numpy as np
+from math import comb
+
+import geometry
+
+# offline evaluation of maya's ffd (local off): trivariate bernstein volume over the lattice base box
+# inputs are plain arrays, so previews, division checks and golden tests run without maya
+#   points         (n, 3) world positions of the undeformed mesh
+#   base_matrix    world matrix of the ffd base transform, xform -m order, defines the undeformed lattice box
+#   divisions      (s, t, u) as passed to set_lattice
+#   lattice_points deformed lattice points in world space, (s, t, u, 3) or flat in lattice pt[s][t][u] order
+# bernstein weights sum to one, so world space gives the same result as maya evaluating in lattice space
+
+
+def bernstein(degree, t):
+    # (len(t), degree + 1) basis values
+    t = np.asarray(t, dtype=float)[:, np.newaxis]
+    i = np.arange(degree + 1)
+    coef = np.array([comb(degree, k) for k in i], dtype=float)
+    return coef * t ** i * (1.0 - t) ** (degree - i)
+
+
+def grid_from_flat(points, divisions):
+    # inverse of geometry.flat_lattice
+    s, t, u = (int(x) for x in divisions)
+    return np.asarray(points, dtype=float).reshape(u, t, s, 3).transpose(2, 1, 0, 3)
+
+
+def lattice_params(points, base_matrix):
+    # stu coordinates of points, 0..1 inside the lattice box
+    matrix = np.asarray(base_matrix, dtype=float).reshape(4, 4)
+    inverse = np.linalg.inv(matrix)
+    return np.asarray(points, dtype=float) @ inverse[:3, :3] + inverse[3, :3] + 0.5
+
+
+def deform(points, base_matrix, divisions, lattice_points, chunk=65536, outside=False):
+    # one vectorized pass per chunk of points, peak memory is about chunk * (s + t + u + s * t) * 3 floats
+    # outside False leaves points beyond the lattice box where they are, like the ffd's default outsideLattice
+    points = np.asarray(points, dtype=float)
+    grid = np.asarray(lattice_points, dtype=float)
+    if grid.ndim == 2:
+        grid = grid_from_flat(grid, divisions)
+    s, t, u = grid.shape[:3]
+    params = lattice_params(points, base_matrix)
+    flat = grid.transpose(2, 0, 1, 3).reshape(u, -1)
+
+    res = points.copy()
+    for start in range(0, len(points), chunk):
+        stu = params[start:start + chunk]
+        if outside:
+            sel = slice(None)
+        else:
+            sel = np.all((stu >= -1e-9) & (stu <= 1.0 + 1e-9), axis=1)
+            if not sel.any():
+                continue
+            stu = stu[sel]
+        bs = bernstein(s - 1, stu[:, 0])
+        bt = bernstein(t - 1, stu[:, 1])
+        bu = bernstein(u - 1, stu[:, 2])
+        # contract u with one matmul into (c, s, t, 3), then t and s
+        tmp = (bu @ flat).reshape(-1, s, t, 3)
+        tmp = np.einsum('ct,cstd->csd', bt, tmp)
+        res[start:start + chunk][sel] = np.einsum('cs,csd->cd', bs, tmp)
+    return res
+
+
+def rest_lattice(base_matrix, divisions):
+    # undeformed lattice points, deform() with these returns the points unchanged
+    return geometry.lattice_grid(base_matrix, divisions)
+
+
+def deviation(points, reference):
+    # distance stats between two deformations of the same mesh, e.g. the preview against the live ffd result
+    dist = np.linalg.norm(np.asarray(points, dtype=float) - np.asarray(reference, dtype=float), axis=1)
+    return {"max": float(dist.max()) if len(dist) else 0.0,
+            "mean": float(dist.mean()) if len(dist) else 0.0,
+            "rms": float(np.sqrt((dist ** 2).mean())) if len(dist) else 0.0}
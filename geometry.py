@@ -0,0 +1,157 @@
+import numpy as np
+
+
+def _blossom(cvs, u):
+    # polar form of a cubic bezier: de casteljau with its own parameter on every level
+    pts = np.repeat(cvs[np.newaxis], len(u), axis=0)
+    for level in range(u.shape[1]):
+        t = u[:, level, np.newaxis, np.newaxis]
+        pts = (1.0 - t) * pts[:, :-1] + t * pts[:, 1:]
+    return pts[:, 0]
+
+
+def bezier_points(cvs, params):
+    cvs = np.asarray(cvs, dtype=float)
+    params = np.asarray(params, dtype=float)
+    return _blossom(cvs, np.repeat(params[:, np.newaxis], len(cvs) - 1, axis=1))
+
+
+def rebuild_cvs(cvs, spans):
+    # same cvs rebuildCurve(rt=0, s=spans) gives for a single cubic span, the bezier is exact in the new knot space
+    cvs = np.asarray(cvs, dtype=float)
+    knots = np.concatenate([[0.0, 0.0], np.linspace(0.0, 1.0, spans + 1), [1.0, 1.0]])
+    idx = np.arange(spans + 3)[:, np.newaxis] + np.arange(3)
+    return _blossom(cvs, knots[idx])
+
+
+def stretch_curve_cvs(p_up, p_down):
+    p_up = np.asarray(p_up, dtype=float)
+    p_down = np.asarray(p_down, dtype=float)
+    return np.array([p_up, p_up, p_down, p_down])
+
+
+def arc_length_params(cvs, count, samples=256):
+    t = np.linspace(0.0, 1.0, samples * max(count - 1, 1) + 1)
+    pts = bezier_points(cvs, t)
+    length = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(pts, axis=0), axis=1))])
+    if length[-1] == 0.0:
+        return np.linspace(0.0, 1.0, count)
+    return np.interp(np.linspace(0.0, length[-1], count), length, t)
+
+
+def bezier_length(cvs, samples=256):
+    pts = bezier_points(cvs, np.linspace(0.0, 1.0, samples + 1))
+    return float(np.linalg.norm(np.diff(pts, axis=0), axis=1).sum())
+
+
+def spline_joint_positions(p_up, p_down, j_num, spacing="parameter"):
+    # j_num + 1 positions from loc_up to loc_down
+    # "parameter" matches the old rebuildCurve + cv delete result, "arc_length" spaces joints evenly along the curve
+    cvs = stretch_curve_cvs(p_up, p_down)
+    if spacing == "parameter":
+        rebuilt = rebuild_cvs(cvs, j_num)
+        keep = [0] + list(range(2, j_num + 1)) + [j_num + 2]
+        return rebuilt[keep]
+    if spacing == "arc_length":
+        return bezier_points(cvs, arc_length_params(cvs, j_num + 1))
+    raise ValueError("unknown spacing '{0}'".format(spacing))
+
+
+def squash_profile(count, falloff=0.0):
+    # squash exponent per joint, -0.5 keeps volume for a uniform stretch
+    # falloff 0..1 eases the squash towards both chain ends, 1 leaves the end joints unsquashed
+    t = np.linspace(-1.0, 1.0, count) if count > 1 else np.zeros(1)
+    weights = 1.0 - falloff * t ** 2
+    return np.round(-0.5 * weights, 6)
+
+
+def squash_groups(profile):
+    # distinct exponents with the joint indices that share them, in first use order
+    groups = {}
+    for i, exponent in enumerate(np.asarray(profile, dtype=float).tolist()):
+        groups.setdefault(exponent, []).append(i)
+    return list(groups.items())
+
+
+def auto_divisions(points, p_up, p_down, j_num, quality=1.0, max_points=512):
+    # lattice divisions for points (n, 3 world positions), one lattice row per joint along the spline axis at quality 1
+    # cells are kept roughly cubic, never finer than the vertex spacing, and the point count stays under max_points
+    points = np.asarray(points, dtype=float)
+    extent = np.maximum(points.max(axis=0) - points.min(axis=0), 1e-6)
+    axis = int(np.argmax(np.abs(np.asarray(p_down, dtype=float) - np.asarray(p_up, dtype=float))))
+
+    faces = extent[0] * extent[1] + extent[1] * extent[2] + extent[2] * extent[0]
+    spacing = np.sqrt(2.0 * faces / max(len(points), 1))
+    density_cap = np.maximum(np.ceil(extent / spacing).astype(int) + 1, 2)
+
+    divisions = np.empty(3, dtype=int)
+    divisions[axis] = max(int(round(quality * j_num)) + 1, 2)
+    cell = extent[axis] / (divisions[axis] - 1)
+    for i in range(3):
+        if i != axis:
+            divisions[i] = int(round(extent[i] / cell)) + 1
+    divisions = np.clip(divisions, 2, density_cap)
+
+    # over budget: thin the cross axes first, the spline axis only when they are already at 2
+    while divisions.prod() > max_points:
+        cross = [i for i in range(3) if i != axis and divisions[i] > 2]
+        if cross:
+            i = max(cross, key=lambda x: divisions[x])
+        elif divisions[axis] > 2:
+            i = axis
+        else:
+            break
+        divisions[i] -= 1
+
+    count = int(divisions.prod())
+    # ffd without local mode weighs every lattice point for every vertex
+    return {"divisions": tuple(int(x) for x in divisions),
+            "points": count,
+            "cost": count * len(points)}
+
+
+def lattice_grid(matrix, divisions):
+    # undeformed lattice points in world space, (s, t, u, 3), from the lattice transform world matrix (xform -m order)
+    # lattice shapes keep their points in the -0.5..0.5 unit cube
+    axes = [np.linspace(-0.5, 0.5, int(d)) for d in divisions]
+    local = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1)
+    matrix = np.asarray(matrix, dtype=float).reshape(4, 4)
+    return local @ matrix[:3, :3] + matrix[3, :3]
+
+
+def flat_lattice(grid):
+    # s fastest, then t, then u, same order as the lattice pt[s][t][u] flat index
+    return grid.transpose(2, 1, 0, 3).reshape(-1, 3)
+
+
+def chain_weights(points, joints, max_influences=2, falloff=0.5):
+    # (n points, m joints) weights, every point projected on the chain segments in one pass
+    # joint i owns the segment up to joint i + 1 and fades out over falloff * average segment length past its ends
+    points = np.asarray(points, dtype=float)
+    joints = np.asarray(joints, dtype=float)
+    count = len(joints)
+    if count == 1:
+        return np.ones((len(points), 1))
+
+    start = joints[:-1]
+    seg = joints[1:] - start
+    seg_len = np.linalg.norm(seg, axis=1)
+    to_point = points[:, np.newaxis, :] - start[np.newaxis]
+    t = np.clip((to_point * seg).sum(axis=2) / np.maximum(seg_len ** 2, 1e-12), 0.0, 1.0)
+    dist = np.linalg.norm(to_point - t[..., np.newaxis] * seg, axis=2)
+    nearest = dist.argmin(axis=1)
+
+    cum = np.concatenate([[0.0], np.cumsum(seg_len)])
+    param = cum[nearest] + t[np.arange(len(points)), nearest] * seg_len[nearest]
+    lo = cum
+    hi = np.append(cum[1:], cum[-1])
+    gap = np.maximum(np.maximum(lo - param[:, np.newaxis], param[:, np.newaxis] - hi), 0.0)
+
+    radius = max(falloff * seg_len.mean(), 1e-6)
+    x = np.clip(1.0 - gap / radius, 0.0, 1.0)
+    weights = x * x * (3.0 - 2.0 * x)
+
+    if max_influences and max_influences < count:
+        drop = np.argsort(-weights, axis=1)[:, max_influences:]
+        np.put_along_axis(weights, drop, 0.0, axis=1)
+    return weights / weights.sum(axis=1, keepdims=True)
@@ -0,0 +1,221 @@
+import base64
+import json
+import time
+import zlib
+
+VERSION = 1
+
+CATEGORIES = ("nodes", "connections", "disconnections", "attrs", "parents", "groups",
+              "locked_state", "k_state", "cb_state", "constraint_targets", "attr_vals")
+
+# field layout of the record tuples, "n" is a name table index, "N" a list of them, "v" a plain json value
+# groups keep their parents as a flat [node, parent, node, parent...] index list
+SCHEMA = {
+    "connections": (("from", "n"), ("to", "n"), ("old_value", "v")),
+    "disconnections": (("from", "n"), ("to", "n")),
+    "attrs": (("node", "n"), ("attr", "n")),
+    "parents": (("node", "n"), ("parent", "n"), ("trs", "v")),
+    "groups": (("transform", "n"), ("parents", "g")),
+    "locked_state": (("attr", "n"), ("base_state", "v")),
+    "k_state": (("attr", "n"), ("base_state", "v")),
+    "cb_state": (("attr", "n"), ("base_state", "v")),
+    "constraint_targets": (("source", "n"), ("old_targets", "N"), ("type", "v"), ("constraint", "n")),
+    "attr_vals": (("attr", "n"), ("val", "v")),
+}
+
+_separators = (",", ":")
+
+
+def empty_log():
+    return dict((x, []) for x in CATEGORIES)
+
+
+def _pack(data, compress):
+    text = json.dumps(data, separators=_separators)
+    if compress:
+        return "z" + base64.b64encode(zlib.compress(text.encode("utf-8"), 6)).decode("ascii")
+    return "j" + text
+
+
+def _unpack(text):
+    if text[0] == "z":
+        return json.loads(zlib.decompress(base64.b64decode(text[1:])).decode("utf-8"))
+    return json.loads(text[1:])
+
+
+class Journal(object):
+    # append only record store: element 0 of the logger attr is a small header,
+    # every dump after that adds one segment holding only the records (and names) that are new since the last one
+    def __init__(self, compress=True):
+        self.compress = compress
+        self.names = []
+        self.name_index = {}
+        self.counts = dict((x, 0) for x in CATEGORIES)
+        self.segments = 0
+        self.uuids = {}
+        # small free form dict (build parameters, sections) that lives in the header, rewritten on every dump
+        self.meta = {}
+
+    @classmethod
+    def from_header(cls, text):
+        header = json.loads(text)
+        if header["v"] > VERSION:
+            raise ValueError("journal version {0} is newer than this tool ({1})".format(header["v"], VERSION))
+        res = cls(compress=header["z"])
+        res.segments = header["s"]
+        res.counts.update(header["c"])
+        res.meta = header.get("m", {})
+        return res
+
+    def header(self):
+        data = {"v": VERSION, "z": self.compress, "s": self.segments, "c": self.counts, "k": len(self.names)}
+        if self.meta:
+            data["m"] = self.meta
+        return json.dumps(data, separators=_separators)
+
+    def can_append(self, log):
+        return all(len(log[x]) >= self.counts[x] for x in CATEGORIES)
+
+    def _intern(self, name, new_names):
+        if name is None:
+            return None
+        idx = self.name_index.get(name)
+        if idx is None:
+            idx = len(self.names)
+            self.names.append(name)
+            self.name_index[name] = idx
+            new_names.append(name)
+        return idx
+
+    def _encode(self, category, record, new_names):
+        if category == "nodes":
+            return self._intern(record, new_names)
+        res = []
+        for field, kind in SCHEMA[category]:
+            val = record.get(field)
+            if kind == "n":
+                res.append(self._intern(val, new_names))
+            elif kind == "N":
+                res.append([self._intern(x, new_names) for x in val])
+            elif kind == "g":
+                flat = []
+                for z in val:
+                    flat.extend([self._intern(z["node"], new_names), self._intern(z["parent"], new_names)])
+                res.append(flat)
+            else:
+                res.append(val)
+        return res
+
+    def _decode(self, category, record):
+        names = self.names
+        if category == "nodes":
+            return names[record]
+        res = {}
+        for (field, kind), val in zip(SCHEMA[category], record):
+            if kind == "n":
+                res[field] = None if val is None else names[val]
+            elif kind == "N":
+                res[field] = [names[x] for x in val]
+            elif kind == "g":
+                res[field] = [{"node": names[val[i]], "parent": None if val[i + 1] is None else names[val[i + 1]]}
+                              for i in range(0, len(val), 2)]
+            else:
+                res[field] = val
+        return res
+
+    def append(self, log, uuids=None):
+        # segment string with everything past the last dump, None when there is nothing new
+        # uuids (node name -> uuid) are stored once per name, as [name index, uuid] pairs
+        new_names = []
+        records = []
+        for category in CATEGORIES:
+            lst = log[category]
+            records.append([self._encode(category, x, new_names) for x in lst[self.counts[category]:]])
+        new_uuids = []
+        for name, uuid in (uuids or {}).items():
+            if self.uuids.get(name) != uuid:
+                self.uuids[name] = uuid
+                new_uuids.append([self._intern(name, new_names), uuid])
+        if not any(records) and not new_uuids:
+            return None
+        for category in CATEGORIES:
+            self.counts[category] = len(log[category])
+        self.segments += 1
+        data = {"n": new_names, "r": records}
+        if new_uuids:
+            data["u"] = new_uuids
+        return _pack(data, self.compress)
+
+    def decode(self, segments):
+        self.names = []
+        self.name_index = {}
+        self.uuids = {}
+        log = empty_log()
+        for text in segments:
+            data = _unpack(text)
+            for name in data["n"]:
+                self.name_index[name] = len(self.names)
+                self.names.append(name)
+            for category, records in zip(CATEGORIES, data["r"]):
+                log[category].extend(self._decode(category, x) for x in records)
+            for idx, uuid in data.get("u", []):
+                self.uuids[self.names[idx]] = uuid
+        return log
+
+
+def _sample_log(count):
+    log = empty_log()
+    per = max(count // 5, 1)
+    for i in range(per):
+        node = "stretch_node_{0}".format(i)
+        log["nodes"].append(node)
+        log["connections"].append({"from": node + ".outFloat", "to": "stretch_joint_{0}.scaleY".format(i), "old_value": 1.0})
+        log["attr_vals"].append({"attr": node + ".visibility", "val": True})
+        log["k_state"].append({"attr": node + ".translateX", "base_state": True})
+        log["parents"].append({"node": node, "parent": "stretch_rig", "trs": [[0.0, 1.0, 0.0], [0.0, 0.0, 0.0], [1.0, 1.0, 1.0]]})
+    return log
+
+
+def _extend(log, other):
+    for category in CATEGORIES:
+        log[category].extend(other[category])
+
+
+def benchmark(counts=(10000, 100000), append_fraction=0.01):
+    # dump/load cost and stored size of the legacy json blob against the journal, plus the cost of an append dump
+    res = {}
+    for count in counts:
+        log = _sample_log(count)
+        row = {}
+
+        start = time.perf_counter()
+        blob = json.dumps(log)
+        row["legacy_dump"] = time.perf_counter() - start
+        start = time.perf_counter()
+        json.loads(blob)
+        row["legacy_load"] = time.perf_counter() - start
+        row["legacy_bytes"] = len(blob)
+
+        for compress in [False, True]:
+            key = "journal_z" if compress else "journal"
+            jrn = Journal(compress=compress)
+            start = time.perf_counter()
+            segment = jrn.append(log)
+            row[key + "_dump"] = time.perf_counter() - start
+            start = time.perf_counter()
+            Journal(compress=compress).decode([segment])
+            row[key + "_load"] = time.perf_counter() - start
+            row[key + "_bytes"] = len(segment)
+
+            _extend(log, _sample_log(max(int(count * append_fraction), 5)))
+            start = time.perf_counter()
+            jrn.append(log)
+            row[key + "_append"] = time.perf_counter() - start
+            log = _sample_log(count)
+
+        res[count] = row
+    return res
+
+
+if __name__ == "__main__":
+    print(json.dumps(benchmark(), indent=2))
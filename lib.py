@@ -1,262 +1,820 @@
-import pymel.core as pm
 import json
+import sys
+import bisect
+import contextlib
+from collections import OrderedDict
 from maya import cmds
+import maya.api.OpenMaya as om
+
+import journal
+import profiling
 
 class Logger(object):
     def __init__(self, module_name):
         self.log = {"nodes": [], "connections": [], "disconnections": [], "attrs": [], 
         "parents": [], "groups": [], "locked_state": [], "k_state": [], "cb_state":[], "constraint_targets": [], "attr_vals": []}
         self.conf_node_name = module_name
+        self._journal = None
+        # node name -> uuid, persisted with the dump, and uuid -> MObjectHandle for this session
+        self.uuids = {}
+        self._handles = {}
+        self._profile = None
+        # build parameters and named sections ({name: {category: [start, end]}}), stored in the journal header
+        self.meta = {}
+
+    def _record(self, category, record):
+        self.log[category].append(record)
+        self.track(*_node_names(category, record))
+
+    def track(self, *names):
+        for name in names:
+            node = name.split(".", 1)[0]
+            if node in self.uuids:
+                continue
+            sel = om.MSelectionList()
+            try:
+                sel.add(node)
+            except RuntimeError:
+                continue
+            obj = sel.getDependNode(0)
+            uuid = om.MFnDependencyNode(obj).uuid().asString()
+            self.uuids[node] = uuid
+            self._handles[uuid] = om.MObjectHandle(obj)
+
+    def _current_names(self, names):
+        # logged node name -> name it has now, live handles first, then one ls for all uuids
+        # nodes without a uuid (legacy logs) or whose uuid is gone keep resolving by name
+        remap = {}
+        pending = {}
+        for node in set(x.split(".", 1)[0] for x in names):
+            uuid = self.uuids.get(node)
+            if uuid is None:
+                continue
+            handle = self._handles.get(uuid)
+            if handle is not None and handle.isValid():
+                obj = handle.object()
+                if obj.hasFn(om.MFn.kDagNode):
+                    remap[node] = om.MFnDagNode(obj).partialPathName()
+                else:
+                    remap[node] = om.MFnDependencyNode(obj).name()
+            else:
+                pending[node] = uuid
+        if pending:
+            found = cmds.ls(list(set(pending.values()))) or []
+            by_uuid = dict(zip(cmds.ls(found, uuid=True) or [], found))
+            for node, uuid in pending.items():
+                if uuid in by_uuid:
+                    remap[node] = by_uuid[uuid]
+        return remap
 
     def create_node(self, *args, **kwargs):
-        node = pm.createNode(*args, **kwargs)
-        self.log["nodes"].append(node.name())
+        node = cmds.createNode(*args, **kwargs)
+        self._record("nodes", node)
         return node
 
     def curve(self, *args, **kwargs):
-        node = pm.curve(*args, **kwargs)
-        self.log["nodes"].append(node.name())
+        node = cmds.curve(*args, **kwargs)
+        self._record("nodes", node)
         return node
 
     def circle(self, *args, **kwargs):
-        node = pm.circle(*args, **kwargs)[0]
-        self.log["nodes"].append(node.name())
+        node = cmds.circle(*args, **kwargs)[0]
+        self._record("nodes", node)
         return node
 
     def space_locator(self, *args, **kwargs):
-        node = pm.spaceLocator(*args, **kwargs)
-        self.log["nodes"].append(node.name())
+        node = cmds.spaceLocator(*args, **kwargs)[0]
+        self._record("nodes", node)
         return node
 
     def joint(self, *args, **kwargs):
-        node = pm.joint(*args, **kwargs)
-        self.log["nodes"].append(node.name())
+        node = cmds.joint(*args, **kwargs)
+        self._record("nodes", node)
         return node
 
     def parent_constraint(self, *args, **kwargs):
-        source = pm.PyNode(args[-1])
-        lst = list(set(source.inputs(type="parentConstraint")))
-        if lst:
-            ex_constraint = lst[0]
-            old_targets = ex_constraint.getTargetList()
-            node = pm.parentConstraint(*args, **kwargs)
-            self.log["constraint_targets"].append({"source": source.name(), "old_targets": [x.name() for x in old_targets], "type": "parent", "constraint": ex_constraint.name()})
-        else:
-            node = pm.parentConstraint(*args, **kwargs)
-            self.log["nodes"].append(node.name())
-        return node
+        return self._constraint("parent", args, kwargs)
 
     def orient_constraint(self, *args, **kwargs):
-        source = pm.PyNode(args[-1])
-        lst = list(set(source.inputs(type="orientConstraint")))
-        if lst:
-            ex_constraint = lst[0]
-            old_targets = ex_constraint.getTargetList()
-            node = pm.orientConstraint(*args, **kwargs)
-            self.log["constraint_targets"].append({"source": source.name(), "old_targets": [x.name() for x in old_targets], "type": "orient", "constraint": ex_constraint.name()})
-        else:
-            node = pm.orientConstraint(*args, **kwargs)
-            self.log["nodes"].append(node.name())
-        return node
+        return self._constraint("orient", args, kwargs)
 
     def point_constraint(self, *args, **kwargs):
-        source = pm.PyNode(args[-1])
-        lst = list(set(source.inputs(type="pointConstraint")))
+        return self._constraint("point", args, kwargs)
+
+    def _constraint(self, kind, args, kwargs):
+        # a constraint already driving the object only gets new targets, undo takes just those off again
+        constraint_cmd = getattr(cmds, _constraint_cmds[kind])
+        source = str(_flatten(args)[-1])
+        lst = list(OrderedDict.fromkeys(cmds.listConnections(source, s=True, d=False, type=_constraint_cmds[kind]) or []))
         if lst:
             ex_constraint = lst[0]
-            old_targets = ex_constraint.getTargetList()
-            node = pm.pointConstraint(*args, **kwargs)
-            self.log["constraint_targets"].append({"source": source.name(), "old_targets": [x.name() for x in old_targets], "type": "point", "constraint": ex_constraint.name()})
+            old_targets = constraint_cmd(ex_constraint, q=True, tl=True) or []
+            node = constraint_cmd(*args, **kwargs)[0]
+            self._record("constraint_targets", {"source": source, "old_targets": old_targets, "type": kind, "constraint": ex_constraint})
         else:
-            node = pm.pointConstraint(*args, **kwargs)
-            self.log["nodes"].append(node.name())
+            node = constraint_cmd(*args, **kwargs)[0]
+            self._record("nodes", node)
         return node
 
     def connect_attr(self, *args, **kwargs):
+        source, dest = str(args[0]), str(args[1])
         old_value = None
-        temp_value = pm.getAttr(args[1])
+        temp_value = cmds.getAttr(dest)
         if temp_value:
             if isinstance(temp_value, (int, bool, str, float)):
                 old_value = temp_value
 
-        dest_attr = pm.PyNode(args[1])
-        if dest_attr.inputs():
-            source_attr = dest_attr.inputs(p=True)[0]
-            self.log["disconnections"].append({"from": source_attr.name(), "to": dest_attr.name()})
+        inputs = cmds.listConnections(dest, s=True, d=False, p=True)
+        if inputs:
+            self._record("disconnections", {"from": inputs[0], "to": dest})
 
-        pm.connectAttr(*args, **kwargs)
-        self.log["connections"].append({"from": pm.PyNode(args[0]).name(), "to": pm.PyNode(args[1]).name(), "old_value": old_value})
+        cmds.connectAttr(source, dest, *args[2:], **kwargs)
+        self._record("connections", {"from": source, "to": dest, "old_value": old_value})
 
     def disconnect_attr(self, *args, **kwargs):
-        self.log["disconnections"].append({"from": pm.PyNode(args[0]).name(), "to": pm.PyNode(args[1]).name()})
-        pm.disconnectAttr(*args, **kwargs)
+        self._record("disconnections", {"from": str(args[0]), "to": str(args[1])})
+        cmds.disconnectAttr(str(args[0]), str(args[1]), *args[2:], **kwargs)
 
     def create_attr(self, *args, **kwargs):
-        node = pm.PyNode(args[0])
-        pm.addAttr(*args, **kwargs)
-        self.log["attrs"].append({"node": node.name(), "attr": kwargs["ln"]})
+        node = str(args[0])
+        cmds.addAttr(node, *args[1:], **kwargs)
+        self._record("attrs", {"node": node, "attr": kwargs["ln"]})
 
     def duplicate(self, *args, **kwargs):
-        res = pm.duplicate(*args, **kwargs)
+        res = cmds.duplicate(*args, **kwargs)
         for x in res:
-            self.log["nodes"].append(x.name())
+            self._record("nodes", x)
         return res
 
     def ik_handle(self, *args, **kwargs):
-        res = pm.ikHandle(*args, **kwargs)
+        res = cmds.ikHandle(*args, **kwargs)
         for x in res:
-            self.log["nodes"].append(x.name())
+            self._record("nodes", x)
         return res
 
     def lattice(self, *args, **kwargs):
-        res = pm.lattice(*args, **kwargs)
+        res = cmds.lattice(*args, **kwargs)
         for x in res:
-            self.log["nodes"].append(x.name())
+            self._record("nodes", x)
         return res
 
+    def deformer(self, *args, **kwargs):
+        res = cmds.deformer(*args, **kwargs)
+        for x in res:
+            self._record("nodes", x)
+        return res
+
+    def skin_cluster(self, *args, **kwargs):
+        node = cmds.skinCluster(*args, **kwargs)[0]
+        self._record("nodes", node)
+        return node
+
     def parent(self, a, b):
-        node = pm.PyNode(a)
-        parent = node.getParent()
-        parent_name = None
-        if parent:
-            parent_name = parent.name()
+        node = str(a)
+        parent_name = (cmds.listRelatives(node, p=True) or [None])[0]
 
-        t = list(a.t.get())
-        r = list(a.r.get())
-        s = list(a.s.get())
+        t = list(cmds.getAttr(node + ".t")[0])
+        r = list(cmds.getAttr(node + ".r")[0])
+        s = list(cmds.getAttr(node + ".s")[0])
 
-        self.log["parents"].append({"node": node.name(), "parent": parent_name, "trs": [t, r, s]})
-        res = pm.parent(a, b)
+        self._record("parents", {"node": node, "parent": parent_name, "trs": [t, r, s]})
+        res = cmds.parent(node, str(b))
         return res
 
     def lock_attr(self, attr):
-        pm.setAttr(attr, lock=True)
-        self.log["locked_state"].append({"attr": attr.name(), "base_state": False})
+        cmds.setAttr(str(attr), lock=True)
+        self._record("locked_state", {"attr": str(attr), "base_state": False})
 
     def unlock_attr(self, attr):
-        pm.setAttr(attr, lock=True)
-        self.log["locked_state"].append({"attr": attr.name(), "base_state": True})
+        cmds.setAttr(str(attr), lock=True)
+        self._record("locked_state", {"attr": str(attr), "base_state": True})
 
     def hide_attr(self, attr):
-        pm.setAttr(attr, k=False, cb=False)
-        self.log["k_state"].append({"attr": attr.name(), "base_state": True})
-        self.log["cb_state"].append({"attr": attr.name(), "base_state": True})
+        cmds.setAttr(str(attr), k=False, cb=False)
+        self._record("k_state", {"attr": str(attr), "base_state": True})
+        self._record("cb_state", {"attr": str(attr), "base_state": True})
 
     def show_attr(self, attr):
-        pm.setAttr(attr, k=True, cb=True)
-        self.log["k_state"].append({"attr": attr.name(), "base_state": False})
-        self.log["cb_state"].append({"attr": attr.name(), "base_state": False})
+        cmds.setAttr(str(attr), k=True, cb=True)
+        self._record("k_state", {"attr": str(attr), "base_state": False})
+        self._record("cb_state", {"attr": str(attr), "base_state": False})
 
     def set_attr(self, *args, **kwargs):
-        attr = pm.PyNode(args[0])
-        val = attr.get()
-        if isinstance(val, pm.dt.Vector):
-            val = list(val)
-        self.log["attr_vals"].append({"attr": attr.name(), "val": val})
-        pm.setAttr(*args, **kwargs)
+        attr = str(args[0])
+        val = cmds.getAttr(attr)
+        if isinstance(val, list) and len(val) == 1 and isinstance(val[0], tuple):
+            # compound attrs come back as [(x, y, z)]
+            val = list(val[0])
+        self._record("attr_vals", {"attr": attr, "val": val})
+        cmds.setAttr(attr, *args[1:], **kwargs)
 
     def group(self, *args, **kwargs):
         temp_dic = {"transform": "", "parents":[]}
-        for arg in args:
-            old_parent = arg.getParent()
-            if old_parent:
-                old_parent = old_parent.name()
-            temp_dic["parents"].append({"node": arg.name(), "parent": old_parent})
-
-        res = pm.group(*args, **kwargs)
-        temp_dic["transform"] = res.name()
-        self.log["groups"].append(temp_dic)
-        return res
+        for arg in _flatten(args):
+            old_parent = (cmds.listRelatives(arg, p=True) or [None])[0]
+            temp_dic["parents"].append({"node": arg, "parent": old_parent})
 
-    def dump(self):
-        node = pm.ls("logger")
-        if node:
-            node = node[0]
-        else:
-            node = pm.createNode("network", n="logger")
+        res = cmds.group(*args, **kwargs)
+        temp_dic["transform"] = res
+        self._record("groups", temp_dic)
+        return res
 
-        if not pm.attributeQuery(self.conf_node_name, n=node, ex=True):
-            node.addAttr(self.conf_node_name, dt="string")
+    def profile(self, modules=()):
+        # with logger.profile() as prof: ... prof.report()
+        # times every wrapper and undo category, counts cmds calls made from lib and any extra modules passed in
+        return profiling.profile(self, _profiled_methods, (sys.modules[__name__],) + tuple(modules))
+
+    @contextlib.contextmanager
+    def section(self, name):
+        # tags the records logged inside the block, so they can be taken out and undone on their own (extract)
+        start = dict((x, len(self.log[x])) for x in journal.CATEGORIES)
+        try:
+            yield
+        finally:
+            log = self.log
+            self.meta.setdefault("sections", {})[name] = dict(
+                (x, [start[x], len(log[x])]) for x in journal.CATEGORIES if len(log[x]) > start[x])
+
+    def extract(self, names):
+        # moves the records of the named sections into a new Logger that undoes only them
+        # the log is edited in place, so the next dump writes the journal from scratch
+        sections = self.meta.get("sections", {})
+        log = self.log
+        res = Logger(self.conf_node_name + "_extract")
+        res.uuids = dict(self.uuids)
+        res._handles = dict(self._handles)
+        taken = dict((x, set()) for x in journal.CATEGORIES)
+        for name in names:
+            for category, (start, end) in sections.pop(name, {}).items():
+                taken[category].update(range(start, end))
+        for category, idx in taken.items():
+            if not idx:
+                continue
+            res.log[category] = [x for i, x in enumerate(log[category]) if i in idx]
+            log[category][:] = [x for i, x in enumerate(log[category]) if i not in idx]
+            _shift_sections(sections, category, idx)
+        self._journal = None
+        return res
 
-        node.attr(self.conf_node_name).set(json.dumps(self.log))
+    def compact(self):
+        # drops every record undo does not need and returns how many went, dump runs it before writing
+        #   nodes / attrs / plugs that are gone, nodes logged twice
+        #   records on nodes the same section created (deleting the node undoes them)
+        #   all but the first state / value / parent record per attr or node, the first one is what undo restores
+        #   connect / disconnect pairs of the same plugs, only an odd one out survives
+        # everything is scoped per section, so extract() still gets complete sections back
+        log = self.log
+        sections = self.meta.get("sections", {})
+        owner = _section_owner(sections)
+        names = _referenced_names(log)
+        remap = self._current_names(names)
+        existing = _existing(set(_rename(x, remap) for x in names))
+
+        def alive(name):
+            return name is None or _rename(name, remap) in existing
+
+        drop = dict((x, set()) for x in journal.CATEGORIES)
+        created = {}
+        for i, x in enumerate(log["nodes"]):
+            if x in created or not alive(x):
+                drop["nodes"].add(i)
+            else:
+                created[x] = owner("nodes", i)
+        for x in log["groups"]:
+            created.setdefault(x["transform"], None)
+
+        def own(category, i, name):
+            # name lives on a node the record's own section created
+            node = name.split(".", 1)[0]
+            return node in created and created[node] == owner(category, i)
+
+        for category, key in [("locked_state", "attr"), ("k_state", "attr"), ("cb_state", "attr"),
+                              ("attr_vals", "attr"), ("parents", "node")]:
+            seen = set()
+            for i, x in enumerate(log[category]):
+                scope = (owner(category, i), x[key])
+                if scope in seen or not alive(x[key]) or own(category, i, x[key]):
+                    drop[category].add(i)
+                seen.add(scope)
+        for i, x in enumerate(log["attrs"]):
+            if not alive(x["node"] + "." + x["attr"]) or own("attrs", i, x["node"]):
+                drop["attrs"].add(i)
+        for i, x in enumerate(log["constraint_targets"]):
+            if not (alive(x["source"]) and alive(x["constraint"])):
+                drop["constraint_targets"].add(i)
+
+        pairs = {}
+        for category in ["connections", "disconnections"]:
+            for i, x in enumerate(log[category]):
+                if not (alive(x["from"]) and alive(x["to"])) or own(category, i, x["to"]):
+                    drop[category].add(i)
+                else:
+                    pairs.setdefault((owner(category, i), x["from"], x["to"]), []).append((category, i))
+        for records in pairs.values():
+            # connects and disconnects of one plug pair alternate, equal counts are a no-op
+            # one extra connect (first one holds the old value) or one extra disconnect is the net change
+            count = sum(1 for category, i in records if category == "connections")
+            if count == len(records) - count:
+                drop_records = records
+            else:
+                net = "connections" if count > len(records) - count else "disconnections"
+                kept = [x for x in records if x[0] == net][:1]
+                drop_records = [x for x in records if x not in kept]
+            for category, i in drop_records:
+                drop[category].add(i)
+
+        dropped = 0
+        for category, idx in drop.items():
+            if not idx:
+                continue
+            dropped += len(idx)
+            if self._journal is not None and min(idx) < self._journal.counts[category]:
+                # records already written are gone, the next dump has to start over
+                self._journal = None
+            log[category][:] = [x for i, x in enumerate(log[category]) if i not in idx]
+            _shift_sections(sections, category, idx)
+        if dropped:
+            kept = set(x.split(".", 1)[0] for x in _referenced_names(log))
+            self.uuids = dict((k, v) for k, v in self.uuids.items() if k in kept)
+        return dropped
+
+    def _section(self, name):
+        if self._profile is None:
+            return _no_section
+        return self._profile.section(name)
+
+    @property
+    def log(self):
+        if self._log is None:
+            # journal logs are only decoded once something actually reads them
+            attr = "logger." + self.conf_node_name
+            segments = [cmds.getAttr("{0}[{1}]".format(attr, i)) for i in range(1, self._journal.segments + 1)]
+            self._log = self._journal.decode(segments)
+            for name, uuid in self._journal.uuids.items():
+                self.uuids.setdefault(name, uuid)
+        return self._log
+
+    @log.setter
+    def log(self, value):
+        self._log = value
+
+    def dump(self, compress=True, compact=True):
+        if not cmds.objExists("logger"):
+            cmds.createNode("network", n="logger")
+        attr = "logger." + self.conf_node_name
+
+        if compact:
+            self.compact()
+        log = self.log
+        if self._journal is None or not self._journal.can_append(log):
+            # first dump, legacy json attr or a log that was edited in place, write it again from scratch
+            if cmds.attributeQuery(self.conf_node_name, n="logger", ex=True):
+                cmds.deleteAttr(attr)
+            cmds.addAttr("logger", ln=self.conf_node_name, dt="string", m=True)
+            self._journal = journal.Journal(compress=compress)
+
+        segment = self._journal.append(log, self.uuids)
+        self._journal.meta = self.meta
+        if segment is not None:
+            cmds.setAttr("{0}[{1}]".format(attr, self._journal.segments), segment, type="string")
+        cmds.setAttr(attr + "[0]", self._journal.header(), type="string")
 
     def load(self):
-        lst = pm.ls("logger." + self.conf_node_name)
-        if not lst:
+        attr = "logger." + self.conf_node_name
+        if not cmds.objExists(attr):
             return False
-        str_val = lst[0].get()
-        self.log = json.loads(str_val)
+        if not cmds.attributeQuery(self.conf_node_name, n="logger", m=True):
+            self.log = json.loads(cmds.getAttr(attr))
+            self._journal = None
+            self.meta = {}
+            return True
+        self._journal = journal.Journal.from_header(cmds.getAttr(attr + "[0]"))
+        self.log = None
+        self.meta = self._journal.meta
         return True
 
     def undo(self):
-        for x in reversed(self.log["connections"]):
-            if pm.objExists(x["from"]) and pm.objExists(x["to"]) and pm.isConnected(x["from"], x["to"]):
-                pm.disconnectAttr(x["from"], x["to"])
+        log = self.log
+        with undo_chunk("stretch_deformer_undo"), suspend_refresh():
+            with self._section("resolve"):
+                names = _referenced_names(log)
+                remap = self._current_names(names)
+                if remap:
+                    log = _rename_log(log, remap)
+                    names = _referenced_names(log)
+                existing = _existing(names)
+
+            with self._section("connections"):
+                self._undo_connections(log, existing)
+            with self._section("constraint_targets"):
+                self._undo_constraint_targets(log, existing)
+            with self._section("states"):
+                self._undo_states(log, existing)
+            with self._section("attrs"):
+                self._undo_attrs(log, existing)
+            with self._section("parents"):
+                self._undo_parents(log, existing)
+            with self._section("nodes"):
+                self._undo_nodes(log, existing)
+                # plugs of the nodes just deleted (shapes included) can not be reconnected
+                # existing already holds names the way ls returns them, one ls is enough
+                existing = set(cmds.ls(list(existing)) or []) if existing else set()
+            with self._section("disconnections"):
+                self._undo_disconnections(log, existing)
+
+            if cmds.objExists("logger." + self.conf_node_name):
+                cmds.deleteAttr("logger." + self.conf_node_name)
+            self._journal = None
+            self.uuids = {}
+            self._handles = {}
+            self.meta = {}
+
+    def _undo_connections(self, log, existing):
+        for x in reversed(log["connections"]):
+            if x["from"] in existing and x["to"] in existing:
+                try:
+                    cmds.disconnectAttr(x["from"], x["to"])
+                except RuntimeError:
+                    continue
                 if x["old_value"]:
-                    pm.setAttr(x["to"], x["old_value"])
+                    _set_value(x["to"], x["old_value"])
 
-        for x in reversed(self.log["constraint_targets"]):
-            if not pm.objExists(x["source"]) or not pm.objExists(x["constraint"]):
+    def _undo_constraint_targets(self, log, existing):
+        for x in reversed(log["constraint_targets"]):
+            if x["source"] not in existing or x["constraint"] not in existing:
+                continue
+            if x["type"] not in _constraint_cmds:
                 continue
-            for target in pm.PyNode(x["constraint"]).getTargetList():
-                if target.name() not in x["old_targets"]:
-                    if x["type"] == "parent":
-                        pm.parentConstraint(target, x["source"], e=True, rm=True)
-                    elif x["type"] == "point":
-                        pm.pointConstraint(target, x["source"], e=True, rm=True)
-                    elif x["type"] == "orient":
-                        pm.orientConstraint(target, x["source"], e=True, rm=True)
-                    else:
-                        continue
-
-        for x in reversed(self.log["locked_state"]):
-            if pm.objExists(x["attr"]):
-                pm.setAttr(x["attr"], lock=x["base_state"])
-        for x in reversed(self.log["k_state"]):
-            if pm.objExists(x["attr"]):
-                pm.setAttr(x["attr"], k=x["base_state"])
-        for x in reversed(self.log["cb_state"]):
-            if pm.objExists(x["attr"]):
-                pm.setAttr(x["attr"], cb=x["base_state"])
-        for x in reversed(self.log["attr_vals"]):
-            if pm.objExists(x["attr"]):
-                pm.setAttr(x["attr"], x["val"])
-        for x in reversed(self.log["attrs"]):
-            if pm.objExists(x["node"]) and pm.attributeQuery(x["attr"], node=x["node"], ex=True):
-                pm.deleteAttr(x["node"], at=x["attr"])
-        for x in reversed(self.log["parents"]):
-            if pm.objExists(x["node"]):
-                pm.parent(x["node"], x["parent"])
+            constraint_cmd = getattr(cmds, _constraint_cmds[x["type"]])
+            for target in constraint_cmd(x["constraint"], q=True, tl=True) or []:
+                if target not in x["old_targets"]:
+                    constraint_cmd(target, x["source"], e=True, rm=True)
+
+    def _undo_states(self, log, existing):
+        # reversed replay leaves every attr at its earliest logged state, so only that one is set
+        for flag, category in [("lock", "locked_state"), ("keyable", "k_state"), ("channelBox", "cb_state")]:
+            for attr, state in _first_states(log[category], "base_state").items():
+                if attr in existing:
+                    cmds.setAttr(attr, **{flag: state})
+        for attr, val in _first_states(log["attr_vals"], "val").items():
+            if attr in existing:
+                _set_value(attr, val)
+
+    def _undo_attrs(self, log, existing):
+        for x in reversed(log["attrs"]):
+            if x["node"] + "." + x["attr"] in existing:
+                cmds.deleteAttr(x["node"], at=x["attr"])
+
+    def _undo_parents(self, log, existing):
+        for x in reversed(log["parents"]):
+            if x["node"] in existing:
+                _reparent(x["node"], x["parent"] if x["parent"] in existing else None)
                 for i, attr in enumerate([".t", ".r", ".s"]):
                     try:
-                        pm.setAttr(x["node"] + attr, x["trs"][i])
+                        cmds.setAttr(x["node"] + attr, *x["trs"][i])
                     except: pass
 
-        for x in reversed(self.log["groups"]):
+    def _undo_nodes(self, log, existing):
+        to_delete = []
+        for x in reversed(log["groups"]):
             for z in x["parents"]:
-                if pm.objExists(z["node"]) and pm.objExists(z["parent"]):
-                    pm.parent(z["node"], z["parent"])
-            if pm.objExists(x["transform"]):
-                pm.disconnectAttr(x["transform"])
-                pm.delete(x["transform"])
-        for x in reversed(self.log["nodes"]):
-            if pm.objExists(x):
-                pm.disconnectAttr(x)
-                pm.delete(x)
-        for x in reversed(self.log["disconnections"]):
-            pm.connectAttr(x["from"], x["to"], f=True)
-            # if x["old_value"]:
-            #     pm.setAttr(x["to"], x["old_value"])
-        pm.deleteAttr("logger." + self.conf_node_name)
-
-def get_set_recursive(object_set):
-    controls = []
+                if z["node"] in existing and (z["parent"] is None or z["parent"] in existing):
+                    _reparent(z["node"], z["parent"])
+            if x["transform"] in existing:
+                to_delete.append(x["transform"])
+        to_delete.extend(x for x in reversed(log["nodes"]) if x in existing)
+        _delete_nodes(to_delete)
+
+    def _undo_disconnections(self, log, existing):
+        for x in reversed(log["disconnections"]):
+            if x["from"] in existing and x["to"] in existing:
+                cmds.connectAttr(x["from"], x["to"], f=True)
+
+
+# looked up on cmds at call time so profiling sees them
+_constraint_cmds = {"parent": "parentConstraint", "point": "pointConstraint", "orient": "orientConstraint"}
+_profiled_methods = ("create_node", "curve", "circle", "space_locator", "joint", "parent_constraint",
+                     "orient_constraint", "point_constraint", "connect_attr", "disconnect_attr", "create_attr",
+                     "duplicate", "ik_handle", "lattice", "deformer", "skin_cluster", "parent", "lock_attr",
+                     "unlock_attr", "hide_attr", "show_attr", "set_attr", "group", "dump", "load", "undo")
+_no_section = contextlib.nullcontext()
+_refresh_suspended = [0]
+# deferred calls of the open build session, one list per nesting level
+_session = []
+
+
+@contextlib.contextmanager
+def undo_chunk(name):
+    cmds.undoInfo(openChunk=True, chunkName=name)
+    try:
+        yield
+    finally:
+        cmds.undoInfo(closeChunk=True)
+
+
+@contextlib.contextmanager
+def suspend_refresh():
+    # nesting safe, only the outermost block touches the viewport
+    if not _refresh_suspended[0]:
+        cmds.refresh(suspend=True)
+    _refresh_suspended[0] += 1
+    try:
+        yield
+    finally:
+        _refresh_suspended[0] -= 1
+        if not _refresh_suspended[0]:
+            cmds.refresh(suspend=False)
+
+
+@contextlib.contextmanager
+def build_session(name="stretch_deformer_build"):
+    # one undo chunk, no viewport refresh and no idle evaluation graph builds for the whole block,
+    # the graph is invalidated once at the end instead of rebuilt after every edit
+    # (switching the evaluation manager off and back would rebuild it for the whole scene)
+    # defer()red calls run once the block is done, still inside the chunk; nested sessions ride on the outer one
+    if _session:
+        yield
+        return
+    queue = []
+    _session.append(queue)
+    try:
+        with undo_chunk(name), suspend_refresh():
+            idle = cmds.evaluationManager(q=True, idleBuild=True)
+            if idle:
+                cmds.evaluationManager(idleBuild=False)
+            try:
+                yield
+                while queue:
+                    queue.pop(0)()
+            finally:
+                if cmds.evaluationManager(q=True, mode=True)[0] != "off":
+                    cmds.evaluationManager(invalidate=True)
+                if idle:
+                    cmds.evaluationManager(idleBuild=True)
+    finally:
+        _session.pop()
+
+
+def defer(func, *args, **kwargs):
+    # anything that forces an evaluation (getAttr of a computed plug) goes to the end of the build session
+    # runs right away outside of one
+    if _session:
+        _session[-1].append(lambda: func(*args, **kwargs))
+    else:
+        func(*args, **kwargs)
+
+
+def _referenced_names(log):
+    names = set(log["nodes"])
+    for x in log["connections"] + log["disconnections"]:
+        names.update([x["from"], x["to"]])
+    for x in log["constraint_targets"]:
+        names.update([x["source"], x["constraint"]])
+    for category in ["locked_state", "k_state", "cb_state", "attr_vals"]:
+        names.update(x["attr"] for x in log[category])
+    for x in log["attrs"]:
+        names.update([x["node"], x["node"] + "." + x["attr"]])
+    for x in log["parents"]:
+        names.update([x["node"], x["parent"]])
+    for x in log["groups"]:
+        names.add(x["transform"])
+        for z in x["parents"]:
+            names.update([z["node"], z["parent"]])
+    names.discard(None)
+    names.discard("")
+    return names
+
+
+def _node_names(category, record):
+    if category == "nodes":
+        return [record]
+    res = []
+    for field, kind in journal.SCHEMA[category]:
+        val = record[field]
+        if (category, field) == ("attrs", "attr") or not val:
+            continue
+        if kind == "n":
+            res.append(val)
+        elif kind == "N":
+            res.extend(val)
+        elif kind == "g":
+            for z in val:
+                res.append(z["node"])
+                if z["parent"]:
+                    res.append(z["parent"])
+    return res
+
+
+def _rename(name, remap):
+    if not name:
+        return name
+    node, sep, rest = name.partition(".")
+    return remap.get(node, node) + sep + rest
+
+
+def _rename_log(log, remap):
+    def rename(name):
+        return _rename(name, remap)
+
+    res = {}
+    for category in journal.CATEGORIES:
+        if category == "nodes":
+            res[category] = [rename(x) for x in log[category]]
+            continue
+        records = []
+        for x in log[category]:
+            y = dict(x)
+            for field, kind in journal.SCHEMA[category]:
+                if (category, field) == ("attrs", "attr"):
+                    continue
+                if kind == "n":
+                    y[field] = rename(x[field])
+                elif kind == "N":
+                    y[field] = [rename(z) for z in x[field]]
+                elif kind == "g":
+                    y[field] = [{"node": rename(z["node"]), "parent": rename(z["parent"])} for z in x[field]]
+            records.append(y)
+        res[category] = records
+    return res
+
+
+def _section_owner(sections):
+    # (category, index) -> name of the section holding that record, None outside sections
+    ranges = dict((x, []) for x in journal.CATEGORIES)
+    for name, section in sections.items():
+        for category, (start, end) in section.items():
+            ranges[category].append((start, end, name))
+
+    def owner(category, i):
+        for start, end, name in ranges[category]:
+            if start <= i < end:
+                return name
+        return None
+    return owner
+
+
+def _shift_sections(sections, category, removed):
+    # section ranges after the records at the removed indices are taken out of category
+    removed = sorted(removed)
+    for section in sections.values():
+        if category in section:
+            section[category] = [x - bisect.bisect_left(removed, x) for x in section[category]]
+
+
+def _existing(names):
+    # one ls for everything, ls hands names back in the form they were logged in
+    # anything it returns differently (non unique short names, attr aliases) gets an objExists of its own
+    found = set(cmds.ls(list(names)) or [])
+    missing_nodes = set()
+    for name in sorted(names - found, key=lambda x: "." in x):
+        node = name.split(".", 1)[0]
+        if node in missing_nodes:
+            continue
+        if cmds.objExists(name):
+            found.add(name)
+        elif "." not in name:
+            missing_nodes.add(name)
+    return found
+
+
+def _first_states(records, key):
+    states = {}
+    for x in records:
+        states.setdefault(x["attr"], x[key])
+    return states
+
+
+def _set_value(attr, value):
+    if isinstance(value, str):
+        cmds.setAttr(attr, value, type="string")
+    elif isinstance(value, (list, tuple)):
+        cmds.setAttr(attr, *value)
+    else:
+        cmds.setAttr(attr, value)
+
+
+def _reparent(node, parent):
+    try:
+        if parent:
+            cmds.parent(node, parent)
+        else:
+            cmds.parent(node, world=True)
+    except RuntimeError:
+        # already where it belongs
+        pass
+
+
+def _delete_nodes(nodes):
+    if not nodes:
+        return
+    long_names = cmds.ls(nodes, long=True) or []
+    # plugs come back with short node names, connections inside the deleted set go with the delete
+    deleted = set(long_names) | set(cmds.ls(long_names) or [])
+    inputs = cmds.listConnections(long_names, s=True, d=False, c=True, p=True) or []
+    outputs = cmds.listConnections(long_names, s=False, d=True, c=True, p=True) or []
+    pairs = set(zip(inputs[1::2], inputs[0::2])) | set(zip(outputs[0::2], outputs[1::2]))
+    for source, dest in pairs:
+        if source.split(".", 1)[0] in deleted and dest.split(".", 1)[0] in deleted:
+            continue
+        try:
+            cmds.disconnectAttr(source, dest)
+        except RuntimeError:
+            pass
+    # children go with their logged parents, deleting them twice errors out
+    long_set = set(long_names)
+    cmds.delete([x for x in long_names if not any(p in long_set for p in _ancestors(x))])
+
+
+def _flatten(args):
+    # node arguments as names, lists and tuples unpacked like maya commands do
+    res = []
+    for x in args:
+        if isinstance(x, (list, tuple)):
+            res.extend(_flatten(x))
+        else:
+            res.append(str(x))
+    return res
+
+
+def _ancestors(long_name):
+    parts = long_name.split("|")
+    return ["|".join(parts[:i]) for i in range(2, len(parts))]
+
+
+def get_set_recursive(object_set, cache=False):
+    # transforms of object_set and every nested set, subsets first in connection order, each control once
+    # walks one depth level per query pair, a set reached twice (shared or cyclic) is expanded once
+    # cache keeps each set's direct members until clear_set_cache() or a new / opened scene
     if not cmds.objExists(object_set):
-        return controls
-    subsets = cmds.listConnections(object_set, s=True, d=False, type="objectSet") or []
-    for x in subsets:
-        subset_controls = get_set_recursive(x)
-        controls.extend(subset_controls)
-    self_controls = cmds.listConnections(object_set, s=True, d=False, type="transform") or []
-    controls.extend(self_controls)
-    return controls
\ No newline at end of file
+        return []
+    members = _set_members([object_set], cache)
+
+    controls = []
+    done = set()
+    open_sets = set()
+    stack = [(object_set, False)]
+    while stack:
+        name, expanded = stack.pop()
+        subsets, own = members[name]
+        if expanded:
+            controls.extend(own)
+            open_sets.discard(name)
+            done.add(name)
+            continue
+        if name in done or name in open_sets:
+            continue
+        open_sets.add(name)
+        stack.append((name, True))
+        stack.extend((x, False) for x in reversed(subsets))
+    return list(OrderedDict.fromkeys(controls))
+
+
+def _set_members(sets, cache=False):
+    # {set: (subsets, transforms)} for sets and everything below them, two listConnections per depth level
+    members = {}
+    level = list(sets)
+    while level:
+        query = []
+        for name in level:
+            if name in members:
+                continue
+            if cache and name in _set_cache:
+                members[name] = _set_cache[name]
+            elif name not in query:
+                query.append(name)
+        if query:
+            subsets = _connection_map(cmds.listConnections(query, s=True, d=False, c=True, type="objectSet"))
+            own = _connection_map(cmds.listConnections(query, s=True, d=False, c=True, type="transform"))
+            for name in query:
+                members[name] = (subsets.get(name, []), own.get(name, []))
+                if cache:
+                    _set_cache[name] = members[name]
+            if cache:
+                _watch_set_cache()
+        level = [x for name in level for x in members[name][0] if x not in members]
+    return members
+
+
+def _connection_map(pairs):
+    # listConnections c=True result -> {queried node: [connected nodes]}
+    res = {}
+    pairs = pairs or []
+    for plug, other in zip(pairs[0::2], pairs[1::2]):
+        res.setdefault(plug.split(".", 1)[0], []).append(other)
+    return res
+
+
+_set_cache = {}
+_set_cache_callbacks = []
+
+
+def clear_set_cache(*args):
+    # also the scene message callback, maya passes client data
+    _set_cache.clear()
+
+
+def _watch_set_cache():
+    if _set_cache_callbacks:
+        return
+    for message in [om.MSceneMessage.kAfterNew, om.MSceneMessage.kAfterOpen]:
+        _set_cache_callbacks.append(om.MSceneMessage.addCallback(message, clear_set_cache))
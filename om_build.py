@@ -0,0 +1,298 @@
+import math
+import os
+import re
+import time
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+import lib
+import geometry
+import shapes
+
+_element_re = re.compile(r'^(\w+)\[(\d+)\]$')
+
+PLUGIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'om_build_plugin.py')
+COMMAND = 'stretchModifierUndo'
+# modifiers done but not yet handed to the undo command
+_pending = []
+
+
+def _mobject(name):
+    sel = om.MSelectionList()
+    sel.add(str(name))
+    return sel.getDependNode(0)
+
+
+def _node_name(obj):
+    if obj.hasFn(om.MFn.kDagNode):
+        return om.MFnDagNode(obj).partialPathName()
+    return om.MFnDependencyNode(obj).name()
+
+
+def _plug(obj, attr):
+    match = _element_re.match(attr)
+    fn = om.MFnDependencyNode(obj)
+    if match:
+        return fn.findPlug(match.group(1), False).elementByLogicalIndex(int(match.group(2)))
+    return fn.findPlug(attr, False)
+
+
+def _commit(*modifiers):
+    # modifiers that already ran go on maya's undo queue through the plugin command, one entry per pass
+    if not cmds.pluginInfo(PLUGIN, q=1, loaded=1):
+        cmds.loadPlugin(PLUGIN)
+    _pending.extend(modifiers)
+    getattr(cmds, COMMAND)()
+
+
+class ModifierBuild(object):
+    # queues creation, parenting, connections and attribute sets, then runs them in one doIt per modifier
+    # created nodes land in logger.log["nodes"] like the Logger wrappers do, so rollback keeps working
+    # every pass is handed to om_build_plugin's command afterwards, so ctrl+z takes it back like the cmds parts
+    def __init__(self, logger):
+        self.logger = logger
+        self._reset()
+
+    def _reset(self):
+        self.dag = om.MDagModifier()
+        self.dg = om.MDGModifier()
+        self.created = []
+
+    def create_dag(self, node_type, name, parent=None, log=True):
+        if parent is None:
+            obj = self.dag.createNode(node_type)
+        else:
+            obj = self.dag.createNode(node_type, parent)
+        self.dag.renameNode(obj, name)
+        if log:
+            self.created.append(obj)
+        return obj
+
+    def create_dg(self, node_type, name=None):
+        obj = self.dg.createNode(node_type)
+        if name:
+            self.dg.renameNode(obj, name)
+        self.created.append(obj)
+        return obj
+
+    def reparent(self, obj, parent):
+        self.dag.reparentNode(obj, parent)
+
+    def set_attr(self, obj, attr, value):
+        mod = self.dag if obj.hasFn(om.MFn.kDagNode) else self.dg
+        plug = _plug(obj, attr)
+        if isinstance(value, bool):
+            mod.newPlugValueBool(plug, value)
+        elif isinstance(value, int):
+            mod.newPlugValueInt(plug, value)
+        else:
+            mod.newPlugValueDouble(plug, float(value))
+
+    def set_vector(self, obj, attr, value):
+        for axis, val in zip('XYZ', value):
+            self.set_attr(obj, attr + axis, float(val))
+
+    def set_curve(self, shape, points, knots, degree):
+        # curve data on the shape's cached plug, what a saved scene does for a curve without history
+        data = om.MFnNurbsCurveData().create()
+        cvs = om.MPointArray([om.MPoint(float(p[0]), float(p[1]), float(p[2])) for p in points])
+        om.MFnNurbsCurve().create(cvs, om.MDoubleArray([float(k) for k in knots]), degree,
+                                  om.MFnNurbsCurve.kOpen, False, False, data)
+        self.dag.newPlugValue(_plug(shape, 'cached'), data)
+
+    def connect(self, src, src_attr, dst, dst_attr):
+        self.dg.connect(_plug(src, src_attr), _plug(dst, dst_attr))
+
+    def log_nodes(self, names):
+        self.logger.log["nodes"].extend(names)
+        self.logger.track(*names)
+
+    def do_it(self):
+        self.dag.doIt()
+        self.dg.doIt()
+        _commit(self.dag, self.dg)
+        names = [_node_name(x) for x in self.created]
+        self.log_nodes(names)
+        self._reset()
+        return names
+
+
+def set_ik_math(logger, joint_lst, network='legacy', falloff=0.0, prefix='', head='Head_M'):
+    # same rig as stretch_deformer.set_ik_math, built through modifier passes
+    # transforms are created in place instead of moved and frozen, pivots carry the old makeIdentity result
+    controls = set_ik_controls(logger, joint_lst, prefix, head)
+    set_ik_chain(logger, joint_lst, controls, network, falloff, prefix)
+    return controls['offset'], controls['rig']
+
+
+def set_ik_controls(logger, joint_lst, prefix='', head='Head_M', shape='sphere', scale=1.0):
+    joint_lst = [str(x) for x in joint_lst]
+    build = ModifierBuild(logger)
+
+    head_j = cmds.ls(head)
+    coord = cmds.xform(head_j[0], ws=1, q=1, t=1) if head_j else [0.0, 0.0, 0.0]
+    pos1 = cmds.xform(joint_lst[0], ws=1, q=1, t=1)
+    pos_mid = cmds.xform(joint_lst[int(math.floor(len(joint_lst) / 2))], ws=1, q=1, t=1)
+    pos2 = cmds.xform(joint_lst[-1], ws=1, q=1, t=1)
+
+    str_offset = build.create_dag('transform', prefix + 'stretch_control')
+    str_main = build.create_dag('transform', prefix + 'stretch_rig')
+    str_skeleton = build.create_dag('transform', prefix + 'stretch_skeleton')
+    build.reparent(str_skeleton, str_main)
+    build.reparent(str_offset, str_main)
+    for x in [str_offset, str_skeleton]:
+        build.set_vector(x, 'rotatePivot', coord)
+        build.set_vector(x, 'scalePivot', coord)
+
+    loc_lst = []
+    for name, pos in [('stretch_cv_1', pos1), ('stretch_cv_2', pos_mid), ('stretch_cv_3', pos_mid), ('stretch_cv_4', pos2)]:
+        loc = build.create_dag('transform', prefix + name, parent=str_offset)
+        loc_shape = build.create_dag('locator', prefix + name + 'Shape', parent=loc, log=False)
+        build.set_vector(loc_shape, 'localPosition', pos)
+        build.set_attr(loc, 'visibility', False)
+        loc_lst.append((loc, loc_shape))
+    build.set_vector(loc_lst[0][0], 'rotatePivot', pos1)
+    build.set_vector(loc_lst[0][0], 'scalePivot', pos1)
+
+    curve = build.create_dag('transform', prefix + 'stretch_curve', parent=str_main)
+    curve_shape = build.create_dag('nurbsCurve', prefix + 'stretch_curveShape', parent=curve, log=False)
+    build.set_curve(curve_shape, [pos1, pos1, pos2, pos2], [0, 0, 0, 1, 1, 1], 3)
+    points = shapes.points(shape, scale)
+    controls = []
+    for name, pos in [('Stretch_control_1', pos1), ('Stretch_control_2', pos2)]:
+        control = build.create_dag('transform', prefix + name, parent=str_offset)
+        build.set_vector(control, 'rotatePivot', pos)
+        build.set_vector(control, 'scalePivot', pos)
+        control_shape = build.create_dag('nurbsCurve', prefix + name + 'Shape', parent=control, log=False)
+        build.set_curve(control_shape, points + pos, shapes.knots(shape), shapes.degree(shape))
+        controls.append(control)
+    build.do_it()
+
+    cmds.parentConstraint(_node_name(controls[0]), _node_name(loc_lst[0][0]), mo=1)
+    cmds.parentConstraint(_node_name(controls[1]), _node_name(loc_lst[-1][0]), mo=1)
+    if head_j:
+        cmds.parentConstraint(head_j[0], _node_name(str_skeleton), mo=1)
+        cmds.parentConstraint(head_j[0], _node_name(str_offset), mo=1)
+
+    for i, (loc, loc_shape) in enumerate(loc_lst):
+        build.connect(loc_shape, 'worldPosition[0]', curve_shape, 'controlPoints[{0}]'.format(i))
+    build.do_it()
+
+    return {'offset': _node_name(str_offset), 'rig': _node_name(str_main), 'skeleton': _node_name(str_skeleton),
+            'curve': _node_name(curve)}
+
+
+def set_ik_chain(logger, joint_lst, controls, network='legacy', falloff=0.0, prefix=''):
+    joint_lst = [str(x) for x in joint_lst]
+    build = ModifierBuild(logger)
+    str_skeleton = _mobject(controls['skeleton'])
+    if (cmds.listRelatives(joint_lst[0], p=1) or [None])[0] != controls['skeleton']:
+        build.reparent(_mobject(joint_lst[0]), str_skeleton)
+        build.do_it()
+
+    pos1 = cmds.xform(joint_lst[0], ws=1, q=1, t=1)
+    pos_mid = cmds.xform(joint_lst[int(math.floor(len(joint_lst) / 2))], ws=1, q=1, t=1)
+    pos2 = cmds.xform(joint_lst[-1], ws=1, q=1, t=1)
+
+    ik_handle, effector = cmds.ikHandle(sj=joint_lst[0], ee=joint_lst[-1], solver='ikSplineSolver', ccv=0,
+                                        c=controls['curve'], n=prefix + 'ikHandle_stretch')
+    build.log_nodes([ik_handle, effector])
+    ik_obj = _mobject(ik_handle)
+    build.set_attr(ik_obj, 'visibility', False)
+    build.reparent(ik_obj, str_skeleton)
+
+    curve_shape = _mobject(cmds.listRelatives(controls['curve'], s=1)[0])
+    info = build.create_dg('curveInfo')
+    build.connect(curve_shape, 'worldSpace[0]', info, 'inputCurve')
+
+    # rest length straight from the cv positions, no forced evaluation of curveInfo
+    rest = geometry.bezier_length([pos1, pos_mid, pos_mid, pos2])
+    if network == 'lean':
+        _lean_network(build, info, joint_lst, _mobject(controls['rig']), rest, falloff)
+    else:
+        _legacy_network(build, info, joint_lst, rest)
+    build.do_it()
+
+
+def _legacy_network(build, info, joint_lst, rest):
+    math1 = build.create_dg('floatMath')
+    build.set_attr(math1, 'operation', 3)
+    build.set_attr(math1, 'floatB', rest)
+
+    math2 = build.create_dg('floatMath')
+    build.set_attr(math2, 'floatB', 0.5)
+    build.set_attr(math2, 'operation', 6)
+
+    math3 = build.create_dg('floatMath')
+    build.set_attr(math3, 'operation', 3)
+    build.set_attr(math3, 'floatA', 1.0)
+
+    build.connect(info, 'arcLength', math1, 'floatA')
+    build.connect(math1, 'outFloat', math2, 'floatA')
+    build.connect(math2, 'outFloat', math3, 'floatB')
+
+    for j in joint_lst:
+        j_obj = _mobject(j)
+        build.connect(math1, 'outFloat', j_obj, 'scaleY')
+        build.connect(math3, 'outFloat', j_obj, 'scaleX')
+        build.connect(math3, 'outFloat', j_obj, 'scaleZ')
+
+
+def _lean_network(build, info, joint_lst, toggle_node, rest, falloff):
+    # same wiring as stretch_deformer.set_lean_network
+    # the stretch attr goes on through the modifier too and is logged, so a rebuilt chain can add it again
+    attr = om.MFnNumericAttribute().create('stretch', 'stretch', om.MFnNumericData.kDouble, 1.0)
+    attr_fn = om.MFnNumericAttribute(attr)
+    attr_fn.setMin(0.0)
+    attr_fn.setMax(1.0)
+    attr_fn.keyable = True
+    build.dag.addAttribute(toggle_node, attr)
+    build.do_it()
+    build.logger.log["attrs"].append({"node": _node_name(toggle_node), "attr": "stretch"})
+
+    groups = geometry.squash_groups(geometry.squash_profile(len(joint_lst), falloff))
+    ratio = build.create_dg('multiplyDivide')
+    build.connect(info, 'arcLength', ratio, 'input1X')
+    build.set_attr(ratio, 'input2X', 1.0 / rest)
+
+    blend = build.create_dg('blendColors')
+    for axis in 'RGB':
+        build.connect(ratio, 'outputX', blend, 'color1' + axis)
+        build.set_attr(blend, 'color2' + axis, 1.0)
+    build.connect(toggle_node, 'stretch', blend, 'blender')
+
+    for exponent, idx in groups:
+        power = build.create_dg('multiplyDivide')
+        build.set_attr(power, 'operation', 3)
+        build.connect(blend, 'output', power, 'input1')
+        for axis, value in zip('XYZ', (exponent, 1.0, exponent)):
+            build.set_attr(power, 'input2' + axis, value)
+        for j in idx:
+            build.connect(power, 'output', _mobject(joint_lst[j]), 'scale')
+
+
+def compare_build_time(j_num=4, runs=3, top=(0, 1, 0), bottom=(0, 0, 0)):
+    # builds and rolls back the ik rig with both backends, returns best/mean seconds per backend
+    import stretch_deformer
+
+    result = {}
+    for backend, build in [('cmds', stretch_deformer.set_ik_math), ('om', set_ik_math)]:
+        times = []
+        for i in range(runs):
+            logger = lib.Logger('compare_build_time')
+            loc_up = cmds.spaceLocator(n='chain_loc_up')[0]
+            cmds.xform(loc_up, t=top)
+            loc_down = cmds.spaceLocator(n='chain_loc_down')[0]
+            cmds.xform(loc_down, t=bottom)
+            joint_lst = stretch_deformer.curveToJoints(logger, j_num, loc_up, loc_down)
+
+            start = time.perf_counter()
+            build(logger, joint_lst)
+            times.append(time.perf_counter() - start)
+
+            logger.dump()
+            logger.undo()
+        result[backend] = {'best': min(times), 'mean': sum(times) / len(times)}
+    result['speedup'] = result['cmds']['best'] / max(result['om']['best'], 1e-9)
+    return result
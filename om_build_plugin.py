@@ -0,0 +1,49 @@
+import maya.api.OpenMaya as om
+
+import om_build
+
+# undo side of om_build: a command that puts the modifier passes of an om build on maya's undo queue
+# ModifierBuild runs each pass with doIt() and leaves its modifiers in om_build._pending, the command takes them over
+# so ctrl+z / redo walk them back in order with the cmds calls (constraints, ikHandle) around them
+# load with cmds.loadPlugin(<path to this file>), om_build.ModifierBuild does it
+
+
+def maya_useNewAPI():
+    pass
+
+
+class StretchModifierCommand(om.MPxCommand):
+    command_name = 'stretchModifierUndo'
+
+    def __init__(self):
+        super(StretchModifierCommand, self).__init__()
+        self._modifiers = []
+
+    @classmethod
+    def creator(cls):
+        return cls()
+
+    def doIt(self, args):
+        # the passes already ran, only keep them for undo / redo
+        self._modifiers = list(om_build._pending)
+        del om_build._pending[:]
+
+    def redoIt(self):
+        for mod in self._modifiers:
+            mod.doIt()
+
+    def undoIt(self):
+        for mod in reversed(self._modifiers):
+            mod.undoIt()
+
+    def isUndoable(self):
+        return True
+
+
+def initializePlugin(obj):
+    om.MFnPlugin(obj, 'stretch_deformer', '1.0').registerCommand(
+        StretchModifierCommand.command_name, StretchModifierCommand.creator)
+
+
+def uninitializePlugin(obj):
+    om.MFnPlugin(obj).deregisterCommand(StretchModifierCommand.command_name)
@@ -0,0 +1,98 @@
+import contextlib
+import json
+import time
+from collections import Counter
+
+# opt in timing for Logger: wrapped methods, undo categories and the maya commands underneath them
+# nothing here is touched unless Logger.profile() is active
+
+
+class Profile(object):
+    def __init__(self):
+        self.methods = {}
+        self.sections = {}
+        self.commands = Counter()
+
+    def add(self, table, name, seconds):
+        entry = table.get(name)
+        if entry is None:
+            entry = table[name] = [0, 0.0]
+        entry[0] += 1
+        entry[1] += seconds
+
+    @contextlib.contextmanager
+    def section(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(self.sections, name, time.perf_counter() - start)
+
+    def report(self):
+        def table(data):
+            return dict((name, {"calls": calls, "seconds": seconds, "mean": seconds / calls})
+                        for name, (calls, seconds) in sorted(data.items(), key=lambda x: -x[1][1]))
+
+        return {"methods": table(self.methods),
+                "undo": table(self.sections),
+                "commands": dict(self.commands.most_common()),
+                "commands_total": sum(self.commands.values())}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.report(), **kwargs)
+
+
+class _CountingModule(object):
+    # stands in for cmds inside a module while profiling, counts every function fetched through it
+    def __init__(self, module, prefix, counter):
+        self._module = module
+        self._prefix = prefix
+        self._counter = counter
+
+    def __getattr__(self, name):
+        attr = getattr(self._module, name)
+        if not callable(attr) or isinstance(attr, type):
+            return attr
+        counter = self._counter
+        key = self._prefix + name
+
+        def wrapper(*args, **kwargs):
+            counter[key] += 1
+            return attr(*args, **kwargs)
+        return wrapper
+
+
+def _timed(func, name, prof):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            prof.add(prof.methods, name, time.perf_counter() - start)
+    return wrapper
+
+
+@contextlib.contextmanager
+def profile(logger, methods, modules):
+    # per instance method wrappers plus counting the cmds global of modules, all undone on exit
+    prof = Profile()
+    for name in methods:
+        setattr(logger, name, _timed(getattr(logger, name), name, prof))
+
+    swapped = []
+    for module in modules:
+        original = getattr(module, "cmds", None)
+        if original is None or isinstance(original, _CountingModule):
+            continue
+        module.cmds = _CountingModule(original, "cmds.", prof.commands)
+        swapped.append((module, "cmds", original))
+
+    logger._profile = prof
+    try:
+        yield prof
+    finally:
+        logger._profile = None
+        for name in methods:
+            logger.__dict__.pop(name, None)
+        for module, attr, original in swapped:
+            setattr(module, attr, original)
@@ -0,0 +1,114 @@
+import json
+
+import maya.cmds as cmds
+
+import lib
+
+# every setup logged on the scene's logger node, read from the journal headers only
+# a header row: name, kind, geo, params, root, nodes (logged node count), version (0 = legacy json blob), legacy
+# rollback merges the logs it is given into one undo pass, one existence query and one delete for all of them
+
+KINDS = (("StretchCache", "cache"), ("DeformerSetter", "setup"), ("StretchChain", "chain"))
+# caches sit on top of setups, setups on the chains they share
+_ROLLBACK_ORDER = {"cache": 0, "setup": 1, "other": 2, "chain": 3}
+
+
+def names():
+    if not cmds.objExists("logger"):
+        return []
+    return cmds.listAttr("logger", ud=True) or []
+
+
+def kind(name):
+    for prefix, res in KINDS:
+        if name.startswith(prefix):
+            return res
+    return "other"
+
+
+def header(name):
+    # two getAttr-level calls, the log segments are never read
+    # legacy json setups have no header and get parsed whole
+    attr = "logger." + name
+    if not cmds.objExists(attr):
+        return None
+    row = {"name": name, "kind": kind(name)}
+    if cmds.attributeQuery(name, n="logger", m=True):
+        data = json.loads(cmds.getAttr(attr + "[0]"))
+        meta = data.get("m", {})
+        row.update(version=data["v"], legacy=False, nodes=data["c"].get("nodes", 0))
+    else:
+        meta = {}
+        row.update(version=0, legacy=True, nodes=len(json.loads(cmds.getAttr(attr)).get("nodes", [])))
+    params = meta.get("params", {})
+    row["params"] = params
+    row["geo"] = params.get("geo") or (name[len("DeformerSetter"):] if row["kind"] == "setup" else None)
+    row["root"] = meta.get("nodes", {}).get("root")
+    row["named_nodes"] = meta.get("nodes", {})
+    return row
+
+
+def list_setups(kinds=None):
+    res = [header(x) for x in names() if kinds is None or kind(x) in kinds]
+    return [x for x in res if x is not None]
+
+
+def health(rows=None, full=False):
+    # missing nodes per setup
+    # default checks the nodes named in the headers with one ls for the whole scene
+    # full decodes every log and checks all logged nodes, following renames through the stored uuids
+    rows = list_setups() if rows is None else rows
+    res = []
+    if full:
+        for row in rows:
+            logger = lib.Logger(row["name"])
+            logger.load()
+            logged = list(dict.fromkeys(logger.log["nodes"]))
+            remap = logger._current_names(logged)
+            current = [remap.get(x, x) for x in logged]
+            found = set(cmds.ls(current) or [])
+            res.append(dict(row, missing=[x for x, y in zip(logged, current) if y not in found]))
+    else:
+        named = dict((row["name"], _flat_names(row["named_nodes"])) for row in rows)
+        found = set(cmds.ls(sorted(set(x for v in named.values() for x in v))) or [])
+        for row in rows:
+            res.append(dict(row, missing=[x for x in named[row["name"]] if x not in found]))
+    for row in res:
+        row["ok"] = not row["missing"]
+    return res
+
+
+def rollback(setup_names):
+    # every listed setup in one undo chunk and one Logger.undo over their merged logs
+    # returns the names that were found and rolled back
+    order = sorted((x for x in dict.fromkeys(setup_names)), key=lambda x: _ROLLBACK_ORDER[kind(x)])
+    merged = lib.Logger("registry_rollback")
+    done = []
+    # undo replays every category backwards, so the first to roll back goes last
+    for name in reversed(order):
+        logger = lib.Logger(name)
+        if not logger.load():
+            continue
+        log = logger.log
+        for category in merged.log:
+            merged.log[category].extend(log[category])
+        merged.uuids.update(logger.uuids)
+        done.append(name)
+    if not done:
+        return done
+    with lib.undo_chunk("stretch_deformer_rollback"), lib.suspend_refresh():
+        merged.undo()
+        for name in done:
+            cmds.deleteAttr("logger." + name)
+    return done[::-1]
+
+
+def rollback_all(kinds=None):
+    return rollback([x for x in names() if kinds is None or kind(x) in kinds])
+
+
+def _flat_names(nodes):
+    res = []
+    for val in nodes.values():
+        res.extend(val if isinstance(val, list) else [val])
+    return [str(x) for x in res if x]
@@ -0,0 +1,91 @@
+import functools
+
+import numpy as np
+
+# control curve shapes, stored once as (n, 3) arrays with their degree and knots
+# points() hands out scaled / oriented variants, computed once per variant and read only
+# studios add their own shapes with register_shape()
+
+_shapes = {}
+
+
+def register_shape(name, points, degree=1, knots=None):
+    # knots default to an open uniform vector, plain 0..n-1 for linear shapes
+    points = np.array(points, dtype=float).reshape(-1, 3)
+    degree = int(degree)
+    if len(points) <= degree:
+        raise ValueError('{0} needs more than {1} points'.format(name, degree))
+    if knots is None:
+        span = len(points) - degree
+        knots = [0] * (degree - 1) + list(range(span + 1)) + [span] * (degree - 1)
+    elif len(knots) != len(points) + degree - 1:
+        raise ValueError('{0} needs {1} knots'.format(name, len(points) + degree - 1))
+    points.flags.writeable = False
+    _shapes[name] = (points, degree, tuple(float(x) for x in knots))
+    _points_variant.cache_clear()
+
+
+def names():
+    return sorted(_shapes)
+
+
+def degree(name):
+    return _shapes[name][1]
+
+
+def knots(name):
+    return _shapes[name][2]
+
+
+def points(name, scale=1.0, orient=(0, 0, 0)):
+    return _points_variant(name, _scale_key(scale), tuple(float(x) for x in orient))
+
+
+@functools.lru_cache(maxsize=64)
+def _points_variant(name, scale, orient):
+    # orient is euler xyz in degrees, same rotate order as a default transform
+    res = _shapes[name][0] * np.asarray(scale)
+    if any(orient):
+        x, y, z = np.radians(orient)
+        rx = np.array([[1, 0, 0], [0, np.cos(x), np.sin(x)], [0, -np.sin(x), np.cos(x)]])
+        ry = np.array([[np.cos(y), 0, -np.sin(y)], [0, 1, 0], [np.sin(y), 0, np.cos(y)]])
+        rz = np.array([[np.cos(z), np.sin(z), 0], [-np.sin(z), np.cos(z), 0], [0, 0, 1]])
+        res = res @ rx @ ry @ rz
+    res.flags.writeable = False
+    return res
+
+
+def create(logger, name, n, scale=1.0, orient=(0, 0, 0)):
+    # a logged control curve named n at the origin, returns its transform
+    # one curve command straight from the cached variant, nothing to parse or duplicate
+    return logger.curve(d=degree(name), p=points(name, scale, orient).tolist(), k=list(knots(name)), n=n)
+
+
+def _scale_key(scale):
+    if np.ndim(scale):
+        return tuple(float(x) for x in scale)
+    return float(scale)
+
+
+# three rings, xy, yz and xz, as one linear curve
+register_shape('sphere', [
+    (0, 1, 0), (-0.382683, 0.92388, 0), (-0.707107, 0.707107, 0), (-0.92388, 0.382683, 0),
+    (-1, 0, 0), (-0.92388, -0.382683, 0), (-0.707107, -0.707107, 0), (-0.382683, -0.92388, 0),
+    (0, -1, 0), (0.382683, -0.92388, 0), (0.707107, -0.707107, 0), (0.92388, -0.382683, 0),
+    (1, 0, 0), (0.92388, 0.382683, 0), (0.707107, 0.707107, 0), (0.382683, 0.92388, 0),
+    (0, 1, 0), (0, 0.92388, 0.382683), (0, 0.707107, 0.707107), (0, 0.382683, 0.92388),
+    (0, 0, 1), (0, -0.382683, 0.92388), (0, -0.707107, 0.707107), (0, -0.92388, 0.382683),
+    (0, -1, 0), (0, -0.92388, -0.382683), (0, -0.707107, -0.707107), (0, -0.382683, -0.92388),
+    (0, 0, -1), (0, 0.382683, -0.92388), (0, 0.707107, -0.707107), (0, 0.92388, -0.382683),
+    (0, 1, 0), (-0.382683, 0.92388, 0), (-0.707107, 0.707107, 0), (-0.92388, 0.382683, 0),
+    (-1, 0, 0), (-0.92388, 0, 0.382683), (-0.707107, 0, 0.707107), (-0.382683, 0, 0.92388),
+    (0, 0, 1), (0.382683, 0, 0.92388), (0.707107, 0, 0.707107), (0.92388, 0, 0.382683),
+    (1, 0, 0), (0.92388, 0, -0.382683), (0.707107, 0, -0.707107), (0.382683, 0, -0.92388),
+    (0, 0, -1), (-0.382683, 0, -0.92388), (-0.707107, 0, -0.707107), (-0.92388, 0, -0.382683),
+    (-1, 0, 0),
+])
+
+register_shape('cube', [
+    (-1, 1, 1), (1, 1, 1), (1, 1, -1), (-1, 1, -1), (-1, 1, 1), (-1, -1, 1), (1, -1, 1), (1, -1, -1),
+    (-1, -1, -1), (-1, -1, 1), (1, -1, 1), (1, 1, 1), (1, 1, -1), (1, -1, -1), (-1, -1, -1), (-1, 1, -1),
+])
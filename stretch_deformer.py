@@ -1,280 +1,445 @@
-from PySide2 import QtWidgets, QtGui, QtCore
+import sys
 import math
-import pymel.core as pm
+import time
+import numpy as np
 import maya.cmds as cmds
-import maya.OpenMayaUI as omui
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
 
 import lib
-try:    # noinspection PyUnresolvedReferences,PyUnboundLocalVariable
-    long
-except NameError:   # Python 3 compatibility
-    long = int
-    unicode = str
-
-Wgt_instance = None
+import geometry
+import ffd
+import om_build
+import shapes
 j_num = 4
-
-class DeformerSetter(QtWidgets.QWidget):
-    def __init__(self, parent=None):
-        super(DeformerSetter, self).__init__(parent)
-        if not pm.ls(sl=1):
-            pm.warning('Select geo first')
-            return
-        self.geo = pm.ls(sl=1)[0]
-        self.curve = None
-        self.joint_lst = None
-        self.sel_obj = None
-        self.setWindowFlags(QtCore.Qt.Window)
-        self.setWindowTitle('Deform')
-        self.create_widgets()
-        self.create_layouts()
-        self.create_connections()
-        self.logger = lib.Logger(self.__class__.__name__ + cmds.ls(sl=1)[0])
-        self.log = self.logger.load()
-        if self.log:
-            self.delete_all_btn.setVisible(True)
-            self.lattice_wgt.setVisible(False)
-        else:
-            self.create_locators()
-
-    def create_locators(self):
-        self.loc_up = pm.spaceLocator(n='chain_loc_up')
-        self.loc_up.ty.set(1)
-        self.loc_down = pm.spaceLocator(n='chain_loc_down')
-        pm.warning('Place 2 locators for spline, on top and bottom of deformable geo')
-        pm.warning('Then press create lattice')
-        pm.select(self.loc_up)
-
-
-
-    def create_widgets(self):
-        self.create_lattice_btn = QtWidgets.QPushButton('Create Lattice')
-        self.lattice_lable = QtWidgets.QLabel('Lattice dimension')
-        int_validator = QtGui.QIntValidator()
-        self.x_dem = QtWidgets.QLineEdit('2')
-        self.x_dem.setValidator(int_validator)
-        self.y_dem = QtWidgets.QLineEdit('4')
-        self.y_dem.setValidator(int_validator)
-        self.z_dem = QtWidgets.QLineEdit('2')
-        self.z_dem.setValidator(int_validator)
-
-        self.delete_all_btn = QtWidgets.QPushButton('Delete')
-        self.delete_all_btn.setVisible(False)
-
-
-    def create_layouts(self):
-        self.main_lo = QtWidgets.QHBoxLayout(self)
-
-        self.lattice_lo = QtWidgets.QVBoxLayout(self)
-        self.lattice_wgt = QtWidgets.QWidget()
-        self.lattice_wgt.setLayout(self.lattice_lo)
-        self.lattice_lo.addWidget(self.lattice_lable)
-        self.lattice_lo.addWidget(self.x_dem)
-        self.lattice_lo.addWidget(self.y_dem)
-        self.lattice_lo.addWidget(self.z_dem)
-        self.lattice_lo.addWidget(self.create_lattice_btn)
-
-        self.main_lo.addWidget(self.lattice_wgt)
-
-        self.main_lo.addWidget(self.delete_all_btn)
-
-    def create_connections(self):
-        self.create_lattice_btn.clicked.connect(self.create_lattice)
-        self.delete_all_btn.clicked.connect(self.delete_all)
-
-
-    def create_lattice(self):
-        joint_lst = curveToJoints(self.logger,
-                                       j_num,
-                                       self.loc_up,
-                                       self.loc_down)
-        strch_off, strch_rig = set_ik_math(self.logger,
-                    joint_lst)
-
-        lattice, ffb = set_lattice(self.logger,
-                    self.geo,
-                    self.x_dem.text(),
-                    self.y_dem.text(),
-                    self.z_dem.text(),
-                    joint_lst)
-        root = self.logger.create_node('transform', n='stretch_deformer')
-        elem_lst = [strch_off, strch_rig, lattice, ffb]
-        pm.parent(elem_lst, root)
-        self.logger.dump()
-        #
-
-
-    def delete_all(self):
-        self.logger.undo()
+# 'cmds' (maya.cmds build) or 'om' (OpenMaya modifier build, see om_build), setups logged as 'pymel' build as 'cmds'
+# an 'om' build loads om_build_plugin.py, its command keeps the modifier passes on maya's undo queue
+build_backend = 'cmds'
+# 'legacy' (curveInfo + three floatMath) or 'lean' (one scale connection per joint, stretch toggle, squash falloff)
+stretch_network = 'legacy'
+squash_falloff = 0.0
+# shapes library entry and size of the two stretch controls
+control_shape = 'sphere'
+control_scale = 1.0
+
+def _ik_backend(backend):
+    # module with set_ik_controls / set_ik_chain for 'cmds' or 'om'
+    return om_build if backend == 'om' else sys.modules[__name__]
+
+def build_chain(logger, loc_up, loc_down, joint_num=None, prefix='', head='Head_M'):
+    # joint chain and ik stretch rig, every lattice following the same head can share one
+    # joints, controls and ik go in their own logger sections, update_setup rebuilds them separately
+    ik = _ik_backend(build_backend)
+    top, bottom = _world_point(loc_up), _world_point(loc_down)
+    with logger.section('joints'):
+        joint_lst = curveToJoints(logger,
+                                  joint_num or j_num,
+                                  loc_up,
+                                  loc_down,
+                                  prefix=prefix)
+    with logger.section('controls'):
+        controls = ik.set_ik_controls(logger, joint_lst, prefix, head, control_shape, control_scale)
+    with logger.section('ik'):
+        ik.set_ik_chain(logger, joint_lst, controls, stretch_network, squash_falloff, prefix)
+
+    logger.meta.setdefault('params', {}).update(
+        {'joint_num': joint_num or j_num, 'top': top, 'bottom': bottom, 'prefix': prefix, 'head': head,
+         'network': stretch_network, 'falloff': squash_falloff, 'backend': build_backend})
+    logger.meta.setdefault('nodes', {}).update(controls, joints=[str(x) for x in joint_lst])
+    return joint_lst, controls
+
+def build_setup(logger, geo, loc_up, loc_down, divisions, joint_num=None, prefix='', head='Head_M', session=True):
+    # everything create_lattice does, usable without the window
+    # loc_up / loc_down are locators (deleted afterwards) or plain world points, prefix goes in front of every node name
+    # session runs it all in one lib.build_session, False builds edit by edit (see compare_build_session)
+    if not session:
+        return _build_setup(logger, geo, loc_up, loc_down, divisions, joint_num, prefix, head)
+    with lib.build_session('stretch_deformer_build'):
+        return _build_setup(logger, geo, loc_up, loc_down, divisions, joint_num, prefix, head)
+
+def _build_setup(logger, geo, loc_up, loc_down, divisions, joint_num, prefix, head):
+    joint_lst, controls = build_chain(logger, loc_up, loc_down, joint_num, prefix, head)
+
+    lattice, ffb = set_lattice(logger,
+                geo,
+                divisions[0],
+                divisions[1],
+                divisions[2],
+                joint_lst,
+                prefix=prefix,
+                head=head)
+    root = logger.create_node('transform', n=prefix + 'stretch_deformer')
+    elem_lst = [controls['offset'], controls['rig'], lattice, ffb]
+    cmds.parent(elem_lst, root)
+    log_lattice_params(logger, geo, divisions, prefix, head, root, lattice, ffb)
+    logger.dump()
+    return root
+
+def log_lattice_params(logger, geo, divisions, prefix, head, root, lattice, ffb):
+    logger.meta.setdefault('params', {}).update(
+        {'geo': str(geo), 'divisions': [int(x) for x in divisions], 'prefix': prefix, 'head': head})
+    logger.meta.setdefault('nodes', {}).update({'root': str(root), 'lattice': str(lattice), 'base': str(ffb)})
+
+def update_setup(logger, divisions=None, joint_num=None, network=None, falloff=None):
+    # rebuilds only what the changed parameters touch and edits the log in place, controls and the rest stay
+    # divisions -> lattice + skin, joint count -> joints + ik + skin, network / falloff -> ik
+    # returns the rebuilt section names
+    params = logger.meta.get('params')
+    if not params:
+        raise RuntimeError('{0} has no build parameters logged, delete and build it again'.format(logger.conf_node_name))
+    new = dict(params)
+    if new.get('backend') == 'pymel':
+        # the cmds backend's name before pymel was dropped
+        new['backend'] = 'cmds'
+    rebuild = set()
+    # setups on a shared chain (batch) log no joint_num, their joint count belongs to the chain
+    if joint_num and 'joint_num' in params and int(joint_num) != params['joint_num']:
+        new['joint_num'] = int(joint_num)
+        rebuild.update(['joints', 'ik', 'skin'])
+    if network and network != params.get('network'):
+        new['network'] = network
+        rebuild.add('ik')
+    if falloff is not None and falloff != params.get('falloff'):
+        new['falloff'] = falloff
+        rebuild.add('ik')
+    if divisions and [int(x) for x in divisions] != params.get('divisions'):
+        new['divisions'] = [int(x) for x in divisions]
+        rebuild.update(['lattice', 'skin'])
+    if not rebuild:
+        return []
+    missing = sorted(x for x in rebuild if x not in logger.meta.get('sections', {}))
+    if missing:
+        raise RuntimeError('{0} does not own its {1} (shared chain or an older setup)'.format(
+            logger.conf_node_name, ', '.join(missing)))
+
+    nodes = logger.meta['nodes']
+    remap = logger._current_names([x for v in nodes.values() for x in (v if isinstance(v, list) else [v])])
+    nodes = dict((k, [remap.get(x, x) for x in v] if isinstance(v, list) else remap.get(v, v)) for k, v in nodes.items())
+    prefix = new['prefix']
+
+    with lib.build_session('stretch_deformer_update'):
+        logger.extract(rebuild).undo()
+        joint_lst = nodes['joints']
+        if 'joints' in rebuild:
+            with logger.section('joints'):
+                joint_lst = [str(x) for x in curveToJoints(logger, new['joint_num'], new['top'], new['bottom'],
+                                                           prefix=prefix)]
+        if 'ik' in rebuild:
+            with logger.section('ik'):
+                _ik_backend(new['backend']).set_ik_chain(logger, joint_lst, nodes, new['network'], new['falloff'], prefix)
+        if 'lattice' in rebuild:
+            with logger.section('lattice'):
+                lattice, ffb = make_lattice(logger, new['geo'], new['divisions'], prefix, new['head'])
+            cmds.parent([lattice, ffb], nodes['root'])
+            nodes['lattice'], nodes['base'] = str(lattice), str(ffb)
+        if 'skin' in rebuild:
+            with logger.section('skin'):
+                bind_lattice(logger, nodes['lattice'], joint_lst, new['divisions'], prefix=prefix)
+        nodes['joints'] = joint_lst
+        logger.meta['params'] = new
+        logger.meta['nodes'] = nodes
+        logger.dump()
+    return sorted(rebuild)
 
 def create_ui():
-    global Wgt_instance
-    if Wgt_instance is None:
-        q_maya_window = get_maya_window()
-        Wgt_instance = DeformerSetter(parent=q_maya_window)
-
-    Wgt_instance.show()
-    Wgt_instance.setWindowState(QtCore.Qt.WindowNoState | QtCore.Qt.WindowActive)
-    Wgt_instance.activateWindow()
-    return Wgt_instance
-
-def get_maya_window():
-    ptr = omui.MQtUtil.mainWindow()
-    if ptr is not None:
-        return wrp(long(ptr), QtWidgets.QMainWindow)
-
-def set_lattice(logger, geo, x, y, z, jnt_lst):
+    # the window lives in stretch_deformer_ui, PySide2 only gets imported once it is opened
+    import stretch_deformer_ui
+    return stretch_deformer_ui.create_ui()
+
+def get_mesh_points(geo):
+    return np.array(cmds.xform('{0}.vtx[*]'.format(geo), q=1, ws=1, t=1), dtype=float).reshape(-1, 3)
+
+def get_lattice_points(lattice, divisions):
+    # deformed lattice points as an (s, t, u, 3) grid, what ffd.deform takes
+    return ffd.grid_from_flat(cmds.xform('{0}.pt[*][*][*]'.format(lattice), q=1, ws=1, t=1), divisions)
+
+def set_chain_weights(skin, lattice, jnt_lst, divisions, max_influences=2, falloff=0.5):
+    # weights from the lattice points projected on the joint chain, written with one setWeights call
+    points = geometry.flat_lattice(geometry.lattice_grid(cmds.xform(str(lattice), q=1, ws=1, m=1), divisions))
+    joints = np.array([cmds.xform(str(j), q=1, ws=1, t=1) for j in jnt_lst])
+    weights = geometry.chain_weights(points, joints, max_influences, falloff)
+
+    sel = om.MSelectionList()
+    sel.add(str(skin))
+    sel.add(str(lattice))
+    skin_fn = oma.MFnSkinCluster(sel.getDependNode(0))
+    shape = sel.getDagPath(1)
+    shape.extendToShape()
+
+    comp_fn = om.MFnTripleIndexedComponent()
+    comp = comp_fn.create(om.MFn.kLatticeComponent)
+    s_num, t_num, u_num = divisions
+    comp_fn.addElements([[s, t, u] for u in range(u_num) for t in range(t_num) for s in range(s_num)])
+
+    influences = skin_fn.influenceObjects()
+    paths = [influences[i].fullPathName() for i in range(len(influences))]
+    order = [paths.index(x) for x in cmds.ls([str(j) for j in jnt_lst], long=True)]
+    skin_fn.setWeights(shape, comp, om.MIntArray(order), om.MDoubleArray(weights.ravel().tolist()), False)
+
+def set_lattice(logger, geo, x, y, z, jnt_lst, weighting='chain', max_influences=2, falloff=0.5, prefix='', head='Head_M', strict=False):
+    # weighting 'chain' solves the lattice weights along the joint chain, 'default' keeps maya's bind weights
+    # strict raises instead of warning, for callers that roll the logger back themselves
     try:
-        base, lattice, ffb = logger.lattice(geo, divisions=(int(x), int(y), int(z)), objectCentered=True)
-        pm.skinCluster(jnt_lst, lattice, tsb=1)
-
-        head_j = pm.ls('Head_M')
-        if head_j:
-            pm.parentConstraint(head_j, ffb, mo=1)
+        divisions = (int(x), int(y), int(z))
+        with logger.section('lattice'):
+            lattice, ffb = make_lattice(logger, geo, divisions, prefix, head)
+        with logger.section('skin'):
+            bind_lattice(logger, lattice, jnt_lst, divisions, weighting, max_influences, falloff, prefix)
         return lattice, ffb
     except:
-        pm.warning('So, nuclear homing missle launched at your coordinates')
-        pm.warning('if serious, you messed up with lattice dimension fields or no object selected')
+        if strict:
+            raise
+        cmds.warning('So, nuclear homing missle launched at your coordinates')
+        cmds.warning('if serious, you messed up with lattice dimension fields or no object selected')
         return None
 
+def make_lattice(logger, geo, divisions, prefix='', head='Head_M'):
+    base, lattice, ffb = logger.lattice(geo, divisions=tuple(int(x) for x in divisions), objectCentered=True, n=prefix + 'ffd1')
+    head_j = cmds.ls(head)
+    if head_j:
+        cmds.parentConstraint(head_j, ffb, mo=1)
+    return lattice, ffb
+
+def bind_lattice(logger, lattice, jnt_lst, divisions, weighting='chain', max_influences=2, falloff=0.5, prefix=''):
+    skin = logger.skin_cluster(jnt_lst, lattice, tsb=1, n=prefix + 'skinCluster1')
+    if weighting == 'chain':
+        set_chain_weights(skin, lattice, jnt_lst, tuple(int(x) for x in divisions), max_influences, falloff)
+    return skin
+
+def _is_point(obj):
+    return isinstance(obj, (list, tuple, np.ndarray))
+
+def _world_point(obj):
+    # locator / transform or an (x, y, z) point
+    if _is_point(obj):
+        return [float(x) for x in obj]
+    return cmds.xform(str(obj), ws=1, q=1, t=1)
+
+def curveToJoints(logger, j_num, loc_up, loc_down, direction=True, spacing="parameter", prefix=''):
+    positions = geometry.spline_joint_positions(_world_point(loc_up),
+                                                _world_point(loc_down),
+                                                j_num,
+                                                spacing=spacing)
+    if direction:
+        positions = positions[::-1]
 
-def curveToJoints(logger, j_num, loc_up, loc_down, direction=True):
     joint_lst = []
-    curve = pm.curve(d=3, periodic=0, n='stretch_curva',
-                     p=[pm.xform(loc_up, ws=1, q=1, t=1),
-                        pm.xform(loc_up, ws=1, q=1, t=1),
-                        pm.xform(loc_down, ws=1, q=1, t=1),
-                        pm.xform(loc_down, ws=1, q=1, t=1)],
-                     )
-    shape = pm.listRelatives(curve, shapes=1)
-
-    if pm.objectType(shape) == "nurbsCurve":
-        newCV = pm.duplicate(shape, n="myRebuildCurve")
-        rebuildCV = pm.rebuildCurve(
-            newCV, rt=0, s=j_num, replaceOriginal=True)
-
-        cmds.delete("{0}.cv[1]".format(rebuildCV[0]))
-        cmds.delete("{1}.cv[{0}]".format(j_num, rebuildCV[0]))
-
-        if direction:
-            i = 1
-            for x in range(0, j_num + 1)[::-1]:
-
-                cvPoint = "{1}.cv[{0}]".format(x, rebuildCV[0])
-                locPos = cmds.xform(cvPoint, q=True, ws=True, t=True)
-                joint = logger.joint(
-                    p=(locPos[0], locPos[1], locPos[2]), a=True, n=f'stretch_joint_{i}', roo='zxy')
-                joint_lst.append(joint)
-                i += 1
-        else:
-            i = 1
-            for x in range(0, j_num + 1):
-
-                cvPoint = "{1}.cv[{0}]".format(x, rebuildCV[0])
-                locPos = cmds.xform(cvPoint, q=True, ws=True, t=True)
-                joint = logger.joint(
-                    p=(locPos[0], locPos[1], locPos[2]), a=True, n=f'stretch_joint_{i}', roo='zxy')
-                joint_lst.append(joint)
-                i += 1
-        cmds.delete(rebuildCV)
-
-    pm.delete(curve)
-    pm.delete(loc_up)
-    pm.delete(loc_down)
+    cmds.select(cl=1)
+    for i, pos in enumerate(positions, 1):
+        joint = logger.joint(
+            p=(float(pos[0]), float(pos[1]), float(pos[2])), a=True, n=f'{prefix}stretch_joint_{i}', roo='zxy')
+        joint_lst.append(joint)
+
+    for loc in [loc_up, loc_down]:
+        if not _is_point(loc):
+            cmds.delete(str(loc))
 
     return joint_lst
 
 
 
-def  set_ik_math(logger, joint_lst):
+def  set_ik_math(logger, joint_lst, network='legacy', falloff=0.0, prefix='', head='Head_M'):
     # create joint chain in geo
-
-    str_offset = logger.create_node('transform', n='stretch_control')
-    str_main = logger.create_node('transform', n='stretch_rig')
-    str_skeleton = logger.create_node('transform', n='stretch_skeleton')
-    head_j = pm.ls('Head_M')
+    controls = set_ik_controls(logger, joint_lst, prefix, head)
+    set_ik_chain(logger, joint_lst, controls, network, falloff, prefix)
+    return controls['offset'], controls['rig']
+
+
+def set_ik_controls(logger, joint_lst, prefix='', head='Head_M', shape='sphere', scale=1.0):
+    # groups, cv locators, curve and the two controls (shape / scale from the shapes library), everything that survives a joint count change
+    # returns the node names set_ik_chain (and update_setup) need
+    str_offset = logger.create_node('transform', n=prefix + 'stretch_control')
+    str_main = logger.create_node('transform', n=prefix + 'stretch_rig')
+    str_skeleton = logger.create_node('transform', n=prefix + 'stretch_skeleton')
+    head_j = cmds.ls(head)
     if head_j:
-        coord = pm.xform(head_j[0], ws=1, q=1, t=1)
-        pm.xform(str_offset, t=coord)
-        pm.xform(str_skeleton, t=coord)
+        coord = cmds.xform(head_j[0], ws=1, q=1, t=1)
+        cmds.xform(str_offset, t=coord)
+        cmds.xform(str_skeleton, t=coord)
 
-    pos1 = pm.xform(joint_lst[0], ws=1, q=1, t=1)
-    pos2 = pm.xform(joint_lst[-1], ws=1, q=1, t=1)
+    pos1 = cmds.xform(joint_lst[0], ws=1, q=1, t=1)
+    pos2 = cmds.xform(joint_lst[-1], ws=1, q=1, t=1)
 
-    loc1 = logger.space_locator(n='stretch_control', p=pm.xform(joint_lst[0], ws=1, q=1, t=1))
-    pm.xform(loc1, cpc=1)
-    loc2 = logger.space_locator(n='stretch_cv_2', p=pm.xform(joint_lst[math.floor(len(joint_lst) / 2)], ws=1, q=1, t=1))
-    loc3 = logger.space_locator(n='stretch_cv_3', p=pm.xform(joint_lst[math.floor(len(joint_lst) / 2)], ws=1, q=1, t=1))
-    loc4 = logger.space_locator(n='stretch_cv_4', p=pm.xform(joint_lst[-1], ws=1, q=1, t=1))
+    loc1 = logger.space_locator(n=prefix + 'stretch_control', p=cmds.xform(joint_lst[0], ws=1, q=1, t=1))
+    cmds.xform(loc1, cpc=1)
+    loc2 = logger.space_locator(n=prefix + 'stretch_cv_2', p=cmds.xform(joint_lst[math.floor(len(joint_lst) / 2)], ws=1, q=1, t=1))
+    loc3 = logger.space_locator(n=prefix + 'stretch_cv_3', p=cmds.xform(joint_lst[math.floor(len(joint_lst) / 2)], ws=1, q=1, t=1))
+    loc4 = logger.space_locator(n=prefix + 'stretch_cv_4', p=cmds.xform(joint_lst[-1], ws=1, q=1, t=1))
 
-    curve = logger.curve(n='stretch_curve', d=3, periodic=0, p=[(pos1[0], pos1[1], pos1[2]),
+    curve = logger.curve(n=prefix + 'stretch_curve', d=3, periodic=0, p=[(pos1[0], pos1[1], pos1[2]),
                                                             (pos1[0], pos1[1], pos1[2]),
                                                             (pos2[0], pos2[1], pos2[2]),
                                                             (pos2[0], pos2[1], pos2[2])])
 
-    # control1 = logger.circle(n='Stretch_control_1', c=[pos1[0], pos1[1], pos1[2]], nr=[0,1,0])
-    control1 = logger.curve(d=1, p=[(0, 1, 0), (-0.382683, 0.92388, 0), (-0.707107, 0.707107, 0), (-0.92388, 0.382683, 0), (-1, 0, 0), (-0.92388, -0.382683, 0), (-0.707107, -0.707107, 0), (-0.382683, -0.92388, 0), (0, -1, 0), (0.382683, -0.92388, 0), (0.707107, -0.707107, 0), (0.92388, -0.382683, 0), (1, 0, 0), (0.92388, 0.382683, 0), (0.707107, 0.707107, 0), (0.382683, 0.92388, 0), (0, 1, 0), (0, 0.92388, 0.382683), (0, 0.707107, 0.707107), (0, 0.382683, 0.92388), (0, 0, 1), (0, -0.382683, 0.92388), (0, -0.707107, 0.707107), (0, -0.92388, 0.382683), (0, -1, 0), (0, -0.92388, -0.382683), (0, -0.707107, -0.707107), (0, -0.382683, -0.92388), (0, 0, -1), (0, 0.382683, -0.92388), (0, 0.707107, -0.707107), (0, 0.92388, -0.382683), (0, 1, 0), (-0.382683, 0.92388, 0), (-0.707107, 0.707107, 0), (-0.92388, 0.382683, 0), (-1, 0, 0), (-0.92388, 0, 0.382683), (-0.707107, 0, 0.707107), (-0.382683, 0, 0.92388), (0, 0, 1), (0.382683, 0, 0.92388), (0.707107, 0, 0.707107), (0.92388, 0, 0.382683), (1, 0, 0), (0.92388, 0, -0.382683), (0.707107, 0, -0.707107), (0.382683, 0, -0.92388), (0, 0, -1), (-0.382683, 0, -0.92388), (-0.707107, 0, -0.707107), (-0.92388, 0, -0.382683), (-1, 0, 0)], k=[0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39, 40, 41, 42, 43, 44, 45, 46, 47, 48, 49, 50, 51, 52], n='Stretch_control_1')
-    pm.xform(control1, cpc=1)
-    pm.xform(control1, t=pos1)
-    control2 = logger.curve(d=1, p=[(0, 1, 0), (-0.382683, 0.92388, 0), (-0.707107, 0.707107, 0), (-0.92388, 0.382683, 0), (-1, 0, 0), (-0.92388, -0.382683, 0), (-0.707107, -0.707107, 0), (-0.382683, -0.92388, 0), (0, -1, 0), (0.382683, -0.92388, 0), (0.707107, -0.707107, 0), (0.92388, -0.382683, 0), (1, 0, 0), (0.92388, 0.382683, 0), (0.707107, 0.707107, 0), (0.382683, 0.92388, 0), (0, 1, 0), (0, 0.92388, 0.382683), (0, 0.707107, 0.707107), (0, 0.382683, 0.92388), (0, 0, 1), (0, -0.382683, 0.92388), (0, -0.707107, 0.707107), (0, -0.92388, 0.382683), (0, -1, 0), (0, -0.92388, -0.382683), (0, -0.707107, -0.707107), (0, -0.382683, -0.92388), (0, 0, -1), (0, 0.382683, -0.92388), (0, 0.707107, -0.707107), (0, 0.92388, -0.382683), (0, 1, 0), (-0.382683, 0.92388, 0), (-0.707107, 0.707107, 0), (-0.92388, 0.382683, 0), (-1, 0, 0), (-0.92388, 0, 0.382683), (-0.707107, 0, 0.707107), (-0.382683, 0, 0.92388), (0, 0, 1), (0.382683, 0, 0.92388), (0.707107, 0, 0.707107), (0.92388, 0, 0.382683), (1, 0, 0), (0.92388, 0, -0.382683), (0.707107, 0, -0.707107), (0.382683, 0, -0.92388), (0, 0, -1), (-0.382683, 0, -0.92388), (-0.707107, 0, -0.707107), (-0.92388, 0, -0.382683), (-1, 0, 0)], k=[0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39, 40, 41, 42, 43, 44, 45, 46, 47, 48, 49, 50, 51, 52], n='Stretch_control_2')
-    pm.xform(control2, cpc=1)
-    pm.xform(control2, t=pos2)
+    control1 = shapes.create(logger, shape, prefix + 'Stretch_control_1', scale)
+    cmds.xform(control1, cpc=1)
+    cmds.xform(control1, t=pos1)
+    control2 = shapes.create(logger, shape, prefix + 'Stretch_control_2', scale)
+    cmds.xform(control2, cpc=1)
+    cmds.xform(control2, t=pos2)
 
     loc_lst = [loc1, loc2, loc3, loc4]
 
     for loc in loc_lst:
-        loc.visibility.set(0)
-    pm.parent(loc_lst, str_offset)
-    pm.parent(joint_lst[0], str_skeleton)
-    pm.parent(str_skeleton, str_main)
-    pm.parent(control1, str_offset)
-    pm.parent(control2, str_offset)
-    pm.parent(str_offset, str_main)
-    ik_handle, effector = logger.ik_handle(sj=joint_lst[0], ee=joint_lst[-1], solver='ikSplineSolver', ccv=0, c=curve,
-                                      n='ikHandle_stretch')
-    ik_handle.visibility.set(0)
-    pm.parent(ik_handle, str_skeleton)
+        cmds.setAttr(loc + '.visibility', 0)
+    cmds.parent(loc_lst, str_offset)
+    cmds.parent(str_skeleton, str_main)
+    cmds.parent(control1, str_offset)
+    cmds.parent(control2, str_offset)
+    cmds.parent(str_offset, str_main)
 
-    for x in [str_skeleton, str_offset, control1, control2]:
-        cmds.makeIdentity(x.name(), apply=1, t=1, r=1, s=1, n=0, pn=1)
+    # one freeze for all four, it has to happen before the constraints connect their channels
+    cmds.makeIdentity([str_skeleton, str_offset, control1, control2], apply=1, t=1, r=1, s=1, n=0, pn=1)
 
-    pm.parentConstraint(control1, loc1, mo=1)
-    pm.parentConstraint(control2, loc4, mo=1)
-    pm.parentConstraint(head_j, str_skeleton, mo=1)
-    pm.parentConstraint(head_j, str_offset, mo=1)
+    cmds.parentConstraint(control1, loc1, mo=1)
+    cmds.parentConstraint(control2, loc4, mo=1)
+    cmds.parentConstraint(head_j, str_skeleton, mo=1)
+    cmds.parentConstraint(head_j, str_offset, mo=1)
 
     for i, l in enumerate(loc_lst):
-        l.worldPosition[0] >> curve.controlPoints[i]
+        cmds.connectAttr(l + '.worldPosition[0]', '{0}.controlPoints[{1}]'.format(curve, i))
+    cmds.parent(curve, w=1)
+    cmds.parent(curve, str_main)
+
+    return {'offset': str_offset, 'rig': str_main, 'skeleton': str_skeleton, 'curve': curve}
+
 
+def set_ik_chain(logger, joint_lst, controls, network='legacy', falloff=0.0, prefix=''):
+    # joints into the skeleton group, spline ik on the control curve and the stretch network
+    joint_lst = [str(x) for x in joint_lst]
+    str_skeleton = controls['skeleton']
+    curve = controls['curve']
+    if (cmds.listRelatives(joint_lst[0], p=1) or [None])[0] != str_skeleton:
+        cmds.parent(joint_lst[0], str_skeleton)
+    ik_handle, effector = logger.ik_handle(sj=joint_lst[0], ee=joint_lst[-1], solver='ikSplineSolver', ccv=0, c=curve,
+                                      n=prefix + 'ikHandle_stretch')
+    cmds.setAttr(ik_handle + '.visibility', 0)
+    cmds.parent(ik_handle, str_skeleton)
+
+    if network == 'lean':
+        set_lean_network(logger, curve, joint_lst, controls['rig'], falloff)
+    else:
+        set_legacy_network(logger, curve, joint_lst)
+
+
+def set_legacy_network(logger, curve, joint_lst):
     info = logger.create_node('curveInfo')
 
-    curve.worldSpace[0] >> info.inputCurve
+    cmds.connectAttr(curve + '.worldSpace[0]', info + '.inputCurve')
 
     math1 = logger.create_node('floatMath')
-    math1.operation.set(3)
-    math1.floatB.set(info.arcLength.get())
+    cmds.setAttr(math1 + '.operation', 3)
+    # rest length from the cv positions, nothing evaluates and it is set before the lattice binds
+    cmds.setAttr(math1 + '.floatB', _rest_length(joint_lst))
 
     math2 = logger.create_node('floatMath')
-    math2.floatB.set(0.5)
-    math2.operation.set(6)
+    cmds.setAttr(math2 + '.floatB', 0.5)
+    cmds.setAttr(math2 + '.operation', 6)
 
     math3 = logger.create_node('floatMath')
-    math3.operation.set(3)
-    math3.floatA.set(1)
+    cmds.setAttr(math3 + '.operation', 3)
+    cmds.setAttr(math3 + '.floatA', 1)
 
-    info.arcLength >> math1.floatA
+    cmds.connectAttr(info + '.arcLength', math1 + '.floatA')
 
-    math1.outFloat >> math2.floatA
+    cmds.connectAttr(math1 + '.outFloat', math2 + '.floatA')
 
-    math2.outFloat >> math3.floatB
+    cmds.connectAttr(math2 + '.outFloat', math3 + '.floatB')
 
     for j in joint_lst:
-        math1.outFloat >> j.scaleY
-        math3.outFloat >> j.scaleX
-        math3.outFloat >> j.scaleZ
-    pm.parent(curve, w=1)
-    pm.parent(curve, str_main)
+        cmds.connectAttr(math1 + '.outFloat', j + '.scaleY')
+        cmds.connectAttr(math3 + '.outFloat', j + '.scaleX')
+        cmds.connectAttr(math3 + '.outFloat', j + '.scaleZ')
+
 
+def _rest_length(joint_lst):
+    # arc length of the stretch curve as set_ik_controls places its cvs: first, middle twice, last joint
+    mid = cmds.xform(joint_lst[int(math.floor(len(joint_lst) / 2))], ws=1, q=1, t=1)
+    return geometry.bezier_length([cmds.xform(joint_lst[0], ws=1, q=1, t=1), mid, mid,
+                                   cmds.xform(joint_lst[-1], ws=1, q=1, t=1)])
 
-    return str_offset, str_main
 
+def set_lean_network(logger, curve, joint_lst, toggle_node, falloff=0.0):
+    # stretch = arcLength * 1/rest, blended towards 1 by stretch_attr, joint scale = (stretch^e, stretch, stretch^e)
+    # one power multiplyDivide per distinct squash exponent drives the whole scale compound, one connection per joint
+    # the exponents are constants set on the power nodes, stretch_attr at 0 leaves the chain frozen at scale 1
+    rest = _rest_length(joint_lst)
+    groups = geometry.squash_groups(geometry.squash_profile(len(joint_lst), falloff))
+
+    logger.create_attr(toggle_node, ln='stretch', at='double', min=0, max=1, dv=1, k=1)
+
+    info = logger.create_node('curveInfo')
+    cmds.connectAttr(curve + '.worldSpace[0]', info + '.inputCurve')
+
+    ratio = logger.create_node('multiplyDivide')
+    cmds.connectAttr(info + '.arcLength', ratio + '.input1X')
+    cmds.setAttr(ratio + '.input2X', 1.0 / rest)
+
+    blend = logger.create_node('blendColors')
+    for axis in 'RGB':
+        cmds.connectAttr(ratio + '.outputX', blend + '.color1' + axis)
+    cmds.setAttr(blend + '.color2', 1.0, 1.0, 1.0, type='double3')
+    cmds.connectAttr(toggle_node + '.stretch', blend + '.blender')
+
+    for exponent, idx in groups:
+        power = logger.create_node('multiplyDivide')
+        cmds.setAttr(power + '.operation', 3)
+        cmds.connectAttr(blend + '.output', power + '.input1')
+        cmds.setAttr(power + '.input2', exponent, 1.0, exponent, type='double3')
+        for j in idx:
+            cmds.connectAttr(power + '.output', joint_lst[j] + '.scale')
+
+
+def compare_build_session(geo, top, bottom, divisions=(2, 4, 2), joint_num=None, runs=3):
+    # build_setup on geo edit by edit and inside a build session, rolled back after every run
+    # top / bottom are world points, returns best and mean seconds of each and the speedup
+    result = {}
+    for session in [False, True]:
+        times = []
+        for i in range(runs):
+            logger = lib.Logger('compare_build_session')
+            start = time.perf_counter()
+            build_setup(logger, geo, top, bottom, divisions, joint_num, session=session)
+            times.append(time.perf_counter() - start)
+            logger.undo()
+        result['session' if session else 'plain'] = {'best': min(times), 'mean': sum(times) / len(times)}
+    result['speedup'] = result['plain']['best'] / max(result['session']['best'], 1e-9)
+    return result
+
+
+def compare_network_eval(j_num=4, frames=200, falloff=0.0, top=(0, 1, 0), bottom=(0, 0, 0)):
+    # builds the ik rig with each network, keys the bottom control and plays it back under DG and parallel EM
+    # returns seconds per evaluated frame and the node count of each network
+    result = {}
+    mode = cmds.evaluationManager(q=1, mode=1)[0]
+    try:
+        for network in ['legacy', 'lean']:
+            logger = lib.Logger('compare_network_eval')
+            loc_up = cmds.spaceLocator(n='chain_loc_up')[0]
+            cmds.xform(loc_up, t=top)
+            loc_down = cmds.spaceLocator(n='chain_loc_down')[0]
+            cmds.xform(loc_down, t=bottom)
+            joint_lst = curveToJoints(logger, j_num, loc_up, loc_down)
+            count = len(logger.log['nodes'])
+            set_ik_math(logger, joint_lst, network, falloff)
+            row = {'nodes': len(logger.log['nodes']) - count}
+
+            control = 'Stretch_control_2'
+            cmds.setKeyframe(control, at='translateY', t=1, v=0)
+            cmds.setKeyframe(control, at='translateY', t=frames, v=-2)
+            for em_mode in ['off', 'parallel']:
+                cmds.evaluationManager(mode=em_mode)
+                cmds.currentTime(1)
+                start = time.perf_counter()
+                for frame in range(1, frames + 1):
+                    cmds.currentTime(frame)
+                    cmds.getAttr(joint_lst[0] + '.scaleX')
+                row['dg' if em_mode == 'off' else 'em'] = (time.perf_counter() - start) / frames
+
+            cmds.cutKey(control, at='translateY')
+            logger.dump()
+            logger.undo()
+            result[network] = row
+    finally:
+        cmds.evaluationManager(mode=mode)
+    return result
@@ -0,0 +1,175 @@
+from PySide2 import QtWidgets, QtGui, QtCore
+from shiboken2 import wrapInstance as wrp
+import maya.cmds as cmds
+import maya.OpenMayaUI as omui
+
+import lib
+import geometry
+import stretch_deformer
+try:    # noinspection PyUnresolvedReferences,PyUnboundLocalVariable
+    long
+except NameError:   # Python 3 compatibility
+    long = int
+    unicode = str
+
+# the create_lattice window, kept apart so stretch_deformer imports without PySide2
+# open it with stretch_deformer.create_ui()
+
+Wgt_instance = None
+
+class DeformerSetter(QtWidgets.QWidget):
+    def __init__(self, parent=None):
+        super(DeformerSetter, self).__init__(parent)
+        if not cmds.ls(sl=1):
+            cmds.warning('Select geo first')
+            return
+        self.geo = cmds.ls(sl=1)[0]
+        self.curve = None
+        self.joint_lst = None
+        self.sel_obj = None
+        self.setWindowFlags(QtCore.Qt.Window)
+        self.setWindowTitle('Deform')
+        self.create_widgets()
+        self.create_layouts()
+        self.create_connections()
+        self.logger = lib.Logger(self.__class__.__name__ + cmds.ls(sl=1)[0])
+        self.log = self.logger.load()
+        if self.log:
+            self.delete_all_btn.setVisible(True)
+            self.show_update(self.logger.meta.get('params'))
+        else:
+            self.create_locators()
+
+    def create_locators(self):
+        self.loc_up = cmds.spaceLocator(n='chain_loc_up')[0]
+        cmds.setAttr(self.loc_up + '.ty', 1)
+        self.loc_down = cmds.spaceLocator(n='chain_loc_down')[0]
+        cmds.warning('Place 2 locators for spline, on top and bottom of deformable geo')
+        cmds.warning('Then press create lattice')
+        cmds.select(self.loc_up)
+
+
+
+    def create_widgets(self):
+        self.create_lattice_btn = QtWidgets.QPushButton('Create Lattice')
+        self.lattice_lable = QtWidgets.QLabel('Lattice dimension')
+        int_validator = QtGui.QIntValidator()
+        self.x_dem = QtWidgets.QLineEdit('2')
+        self.x_dem.setValidator(int_validator)
+        self.y_dem = QtWidgets.QLineEdit('4')
+        self.y_dem.setValidator(int_validator)
+        self.z_dem = QtWidgets.QLineEdit('2')
+        self.z_dem.setValidator(int_validator)
+        self.joints_lable = QtWidgets.QLabel('Joints')
+        self.joints_num = QtWidgets.QLineEdit(str(stretch_deformer.j_num))
+        self.joints_num.setValidator(int_validator)
+        self.auto_dem_chb = QtWidgets.QCheckBox('Auto dimension')
+        self.auto_dem_lable = QtWidgets.QLabel('')
+        self.update_btn = QtWidgets.QPushButton('Update')
+        self.update_btn.setVisible(False)
+
+        self.delete_all_btn = QtWidgets.QPushButton('Delete')
+        self.delete_all_btn.setVisible(False)
+
+
+    def create_layouts(self):
+        self.main_lo = QtWidgets.QHBoxLayout(self)
+
+        self.lattice_lo = QtWidgets.QVBoxLayout(self)
+        self.lattice_wgt = QtWidgets.QWidget()
+        self.lattice_wgt.setLayout(self.lattice_lo)
+        self.lattice_lo.addWidget(self.lattice_lable)
+        self.lattice_lo.addWidget(self.x_dem)
+        self.lattice_lo.addWidget(self.y_dem)
+        self.lattice_lo.addWidget(self.z_dem)
+        self.lattice_lo.addWidget(self.joints_lable)
+        self.lattice_lo.addWidget(self.joints_num)
+        self.lattice_lo.addWidget(self.auto_dem_chb)
+        self.lattice_lo.addWidget(self.auto_dem_lable)
+        self.lattice_lo.addWidget(self.create_lattice_btn)
+        self.lattice_lo.addWidget(self.update_btn)
+
+        self.main_lo.addWidget(self.lattice_wgt)
+
+        self.main_lo.addWidget(self.delete_all_btn)
+
+    def create_connections(self):
+        self.create_lattice_btn.clicked.connect(self.create_lattice)
+        self.update_btn.clicked.connect(self.update_lattice)
+        self.auto_dem_chb.toggled.connect(self.toggle_auto_dimension)
+        self.delete_all_btn.clicked.connect(self.delete_all)
+
+
+    def toggle_auto_dimension(self, state):
+        for field in [self.x_dem, self.y_dem, self.z_dem]:
+            field.setEnabled(not state)
+        if state:
+            self.auto_dimension()
+        else:
+            self.auto_dem_lable.setText('')
+
+    def auto_dimension(self):
+        res = geometry.auto_divisions(stretch_deformer.get_mesh_points(self.geo),
+                                      cmds.xform(self.loc_up, ws=1, q=1, t=1),
+                                      cmds.xform(self.loc_down, ws=1, q=1, t=1),
+                                      int(self.joints_num.text()))
+        for field, val in zip([self.x_dem, self.y_dem, self.z_dem], res['divisions']):
+            field.setText(str(val))
+        self.auto_dem_lable.setText('{0} lattice points\n~{1:.2f}M point weights per eval'.format(
+            res['points'], res['cost'] / 1e6))
+
+    def create_lattice(self):
+        if self.auto_dem_chb.isChecked():
+            # locators could have moved since the preview
+            self.auto_dimension()
+        stretch_deformer.build_setup(self.logger,
+                                     self.geo,
+                                     self.loc_up,
+                                     self.loc_down,
+                                     (self.x_dem.text(), self.y_dem.text(), self.z_dem.text()),
+                                     int(self.joints_num.text()))
+        self.delete_all_btn.setVisible(True)
+        self.show_update(self.logger.meta.get('params'))
+
+    def show_update(self, params):
+        # setups built before parameters were logged can only be deleted
+        if not params:
+            self.lattice_wgt.setVisible(False)
+            return
+        for field, val in zip([self.x_dem, self.y_dem, self.z_dem], params['divisions']):
+            field.setText(str(val))
+        self.joints_num.setText(str(params.get('joint_num', stretch_deformer.j_num)))
+        # a setup on a shared chain does not own its joints
+        self.joints_num.setEnabled('joint_num' in params)
+        for wgt in [self.create_lattice_btn, self.auto_dem_chb, self.auto_dem_lable]:
+            wgt.setVisible(False)
+        self.update_btn.setVisible(True)
+
+    def update_lattice(self):
+        # the joint count only goes along when it was edited
+        joint_num = int(self.joints_num.text())
+        if joint_num == self.logger.meta['params'].get('joint_num'):
+            joint_num = None
+        stretch_deformer.update_setup(self.logger,
+                                      (self.x_dem.text(), self.y_dem.text(), self.z_dem.text()),
+                                      joint_num)
+
+
+    def delete_all(self):
+        self.logger.undo()
+
+def create_ui():
+    global Wgt_instance
+    if Wgt_instance is None:
+        q_maya_window = get_maya_window()
+        Wgt_instance = DeformerSetter(parent=q_maya_window)
+
+    Wgt_instance.show()
+    Wgt_instance.setWindowState(QtCore.Qt.WindowNoState | QtCore.Qt.WindowActive)
+    Wgt_instance.activateWindow()
+    return Wgt_instance
+
+def get_maya_window():
+    ptr = omui.MQtUtil.mainWindow()
+    if ptr is not None:
+        return wrp(long(ptr), QtWidgets.QMainWindow)
@@ -0,0 +1,39 @@
+import math
+
+import pytest
+
+import fake_maya
+
+# every test runs against fake_maya, installed before any module under test imports maya
+fake_maya.install()
+
+
+@pytest.fixture
+def rig_scene():
+    # Head_M joint, a cylinder of points around it and the two chain locators, like the window expects
+    from maya import cmds
+    fake_maya.new_scene()
+    cmds.joint(p=(0, 5, 0), n="Head_M")
+    cmds.select(cl=1)
+    points = [(math.cos(a * 0.5) * 2, y * 0.5, math.sin(a * 0.5) * 2) for y in range(12) for a in range(12)]
+    geo = fake_maya.create_mesh("geo", points)
+    loc_up = cmds.spaceLocator(n="chain_loc_up")[0]
+    cmds.xform(loc_up, t=(0, 5.5, 0))
+    loc_down = cmds.spaceLocator(n="chain_loc_down")[0]
+    return geo, loc_up, loc_down
+
+
+@pytest.fixture
+def backend(request, monkeypatch):
+    # stretch_deformer build settings, reset after the test
+    import stretch_deformer
+    monkeypatch.setattr(stretch_deformer, "build_backend", stretch_deformer.build_backend)
+    monkeypatch.setattr(stretch_deformer, "stretch_network", stretch_deformer.stretch_network)
+    monkeypatch.setattr(stretch_deformer, "squash_falloff", stretch_deformer.squash_falloff)
+    return stretch_deformer
+
+
+def after_rollback(before, consumed=("chain_loc_up", "chain_loc_down")):
+    # nodes a clean rollback leaves: what was there minus the consumed locators, plus the logger node
+    gone = set(consumed) | set(x + "Shape" for x in consumed)
+    return (set(before) - gone) | {"logger"}
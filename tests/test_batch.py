@@ -0,0 +1,95 @@
+from maya import cmds
+
+import fake_maya
+import batch
+import registry
+from conftest import after_rollback
+
+
+def _second_geo(geo):
+    return cmds.duplicate(geo, n="geo_b")[0]
+
+
+def test_batch_shares_locators_and_rolls_back(rig_scene):
+    geo, loc_up, loc_down = rig_scene
+    geo_b = _second_geo(geo)
+    before = set(fake_maya.scene.nodes)
+    # scene_specs names the same locators for every mesh, divisions are picked per mesh
+    rows = batch.build_batch(batch.scene_specs([geo, geo_b], loc_up, loc_down))
+
+    assert [x.get("error") for x in rows] == [None, None]
+    assert rows[0]["chain"] == rows[1]["chain"]
+    assert all(len(x["divisions"]) == 3 for x in rows)
+    assert not cmds.objExists(loc_up) and not cmds.objExists(loc_down)
+    assert sorted(registry.names()) == ["DeformerSettergeo", "DeformerSettergeo_b", "StretchChainHead_M"]
+    assert all(x["ok"] for x in registry.health())
+
+    assert sorted(batch.rollback_all()) == ["DeformerSettergeo", "DeformerSettergeo_b", "StretchChainHead_M"]
+    assert set(fake_maya.scene.nodes) == after_rollback(before)
+
+
+def test_failed_spec_is_rolled_back(rig_scene):
+    geo, loc_up, loc_down = rig_scene
+    before = set(fake_maya.scene.nodes)
+    rows = batch.build_batch([{"geo": geo, "top": loc_up, "bottom": loc_down, "divisions": (2, 3, 2)},
+                              {"geo": "missing_geo", "top": (0, 5, 0), "bottom": (0, 0, 0), "divisions": (2, 3, 2)}])
+
+    assert "error" not in rows[0]
+    assert "missing_geo" in rows[1]["error"]
+    # nothing of the failed lattice is left without a log
+    assert "DeformerSettermissing_geo" not in registry.names()
+    batch.rollback_all()
+    assert set(fake_maya.scene.nodes) == after_rollback(before)
+
+
+def test_health_reports_deleted_nodes(rig_scene):
+    geo, loc_up, loc_down = rig_scene
+    batch.build_batch(batch.scene_specs([geo], loc_up, loc_down))
+    cmds.delete("geo_stretch_deformer")
+    rows = dict((x["name"], x) for x in registry.health())
+    assert not rows["DeformerSettergeo"]["ok"]
+    assert "geo_stretch_deformer" in rows["DeformerSettergeo"]["missing"]
+    assert rows["StretchChainHead_M"]["ok"]
+
+
+def test_rerun_keeps_the_first_rig_logged(rig_scene):
+    geo, loc_up, loc_down = rig_scene
+    before = set(fake_maya.scene.nodes)
+    spec = {"geo": geo, "top": (0, 5.5, 0), "bottom": (0, 0, 0), "divisions": (2, 3, 2)}
+    batch.build_batch([spec])
+    nodes = set(fake_maya.scene.nodes)
+    rows = batch.build_batch([spec])
+
+    assert "already has a stretch setup" in rows[0]["error"]
+    # the logged chain is reused, nothing new is built
+    assert set(fake_maya.scene.nodes) == nodes
+    batch.rollback_all()
+    assert set(fake_maya.scene.nodes) == after_rollback(before, consumed=())
+
+
+def test_short_name_collisions_get_their_own_logs(rig_scene):
+    geo, loc_up, loc_down = rig_scene
+    # ns:geo and ns_geo both come out of _safe_name as ns_geo
+    first = cmds.duplicate(geo, n="ns:geo")[0]
+    second = cmds.duplicate(geo, n="ns_geo")[0]
+    before = set(fake_maya.scene.nodes)
+    rows = batch.build_batch(batch.scene_specs([first, second], (0, 5.5, 0), (0, 0, 0), divisions=(2, 3, 2)))
+
+    assert [x.get("error") for x in rows] == [None, None]
+    assert rows[0]["root"] != rows[1]["root"]
+    assert {"DeformerSetterns_geo", "DeformerSetterns_geo1"} <= set(registry.names())
+    assert batch.setup_logger(second)[0].conf_node_name == "DeformerSetterns_geo1"
+    assert len(batch.rollback_batch(batch.scene_specs([first, second], (0, 5.5, 0), (0, 0, 0)))) == 3
+    assert set(fake_maya.scene.nodes) == after_rollback(before, consumed=())
+
+
+def test_update_divisions_of_a_batch_setup(rig_scene):
+    import lib
+    import stretch_deformer
+    geo, loc_up, loc_down = rig_scene
+    batch.build_batch([{"geo": geo, "top": loc_up, "bottom": loc_down, "divisions": (2, 3, 2)}])
+    logger = lib.Logger("DeformerSettergeo")
+    logger.load()
+    # the window always sends its joint field, the chain is not the setup's to rebuild
+    assert stretch_deformer.update_setup(logger, (3, 5, 3), 4) == ["lattice", "skin"]
+    assert logger.meta["params"]["divisions"] == [3, 5, 3]
@@ -0,0 +1,157 @@
+import pytest
+from maya import cmds
+
+import fake_maya
+import geometry
+import lib
+from conftest import after_rollback
+
+
+@pytest.mark.parametrize("build_backend", ["cmds", "om"])
+@pytest.mark.parametrize("network", ["legacy", "lean"])
+def test_build_and_undo_leave_scene_clean(rig_scene, backend, build_backend, network):
+    geo, loc_up, loc_down = rig_scene
+    backend.build_backend = build_backend
+    backend.stretch_network = network
+    before = set(fake_maya.scene.nodes)
+    logger = lib.Logger("DeformerSetter" + geo)
+    backend.build_setup(logger, geo, loc_up, loc_down, (2, 4, 2), 4)
+
+    assert cmds.objExists("Stretch_control_1Shape")
+    # joint_num segments
+    assert len(cmds.ls("stretch_joint_*", type="joint")) == 5
+    assert not cmds.objExists(loc_up)
+
+    loaded = lib.Logger("DeformerSetter" + geo)
+    assert loaded.load()
+    loaded.undo()
+    assert set(fake_maya.scene.nodes) == after_rollback(before)
+    assert not cmds.attributeQuery("DeformerSetter" + geo, n="logger", ex=True)
+
+
+@pytest.mark.parametrize("build_backend", ["cmds", "om"])
+def test_update_setup_rebuilds_only_what_changed(rig_scene, backend, build_backend):
+    geo, loc_up, loc_down = rig_scene
+    backend.build_backend = build_backend
+    before = set(fake_maya.scene.nodes)
+    logger = lib.Logger("DeformerSetter" + geo)
+    backend.build_setup(logger, geo, loc_up, loc_down, (2, 4, 2), 4)
+    control = fake_maya.scene.node("Stretch_control_1")
+
+    assert backend.update_setup(logger, divisions=(3, 5, 3)) == ["lattice", "skin"]
+    assert logger.meta["params"]["divisions"] == [3, 5, 3]
+    # controls survive a lattice rebuild
+    assert fake_maya.scene.node("Stretch_control_1") is control
+
+    rebuilt = backend.update_setup(logger, joint_num=6, network="lean", falloff=0.3)
+    assert set(rebuilt) == {"joints", "ik", "skin"}
+    assert len(cmds.ls("stretch_joint_*", type="joint")) == 7
+
+    loaded = lib.Logger("DeformerSetter" + geo)
+    loaded.load()
+    loaded.undo()
+    assert set(fake_maya.scene.nodes) == after_rollback(before)
+
+
+def test_build_session_defers_graph_builds(rig_scene, backend):
+    geo, loc_up, loc_down = rig_scene
+    scene = fake_maya.scene
+    seen = []
+    with lib.build_session("test"):
+        seen.append(scene.em_idle_build)
+        lib.defer(seen.append, "deferred")
+        seen.append("body")
+        # nested sessions ride on the outer one
+        with lib.build_session("nested"):
+            lib.defer(seen.append, "nested")
+    assert seen == [False, "body", "deferred", "nested"]
+    assert scene.em_idle_build is True
+    assert scene.em_invalidated == 1
+    assert scene.em_mode == "parallel"
+    # outside of a session defer runs right away
+    lib.defer(seen.append, "now")
+    assert seen[-1] == "now"
+
+
+@pytest.mark.parametrize("build_backend", ["cmds", "om"])
+def test_lean_network_drives_each_joint_scale_with_one_connection(rig_scene, backend, build_backend):
+    geo, loc_up, loc_down = rig_scene
+    backend.build_backend = build_backend
+    backend.stretch_network = "lean"
+    backend.squash_falloff = 0.5
+    logger = lib.Logger("DeformerSetter" + geo)
+    backend.build_setup(logger, geo, loc_up, loc_down, (2, 4, 2), 4)
+
+    joints = sorted(cmds.ls("stretch_joint_*", type="joint"))
+    inputs = fake_maya.scene.inputs
+    for j in joints:
+        assert [plug[1] for plug in inputs if plug[0].name == j and plug[1].startswith("scale")] == ["scale"]
+    # one power node per distinct squash exponent, the exponents are plain values on it
+    exponents = geometry.squash_profile(len(joints), 0.5)
+    powers = [x for x in cmds.ls(logger.log["nodes"], type="multiplyDivide") if cmds.getAttr(x + ".operation") == 3]
+    assert len(powers) == len(set(exponents.tolist()))
+    for j, exponent in zip(joints, exponents):
+        power = inputs[(fake_maya.scene.node(j), "scale")][0].name
+        assert cmds.getAttr(power + ".input2")[0] == pytest.approx((exponent, 1.0, exponent))
+
+
+def test_legacy_rest_length_is_set_before_the_lattice_binds(rig_scene, backend, monkeypatch):
+    geo, loc_up, loc_down = rig_scene
+    backend.stretch_network = "legacy"
+    seen = []
+    bind = backend.bind_lattice
+
+    def bind_lattice(logger, *args, **kwargs):
+        seen.append(cmds.getAttr(logger.meta["nodes"]["rest_length"]))
+        return bind(logger, *args, **kwargs)
+
+    def set_legacy_network(logger, curve, joint_lst, _set=backend.set_legacy_network):
+        _set(logger, curve, joint_lst)
+        logger.meta.setdefault("nodes", {})["rest_length"] = cmds.ls(logger.log["nodes"], type="floatMath")[0] + ".floatB"
+
+    monkeypatch.setattr(backend, "bind_lattice", bind_lattice)
+    monkeypatch.setattr(backend, "set_legacy_network", set_legacy_network)
+    logger = lib.Logger("DeformerSetter" + geo)
+    backend.build_setup(logger, geo, loc_up, loc_down, (2, 4, 2), 4)
+    assert seen and seen[0] == pytest.approx(5.5)
+
+
+def test_setups_logged_with_the_pymel_backend_still_update(rig_scene, backend):
+    geo, loc_up, loc_down = rig_scene
+    logger = lib.Logger("DeformerSetter" + geo)
+    backend.build_setup(logger, geo, loc_up, loc_down, (2, 4, 2), 4)
+    # the cmds backend's name in setups logged before pymel was dropped
+    logger.meta["params"]["backend"] = "pymel"
+    assert backend.update_setup(logger, network="lean") == ["ik"]
+    assert logger.meta["params"]["backend"] == "cmds"
+
+
+def test_om_build_passes_undo_and_redo_through_the_plugin_command(rig_scene):
+    import om_build
+    import stretch_deformer
+    geo, loc_up, loc_down = rig_scene
+    scene = fake_maya.scene
+    logger = lib.Logger("om_undo")
+    joints = stretch_deformer.curveToJoints(logger, 4, loc_up, loc_down)
+    om_build.set_ik_math(logger, joints, "lean")
+    built = [x for x in ["stretch_rig", "stretch_curveShape", "Stretch_control_1Shape", "stretch_cv_1"]
+             if cmds.objExists(x)]
+    assert len(built) == 4
+    network = {"curveInfo", "blendColors"}
+    assert network <= {x.type for x in scene.nodes.values()}
+    assert cmds.attributeQuery("stretch", n="stretch_rig", ex=True)
+    passes = len(scene.undo_queue)
+    assert passes and not om_build._pending
+
+    # the fake only queues plugin commands, so undoing every entry takes back exactly the modifier passes
+    for i in range(passes):
+        cmds.undo()
+    assert not any(cmds.objExists(x) for x in built)
+    assert not network & {x.type for x in scene.nodes.values()}
+    assert not any((scene.node(j), "scale") in scene.inputs for j in joints)
+
+    for i in range(passes):
+        cmds.redo()
+    assert all(cmds.objExists(x) for x in built)
+    assert len(scene.node("stretch_curveShape").data["cvs"]) == 4
+    assert all((scene.node(j), "scale") in scene.inputs for j in joints)
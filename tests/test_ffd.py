@@ -0,0 +1,93 @@
+from math import comb
+
+import numpy as np
+import pytest
+
+import ffd
+import geometry
+
+# golden checks for the offline ffd, no maya involved
+
+# scaled, rotated and moved lattice box in xform -m order
+_angle = np.radians(30)
+BASE = [2 * np.cos(_angle), 0, -2 * np.sin(_angle), 0,
+        0, 3, 0, 0,
+        np.sin(_angle), 0, np.cos(_angle), 0,
+        1, 2, -1, 1]
+DIVISIONS = (3, 4, 2)
+
+
+def _points(count=200, spread=0.45, seed=1):
+    # random points inside the box, world space
+    rng = np.random.default_rng(seed)
+    local = rng.uniform(-spread, spread, (count, 3))
+    matrix = np.asarray(BASE, dtype=float).reshape(4, 4)
+    return local @ matrix[:3, :3] + matrix[3, :3]
+
+
+def _brute_force(points, grid):
+    # the trivariate bernstein sum written out term by term
+    s, t, u = grid.shape[:3]
+    stu = ffd.lattice_params(points, BASE)
+    res = np.zeros_like(points)
+    for n, (a, b, c) in enumerate(stu):
+        for i in range(s):
+            for j in range(t):
+                for k in range(u):
+                    w = (comb(s - 1, i) * a ** i * (1 - a) ** (s - 1 - i) *
+                         comb(t - 1, j) * b ** j * (1 - b) ** (t - 1 - j) *
+                         comb(u - 1, k) * c ** k * (1 - c) ** (u - 1 - k))
+                    res[n] += w * grid[i, j, k]
+    return res
+
+
+def _deformed_grid(seed=2):
+    rng = np.random.default_rng(seed)
+    return ffd.rest_lattice(BASE, DIVISIONS) + rng.normal(0, 0.3, DIVISIONS + (3,))
+
+
+def test_matches_brute_force_sum():
+    points = _points(60)
+    grid = _deformed_grid()
+    assert np.abs(ffd.deform(points, BASE, DIVISIONS, grid) - _brute_force(points, grid)).max() < 1e-12
+
+
+def test_rest_lattice_is_identity():
+    points = _points()
+    res = ffd.deform(points, BASE, DIVISIONS, ffd.rest_lattice(BASE, DIVISIONS))
+    assert np.abs(res - points).max() < 1e-12
+
+
+def test_affine_lattice_moves_points_affinely():
+    # bernstein polynomials reproduce linear functions, an affine edit of the lattice is an affine edit of the mesh
+    points = _points()
+    matrix = np.array([[1.2, 0.1, 0], [0, 0.8, 0.3], [0.2, 0, 1.1]])
+    offset = np.array([0.5, -1, 2])
+    grid = ffd.rest_lattice(BASE, DIVISIONS) @ matrix + offset
+    res = ffd.deform(points, BASE, DIVISIONS, grid)
+    assert np.abs(res - (points @ matrix + offset)).max() < 1e-12
+
+
+def test_flat_points_chunks_and_outside():
+    points = np.vstack([_points(100), [[50.0, 50.0, 50.0]]])
+    grid = _deformed_grid()
+    res = ffd.deform(points, BASE, DIVISIONS, grid)
+    # flat lattice pt[s][t][u] order and tiny chunks give the same result
+    assert np.abs(ffd.deform(points, BASE, DIVISIONS, geometry.flat_lattice(grid), chunk=7) - res).max() < 1e-12
+    # points outside the box stay put unless asked
+    assert np.array_equal(res[-1], points[-1])
+    assert not np.array_equal(ffd.deform(points, BASE, DIVISIONS, grid, outside=True)[-1], points[-1])
+
+
+@pytest.mark.parametrize("degree", [1, 2, 5])
+def test_bernstein_partition_of_unity(degree):
+    basis = ffd.bernstein(degree, np.linspace(0, 1, 11))
+    assert basis.shape == (11, degree + 1)
+    assert np.allclose(basis.sum(axis=1), 1.0)
+
+
+def test_deviation():
+    points = _points(10)
+    assert ffd.deviation(points, points) == {"max": 0.0, "mean": 0.0, "rms": 0.0}
+    moved = points + [0.0, 3.0, 4.0]
+    assert ffd.deviation(moved, points)["max"] == pytest.approx(5.0)
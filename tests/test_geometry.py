@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+import geometry
+
+# spline_joint_positions against the temp curve round trip curveToJoints used to make, no maya involved
+
+
+def _insert_knot(cvs, knots, u, degree=3):
+    # boehm knot insertion on a clamped curve, knots in full form
+    k = np.searchsorted(knots, u, side="right") - 1
+    res = []
+    for i in range(len(cvs) + 1):
+        if i <= k - degree:
+            res.append(cvs[i])
+        elif i <= k:
+            a = (u - knots[i]) / (knots[i + degree] - knots[i])
+            res.append((1.0 - a) * cvs[i - 1] + a * cvs[i])
+        else:
+            res.append(cvs[i - 1])
+    return np.array(res), np.insert(knots, k + 1, u)
+
+
+def _old_positions(p_up, p_down, j_num):
+    # curve(d=3) through the two locators twice each, rebuildCurve(rt=0, s=j_num), then
+    # delete cv[1] and, on the shortened curve, cv[j_num]
+    cvs = np.array([p_up, p_up, p_down, p_down], dtype=float)
+    knots = np.array([0.0, 0.0, 0.0, 0.0, 1.0, 1.0, 1.0, 1.0])
+    for i in range(1, j_num):
+        cvs, knots = _insert_knot(cvs, knots, i / float(j_num))
+    cvs = list(cvs)
+    del cvs[1]
+    del cvs[j_num]
+    return np.array(cvs)
+
+
+@pytest.mark.parametrize("j_num", [1, 2, 4, 7, 16])
+def test_parameter_spacing_matches_the_rebuilt_curve_cvs(j_num):
+    rng = np.random.default_rng(j_num)
+    p_up, p_down = rng.uniform(-10, 10, size=(2, 3))
+    res = geometry.spline_joint_positions(p_up, p_down, j_num, spacing="parameter")
+    assert res.shape == (j_num + 1, 3)
+    assert np.allclose(res, _old_positions(p_up, p_down, j_num), atol=1e-9)
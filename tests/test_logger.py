@@ -0,0 +1,128 @@
+import pytest
+from maya import cmds
+
+import fake_maya
+import journal
+import lib
+
+
+def _targets(count):
+    fake_maya.new_scene()
+    return [cmds.createNode("transform", n="target_{0}".format(i)) for i in range(count)]
+
+
+def _churn(logger, targets, edits=5):
+    # the same attrs edited over and over like a ui session does, plus a node that is deleted again
+    for i, target in enumerate(targets):
+        node = logger.create_node("transform", n="node_{0}".format(i))
+        for k in range(edits):
+            logger.set_attr(target + ".translateX", float(k + 1))
+            logger.hide_attr(target + ".translateY")
+            logger.show_attr(target + ".translateY")
+            logger.connect_attr(node + ".translateZ", target + ".translateZ")
+            logger.disconnect_attr(node + ".translateZ", target + ".translateZ")
+        logger.connect_attr(node + ".translate", target + ".scale")
+        cmds.delete(logger.create_node("transform", n="temp_{0}".format(i)))
+
+
+def _state():
+    scene = fake_maya.scene
+    return (sorted(scene.nodes),
+            dict((name, dict(node.values)) for name, node in scene.nodes.items()),
+            sorted((fake_maya._plug_name(s), fake_maya._plug_name(d)) for d, s in scene.inputs.items()))
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_journal_round_trip(compress):
+    targets = _targets(3)
+    logger = lib.Logger("round_trip")
+    _churn(logger, targets[:2], edits=2)
+    logger.meta["params"] = {"geo": "target_0"}
+    logger.dump(compress=compress, compact=False)
+    first = logger._journal.segments
+    # a second dump only appends what is new
+    _churn(logger, targets[2:], edits=2)
+    logger.dump(compress=compress, compact=False)
+    assert logger._journal.segments == first + 1
+
+    loaded = lib.Logger("round_trip")
+    assert loaded.load()
+    assert loaded.log == logger.log
+    assert loaded.meta == {"params": {"geo": "target_0"}}
+    assert set(loaded.uuids) >= set(cmds.ls(logger.log["nodes"]))
+
+
+def test_journal_records_encode_every_category():
+    log = journal.empty_log()
+    log["nodes"] = ["a", "b"]
+    log["connections"] = [{"from": "a.tx", "to": "b.tx", "old_value": 2.0}]
+    log["groups"] = [{"transform": "g", "parents": [{"node": "a", "parent": None}, {"node": "b", "parent": "a"}]}]
+    log["constraint_targets"] = [{"source": "b", "old_targets": ["a"], "type": "parent", "constraint": "c"}]
+    log["attr_vals"] = [{"attr": "a.tx", "val": [1, 2, 3]}]
+    writer = journal.Journal()
+    segment = writer.append(log, {"a": "UUID-A"})
+    reader = journal.Journal.from_header(writer.header())
+    assert reader.decode([segment]) == log
+    assert reader.uuids == {"a": "UUID-A"}
+    assert writer.append(log) is None
+
+
+def test_compact_drops_records_and_undoes_the_same():
+    states = []
+    records = []
+    for compact in [False, True]:
+        targets = _targets(6)
+        before = _state()
+        logger = lib.Logger("compact")
+        _churn(logger, targets)
+        logger.dump(compact=compact)
+        records.append(sum(len(x) for x in logger.log.values()))
+        loaded = lib.Logger("compact")
+        loaded.load()
+        loaded.undo()
+        states.append(_state())
+    assert records[1] < records[0] / 4
+    assert states[0] == states[1]
+    # everything but the logger node is back where it was
+    assert [x for x in states[1][0] if x != "logger"] == before[0]
+
+
+def test_undo_checks_existence_in_bulk(rig_scene):
+    import stretch_deformer
+    geo, loc_up, loc_down = rig_scene
+    logger = lib.Logger("DeformerSetter" + geo)
+    stretch_deformer.build_setup(logger, geo, loc_up, loc_down, (2, 4, 2), 4)
+    loaded = lib.Logger("DeformerSetter" + geo)
+    loaded.load()
+    calls = fake_maya.scene.calls
+    calls.clear()
+    loaded.undo()
+    assert calls["cmds.objExists"] <= 2
+    # connections inside the deleted nodes go with the delete
+    assert calls["cmds.disconnectAttr"] < 20
+
+
+def test_undo_follows_renamed_and_namespace_moved_nodes():
+    targets = _targets(2)
+    logger = lib.Logger("renamed")
+    made = [logger.create_node("transform", n="made_{0}".format(i)) for i in range(3)]
+    logger.set_attr(targets[0] + ".translateX", 2.0)
+    logger.connect_attr(made[0] + ".translate", targets[1] + ".scale")
+    logger.dump()
+
+    cmds.rename(made[0], "renamed_0")
+    cmds.rename(targets[0], "renamed_target")
+    cmds.namespace(add="tmp")
+    for node in made[1:]:
+        cmds.rename(node, "tmp:" + node)
+    cmds.namespace(add="rig")
+    cmds.namespace(moveNamespace=("tmp", "rig"))
+    assert cmds.objExists("rig:made_1") and not cmds.objExists(made[1])
+
+    # a fresh logger only has the dump, the uuids find the nodes under their new names
+    loaded = lib.Logger("renamed")
+    assert loaded.load()
+    loaded.undo()
+    assert not [x for x in fake_maya.scene.nodes if "made" in x or x == "renamed_0"]
+    assert cmds.getAttr("renamed_target.translateX") == 0.0
+    assert (fake_maya.scene.node(targets[1]), "scale") not in fake_maya.scene.inputs
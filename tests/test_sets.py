@@ -0,0 +1,42 @@
+from maya import cmds
+
+import fake_maya
+import lib
+
+
+def _control_sets():
+    # AllSet holds BodySet and FaceSet, both share EyeSet, EyeSet links back to AllSet
+    fake_maya.new_scene()
+    lib.clear_set_cache()
+    ctl = dict((name, cmds.createNode("transform", n=name + "_ctl")) for name in ["all", "body", "face", "eye"])
+    eye = cmds.sets(ctl["eye"], n="EyeSet")
+    body = cmds.sets(eye, ctl["body"], n="BodySet")
+    face = cmds.sets(eye, ctl["face"], n="FaceSet")
+    top = cmds.sets(body, face, ctl["all"], n="AllSet")
+    cmds.sets(top, add=eye)
+    return top, ctl
+
+
+def test_get_set_recursive_expands_shared_and_cyclic_sets_once():
+    top, ctl = _control_sets()
+    res = lib.get_set_recursive(top)
+    assert res == [ctl["eye"], ctl["body"], ctl["face"], ctl["all"]]
+    # any set of the cycle works as the entry point
+    assert sorted(lib.get_set_recursive("EyeSet")) == sorted(ctl.values())
+
+
+def test_get_set_recursive_queries_once_per_depth_level():
+    top, ctl = _control_sets()
+    calls = fake_maya.scene.calls
+    calls.clear()
+    lib.get_set_recursive(top)
+    # AllSet, BodySet + FaceSet, EyeSet: three levels, one objectSet and one transform query each
+    assert calls["cmds.listConnections"] == 6
+
+    lib.get_set_recursive(top, cache=True)
+    calls.clear()
+    assert lib.get_set_recursive(top, cache=True) == [ctl["eye"], ctl["body"], ctl["face"], ctl["all"]]
+    assert calls["cmds.listConnections"] == 0
+    lib.clear_set_cache()
+    lib.get_set_recursive(top, cache=True)
+    assert calls["cmds.listConnections"] == 6